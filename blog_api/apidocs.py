@@ -0,0 +1,62 @@
+"""Swagger UI (``/apidocs/``) and the spec it renders (``/apispec_1.json``).
+
+Nothing is generated at startup: Flasgger collects the ``@swag_from`` dicts of every route the
+first time the spec is requested. ``CachedSpec`` keeps the encoded result for the life of the
+process and serves it with an ETag, so later requests skip both the walk over the URL map and
+the JSON encoding, and a browser that already has it gets a 304.
+"""
+import hashlib
+import threading
+
+from flask import Response, current_app, request
+from flasgger import Swagger
+
+TEMPLATE = {
+    "swagger": "2.0",
+    "info": {
+        "title": "Blog REST API",
+        "description": "RESTful API for managing blog posts, comments, likes, followers, and notifications",
+        "version": "1.0.0"
+    },
+    "securityDefinitions": {
+        "bearerAuth": {
+            "type": "apiKey",
+            "name": "Authorization",
+            "in": "header",
+            "description": "JWT Authorization header using the Bearer scheme. Example: 'Bearer {token}'"
+        }
+    },
+    "security": [{"bearerAuth": []}]
+}
+
+
+class CachedSpec:
+    """View serving one Flasgger spec, generated and encoded on first request."""
+
+    def __init__(self, swagger, endpoint):
+        self.swagger = swagger
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self._body = None
+        self._etag = None
+
+    def load(self):
+        if self._body is None:
+            with self._lock:
+                if self._body is None:
+                    body = current_app.json.encode(self.swagger.get_apispecs(self.endpoint))
+                    self._etag = hashlib.sha1(body).hexdigest()
+                    self._body = body
+        return self._body
+
+    def view(self):
+        response = Response(self.load(), mimetype="application/json")
+        response.set_etag(self._etag)
+        return response.make_conditional(request)
+
+
+def init_app(app):
+    swagger = Swagger(app, template=TEMPLATE)
+    for spec in swagger.config["specs"]:
+        app.view_functions[f"flasgger.{spec['endpoint']}"] = CachedSpec(swagger, spec["endpoint"]).view
+    return swagger
@@ -0,0 +1,81 @@
+"""Token revocation and the cached ``current_user``.
+
+Logging out adds the token's ``jti`` to a blocklist until the token would have expired anyway.
+The blocklist lives in a bounded in-process LRU (``AUTH_BLOCKLIST_BACKEND = "memory"``) or, so
+that a logout reaches every worker process on the host, in a local SQLite file (``"sqlite"``).
+Size the memory store above the number of logouts expected within one token lifetime: an
+evicted entry makes its token valid again.
+
+``current_user`` is a lightweight ``AuthUser`` (id and username) cached per process for
+``AUTH_USER_CACHE_TTL`` seconds, so once warm an authenticated request costs no queries.
+"""
+import os
+import time
+from dataclasses import dataclass
+
+from flask import current_app
+
+from blog_api.cache import MemoryCache, SQLiteCache
+from blog_api.models import db, User
+
+
+@dataclass(frozen=True, slots=True)
+class AuthUser:
+    id: int
+    username: str
+
+
+class TokenBlocklist:
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def revoke(self, jwt_payload):
+        exp = jwt_payload.get("exp")
+        ttl = max(int(exp - time.time()) + 1, 1) if exp else None
+        self.backend.set(f"revoked:{jwt_payload['jti']}", True, ttl)
+
+    def is_revoked(self, jwt_payload):
+        return self.backend.get(f"revoked:{jwt_payload['jti']}") is not None
+
+
+def make_blocklist(app):
+    cfg = app.config
+    if cfg["AUTH_BLOCKLIST_BACKEND"] == "sqlite":
+        path = cfg["AUTH_BLOCKLIST_SQLITE_PATH"] or os.path.join(app.instance_path, "auth_blocklist.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return TokenBlocklist(SQLiteCache(path, default_ttl=0))
+    if cfg["AUTH_BLOCKLIST_BACKEND"] == "memory":
+        return TokenBlocklist(MemoryCache(cfg["AUTH_BLOCKLIST_MAX_ENTRIES"], default_ttl=0))
+    raise ValueError(f"Unknown AUTH_BLOCKLIST_BACKEND {cfg['AUTH_BLOCKLIST_BACKEND']!r}")
+
+
+def blocklist():
+    return current_app.extensions["auth"]["blocklist"]
+
+
+def _token_revoked(jwt_header, jwt_payload):
+    return blocklist().is_revoked(jwt_payload)
+
+
+def _load_user(jwt_header, jwt_payload):
+    users = current_app.extensions["auth"]["users"]
+    identity = jwt_payload[current_app.config["JWT_IDENTITY_CLAIM"]]
+    user = users.get(identity)
+    if user is None:
+        row = db.session.query(User.id, User.username).filter(User.id == identity).first()
+        if row is None:
+            return None  # Deleted account: flask-jwt-extended answers 401
+        user = AuthUser(row.id, row.username)
+        users.set(identity, user)
+    return user
+
+
+def init_app(app, jwt):
+    cfg = app.config
+    app.extensions["auth"] = {
+        "blocklist": make_blocklist(app),
+        "users": MemoryCache(cfg["AUTH_USER_CACHE_MAX_ENTRIES"], cfg["AUTH_USER_CACHE_TTL"]),
+    }
+    jwt.token_in_blocklist_loader(_token_revoked)
+    jwt.user_lookup_loader(_load_user)
@@ -0,0 +1 @@
+# Benchmarks: run as modules, e.g. `python -m blog_api.benchmarks.bench_feed`
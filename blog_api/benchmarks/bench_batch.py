@@ -0,0 +1,73 @@
+"""Throughput of the batch write endpoints against their single-item counterparts.
+
+Drives the app through the Flask test client, so JWT verification, routing and the
+per-request session/commit are all included.
+
+    python -m blog_api.benchmarks.bench_batch --items 2000 --batch-size 500
+"""
+import argparse
+import json
+import time
+
+from blog_api.main import create_app
+from blog_api.models import db
+
+
+def make_client(db_uri):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": db_uri,
+        "NOTIFICATIONS_MODE": "inline",
+        "BCRYPT_LOG_ROUNDS": 4,
+        "RATELIMIT_ENABLED": False,
+    })
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    tokens = []
+    for name in ("author", "liker"):
+        client.post("/register", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+        r = client.post("/login", json={"email": f"{name}@example.com", "password": "pw"})
+        tokens.append({"Authorization": f"Bearer {r.get_json()['access_token']}"})
+    return client, tokens
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--db", default="sqlite:///:memory:")
+    args = parser.parse_args()
+    n, size = args.items, args.batch_size
+    chunks = [range(i, min(i + size, n)) for i in range(0, n, size)]
+    results = {}
+
+    client, (author, liker) = make_client(args.db)
+    results["posts_single"] = timed(lambda: [
+        client.post("/posts", json={"title": f"P{i}", "content": "Body"}, headers=author) for i in range(n)])
+    ids = list(range(1, n + 1))
+    results["likes_single"] = timed(lambda: [
+        client.post(f"/posts/{pid}/like", headers=liker) for pid in ids])
+
+    client, (author, liker) = make_client(args.db)
+    results["posts_batch"] = timed(lambda: [
+        client.post("/posts:batch", json={"posts": [{"title": f"P{i}", "content": "Body"} for i in chunk]},
+                    headers=author) for chunk in chunks])
+    results["likes_batch"] = timed(lambda: [
+        client.post("/likes:batch", json={"post_ids": [ids[i] for i in chunk]}, headers=liker) for chunk in chunks])
+
+    print(json.dumps({
+        "items": n,
+        "batch_size": size,
+        "items_per_sec": {k: round(n / v, 1) for k, v in results.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Thread retrieval on one post with many comments.
+
+Fills a single post with ``--comments`` comments, ``--reply-ratio`` of them replies to a random
+earlier comment, then times pages of ``GET /posts/<id>/comments?thread=true`` (first and deep),
+``GET /comments/<id>/replies`` on the largest thread and the flat listing, counting the SQL
+statements each request runs. ``recursive_lazy_load`` builds the same first page the naive way,
+loading each comment's children with its own query, for comparison.
+
+    python -m blog_api.benchmarks.bench_comments --comments 50000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from blog_api.main import create_app
+from blog_api.models import db, User, Post, Comment
+from blog_api.counters import rebuild_counters
+from blog_api.benchmarks.datagen import thread_key
+
+EPOCH = datetime(2024, 1, 1)
+
+
+def fill(n, reply_ratio, seed):
+    rng = random.Random(seed)
+    db.session.execute(insert(User), [{"id": 1, "username": "author", "email": "a@example.com", "password": "x"}])
+    db.session.execute(insert(Post), [{"id": 1, "title": "Busy", "content": "Post", "author_id": 1,
+                                       "created_at": EPOCH, "updated_at": EPOCH}])
+    rows = []
+    for i in range(1, n + 1):
+        row = {"id": i, "post_id": 1, "author_id": 1, "content": f"comment {i}", "parent_id": None,
+               "root_id": None, "path": None, "depth": 0, "created_at": EPOCH + timedelta(seconds=i)}
+        parent = rows[rng.randrange(len(rows))] if rows and rng.random() < reply_ratio else None
+        if parent is not None and parent["depth"] < 8:
+            row.update(parent_id=parent["id"], root_id=parent["root_id"] or parent["id"], depth=parent["depth"] + 1,
+                       path=f"{parent['path'] or thread_key(parent['id'])}/{thread_key(i)}")
+        rows.append(row)
+    for i in range(0, n, 5000):
+        db.session.execute(insert(Comment), rows[i:i + 5000])
+    db.session.commit()
+    rebuild_counters()
+    return Counter(r["root_id"] for r in rows if r["root_id"]).most_common(1)[0][0]
+
+
+def recursive_lazy_load(limit, replies):
+    """First thread page built by loading every comment's children with a separate query."""
+    def children(comment, budget):
+        nodes = []
+        for child in Comment.query.filter_by(parent_id=comment.id).order_by(Comment.id):
+            if budget[0] <= 0:
+                break
+            budget[0] -= 1
+            nodes.append({"id": child.id, "replies": children(child, budget)})
+        return nodes
+
+    roots = (Comment.query.filter_by(post_id=1, depth=0)
+             .order_by(Comment.created_at, Comment.id).limit(limit).all())
+    return [{"id": r.id, "replies": children(r, [replies])} for r in roots]
+
+
+class StatementCounter:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _record(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def measure(engine, fn, repeat):
+    times = []
+    for _ in range(repeat):
+        with StatementCounter(engine) as counter:
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return {"statements": counter.count, "median_ms": round(statistics.median(times) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--reply-ratio", type=float, default=0.7)
+    parser.add_argument("--limit", type=int, default=20, help="top-level comments per page")
+    parser.add_argument("--replies", type=int, default=10, help="replies nested per top-level comment")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", default="sqlite:////tmp/bench_comments.db")
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db, "CACHE_ENABLED": False, "METRICS_ENABLED": False})
+    client = app.test_client()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        busiest = fill(args.comments, args.reply_ratio, args.seed)
+        engine = db.engine
+
+        page = f"/posts/1/comments?thread=true&limit={args.limit}&replies={args.replies}"
+        cursor = None
+        for _ in range(50):  # walk 50 pages in for a deep cursor
+            cursor = client.get(page + (f"&cursor={cursor}" if cursor else "")).get_json()["next_cursor"]
+        results = {
+            "comments": args.comments,
+            "thread_first_page": measure(engine, lambda: client.get(page), args.repeat),
+            "thread_page_50": measure(engine, lambda: client.get(f"{page}&cursor={cursor}"), args.repeat),
+            "replies_largest_thread": measure(
+                engine, lambda: client.get(f"/comments/{busiest}/replies?limit=100"), args.repeat),
+            "flat_first_page": measure(engine, lambda: client.get(f"/posts/1/comments?limit={args.limit}"),
+                                       args.repeat),
+            "recursive_lazy_load": measure(engine, lambda: recursive_lazy_load(args.limit, args.replies),
+                                           args.repeat),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare fan-out-on-write and fan-out-on-read for the home feed.
+
+One author with ``--followers`` followers publishes ``--posts`` posts; we time the write
+path (what ``create_post`` does) and then a follower's first feed page under each strategy.
+
+    python -m blog_api.benchmarks.bench_feed --followers 10000
+"""
+import argparse
+import json
+import math
+import statistics
+import time
+
+from sqlalchemy import insert
+
+from blog_api.main import create_app
+from blog_api.models import db, User, Post, Follower
+from blog_api import feed
+from blog_api.counters import rebuild_counters
+
+
+def seed(followers, other_authors, posts_per_author):
+    db.session.execute(insert(User), [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+        for i in range(followers + other_authors + 1)
+    ])
+    author_id = 1
+    follower_ids = range(2, followers + 2)
+    db.session.execute(insert(Follower), [{"follower_id": f, "followed_id": author_id} for f in follower_ids])
+    # The reader also follows a handful of small authors whose posts are always fanned out
+    reader_id = follower_ids[0]
+    others = range(followers + 2, followers + other_authors + 2)
+    db.session.execute(insert(Follower), [{"follower_id": reader_id, "followed_id": a} for a in others])
+    db.session.commit()
+    rebuild_counters()
+    for a in others:
+        for i in range(posts_per_author):
+            p = Post(title=f"Small {a}/{i}", content="x" * 200, author_id=a)
+            db.session.add(p)
+            db.session.flush()
+            feed.fan_out_post(p)
+    db.session.commit()
+    return author_id, reader_id
+
+
+def run(strategy, args):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": args.db,
+        "FEED_FANOUT_MAX_FOLLOWERS": args.followers if strategy == "fan-out-on-write" else 1,
+    })
+    with app.app_context():
+        db.create_all()
+        author_id, reader_id = seed(args.followers, args.other_authors, args.posts)
+
+        writes = []
+        for i in range(args.posts):
+            start = time.perf_counter()
+            p = Post(title=f"Big {i}", content="x" * 200, author_id=author_id)
+            db.session.add(p)
+            db.session.flush()
+            feed.fan_out_post(p)
+            db.session.commit()
+            writes.append(time.perf_counter() - start)
+
+        reads = []
+        for _ in range(args.reads):
+            start = time.perf_counter()
+            page, _ = feed.feed_page(reader_id, None, args.limit)
+            reads.append(time.perf_counter() - start)
+            db.session.expunge_all()
+        assert len(page) == args.limit
+
+        db.session.remove()
+        db.drop_all()
+
+    def ms(samples):
+        samples = sorted(samples)
+        return {
+            "mean_ms": round(statistics.mean(samples) * 1000, 3),
+            "p95_ms": round(samples[math.ceil(len(samples) * 0.95) - 1] * 1000, 3),
+        }
+    return {"strategy": strategy, "followers": args.followers, "write": ms(writes), "read": ms(reads)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--followers", type=int, default=10000)
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--other-authors", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--db", default="sqlite:///:memory:")
+    args = parser.parse_args()
+    print(json.dumps([run(s, args) for s in ("fan-out-on-write", "fan-out-on-read")], indent=2))
+
+
+if __name__ == "__main__":
+    main()
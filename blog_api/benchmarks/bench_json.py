@@ -0,0 +1,88 @@
+"""Serialization throughput for a page-sized list response.
+
+Encodes ``--rows`` posts (the ``GET /posts`` shape, built with ``serialize_post``) with Flask's
+stock provider, with ``JSONProvider`` on its stdlib fallback and on orjson. The orjson run is
+repeated with a slotted dataclass per row to show why the schemas are plain dicts.
+
+    python -m blog_api.benchmarks.bench_json --rows 100 --runs 2000
+"""
+import argparse
+import json
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from blog_api.schemas import serialize_post
+from blog_api.serialization import JSONProvider
+
+
+class Row:
+    """Stand-in for a loaded Post."""
+
+    def __init__(self, i):
+        self.id, self.title, self.content, self.author_id = i, f"Post title {i}", "Lorem ipsum " * 40, i % 97
+        self.created_at = datetime(2024, 1, 1) + timedelta(seconds=i, microseconds=i)
+        self.like_count, self.comment_count = i * 3, i % 11
+
+
+@dataclass(slots=True)
+class PostRecord:
+    id: int
+    title: str
+    content: str
+    author_id: int
+    created_at: datetime
+    like_count: int
+    comment_count: int
+
+    @classmethod
+    def from_model(cls, p):
+        return cls(p.id, p.title, p.content, p.author_id, p.created_at, p.like_count, p.comment_count)
+
+
+def measure(encode, build, rows, runs):
+    times = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = encode({"posts": [build(r) for r in rows], "next_cursor": None})
+        times.append(time.perf_counter() - start)
+        size = len(body)
+    per_call = statistics.median(times)
+    return {
+        "median_us": round(per_call * 1e6, 1),
+        "rows_per_s": round(len(rows) / per_call),
+        "mb_per_s": round(size / per_call / 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    rows = [Row(i) for i in range(args.rows)]
+    stock = DefaultJSONProvider(app)
+    fallback = JSONProvider(app)
+    fallback.fast = False
+    fast = JSONProvider(app)
+
+    results = {
+        "rows": args.rows,
+        "flask_default": measure(lambda o: stock.dumps(o, separators=(",", ":")), serialize_post, rows, args.runs),
+        "stdlib_fallback": measure(fallback.encode, serialize_post, rows, args.runs),
+    }
+    if fast.fast:
+        results["orjson"] = measure(fast.encode, serialize_post, rows, args.runs)
+        results["orjson_dataclasses"] = measure(fast.encode, PostRecord.from_model, rows, args.runs)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
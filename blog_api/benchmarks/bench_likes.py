@@ -0,0 +1,110 @@
+"""Round trips and latency of like/unlike through the HTTP layer.
+
+Counts SQL statements per request (excluding the JWT user lookup, which is cached) and times
+``PUT``/``DELETE /posts/<id>/like`` against the ``POST`` toggle, then hammers a single
+(user, post) pair from ``--threads`` threads and checks the counter stayed consistent.
+
+    python -m blog_api.benchmarks.bench_likes --posts 500 --threads 8
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+
+from sqlalchemy import event
+
+from blog_api.main import create_app
+from blog_api.models import db, Post
+
+
+def make_app(db_uri):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": db_uri,
+        "NOTIFICATIONS_MODE": "inline",
+        "BCRYPT_LOG_ROUNDS": 4,
+        "RATELIMIT_ENABLED": False,
+    })
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    client = app.test_client()
+    headers = []
+    for name in ("author", "liker"):
+        client.post("/register", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+        r = client.post("/login", json={"email": f"{name}@example.com", "password": "pw"})
+        headers.append({"Authorization": f"Bearer {r.get_json()['access_token']}"})
+    return app, client, headers
+
+
+def measure(app, client, calls):
+    """Run ``(method, path, headers)`` calls; return statements per call and latency."""
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(1)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    times = []
+    try:
+        for method, path, headers in calls:
+            start = time.perf_counter()
+            client.open(path, method=method, headers=headers)
+            times.append(time.perf_counter() - start)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return {
+        "statements_per_request": round(len(statements) / len(calls), 2),
+        "mean_ms": round(statistics.mean(times) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=50)
+    parser.add_argument("--db", default="sqlite:////tmp/bench_likes.db")
+    args = parser.parse_args()
+
+    app, client, (author, liker) = make_app(args.db)
+    ids = [client.post("/posts", json={"title": f"P{i}", "content": "Body"}, headers=author).get_json()["post"]["id"]
+           for i in range(args.posts)]
+    client.get("/notifications", headers=liker)  # warm the cached user
+
+    results = {
+        "toggle_like": measure(app, client, [("POST", f"/posts/{i}/like", liker) for i in ids]),
+        "toggle_unlike": measure(app, client, [("POST", f"/posts/{i}/like", liker) for i in ids]),
+        "put_like": measure(app, client, [("PUT", f"/posts/{i}/like", liker) for i in ids]),
+        "put_like_again": measure(app, client, [("PUT", f"/posts/{i}/like", liker) for i in ids]),
+        "delete_like": measure(app, client, [("DELETE", f"/posts/{i}/like", liker) for i in ids]),
+    }
+
+    statuses = []
+
+    def hammer():
+        c = app.test_client()
+        for n in range(args.per_thread):
+            method = "PUT" if n % 2 == 0 else "DELETE"
+            statuses.append(c.open(f"/posts/{ids[0]}/like", method=method, headers=liker).status_code)
+
+    threads = [threading.Thread(target=hammer) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    with app.app_context():
+        likes = db.session.get(Post, ids[0]).like_count
+    results["contended_pair"] = {
+        "requests": len(statuses),
+        "req_per_s": round(len(statuses) / elapsed, 1),
+        "server_errors": sum(s >= 500 for s in statuses),
+        "like_count_consistent": likes in (0, 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
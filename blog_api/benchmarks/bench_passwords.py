@@ -0,0 +1,59 @@
+"""Logins/sec per core for each password hashing setting.
+
+Each setting verifies a stored hash ``--logins`` times through ``PasswordHasher`` with one worker
+and with ``--workers`` workers, and reports throughput divided by the workers used.
+
+    python -m blog_api.benchmarks.bench_passwords
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blog_api.config import Config
+from blog_api.passwords import PasswordHasher
+
+SETTINGS = [
+    {"PASSWORD_HASH_ALGORITHM": "bcrypt", "BCRYPT_LOG_ROUNDS": 10},
+    {"PASSWORD_HASH_ALGORITHM": "bcrypt", "BCRYPT_LOG_ROUNDS": 12},
+    {"PASSWORD_HASH_ALGORITHM": "scrypt", "SCRYPT_N": 2 ** 14},
+    {"PASSWORD_HASH_ALGORITHM": "scrypt", "SCRYPT_N": 2 ** 15},
+    {"PASSWORD_HASH_ALGORITHM": "pbkdf2", "PBKDF2_ITERATIONS": 300000},
+    {"PASSWORD_HASH_ALGORITHM": "pbkdf2", "PBKDF2_ITERATIONS": 600000},
+]
+
+
+def measure(setting, workers, logins):
+    config = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    config.update(setting, PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_MAX_PENDING=logins)
+    hasher = PasswordHasher(config)
+    stored = hasher.hash("correct horse battery staple")
+    # Many request threads competing for the pool, as during a login spike
+    with ThreadPoolExecutor(max(workers * 4, 1)) as clients:
+        start = time.perf_counter()
+        assert all(clients.map(lambda _: hasher.verify(stored, "correct horse battery staple"), range(logins)))
+        elapsed = time.perf_counter() - start
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    results = []
+    for setting in SETTINGS:
+        single = measure(setting, 1, args.logins)
+        pooled = measure(setting, args.workers, args.logins * args.workers)
+        results.append({
+            "setting": setting,
+            "logins_per_sec_1_worker": round(single, 1),
+            f"logins_per_sec_{args.workers}_workers": round(pooled, 1),
+            "logins_per_sec_per_core": round(pooled / args.workers, 1),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
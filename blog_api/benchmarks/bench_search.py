@@ -0,0 +1,97 @@
+"""Search latency over a synthetic corpus (1M documents by default).
+
+Documents are written straight into the SQLite FTS5 index with a Zipf-distributed vocabulary,
+then ``search.search`` is timed for common, mid-frequency and rare terms, first and deep pages.
+
+    python -m blog_api.benchmarks.bench_search --docs 1000000
+"""
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from blog_api.main import create_app
+from blog_api.models import db
+from blog_api import search
+
+
+def populate(docs, words_per_doc, vocabulary, seed):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocabulary)]
+    weights = [1 / (i + 1) for i in range(vocabulary)]
+    insert = text("INSERT INTO search_index (rowid, title, body, post_id) VALUES (:rowid, :title, :body, :post_id)")
+    batch = []
+    for doc in range(1, docs + 1):
+        words = rng.choices(vocab, weights, k=words_per_doc)
+        batch.append({"rowid": doc, "title": " ".join(words[:5]), "body": " ".join(words[5:]), "post_id": doc // 2})
+        if len(batch) == 10000:
+            db.session.execute(insert, batch)
+            batch = []
+    if batch:
+        db.session.execute(insert, batch)
+    db.session.commit()
+    db.session.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+    db.session.commit()
+    return vocab
+
+
+def timed_pages(q, limit, pages, runs):
+    first, deep = [], []
+    for _ in range(runs):
+        cursor = None
+        for page in range(pages):
+            start = time.perf_counter()
+            _, cursor = search.search(q, cursor, limit)
+            (first if page == 0 else deep).append(time.perf_counter() - start)
+            if not cursor:
+                break
+    return first, deep
+
+
+def summary(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(samples[math.ceil(len(samples) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--words-per-doc", type=int, default=40)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default="sqlite:///:memory:")
+    args = parser.parse_args()
+
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": args.db})
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        vocab = populate(args.docs, args.words_per_doc, args.vocabulary, args.seed)
+        build_s = time.perf_counter() - start
+        queries = {
+            "common": vocab[0],
+            "mid": vocab[len(vocab) // 100],
+            "rare": vocab[-1],
+            "two_terms": f"{vocab[10]} {vocab[200]}",
+        }
+        results = {}
+        for name, q in queries.items():
+            first, deep = timed_pages(q, args.limit, args.pages, args.runs)
+            results[name] = {"query": q, "first_page": summary(first), "later_pages": summary(deep)}
+    print(json.dumps({"docs": args.docs, "index_build_s": round(build_s, 1), "queries": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
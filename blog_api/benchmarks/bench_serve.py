@@ -0,0 +1,114 @@
+"""Read throughput of ``flask serve`` as the number of worker processes grows.
+
+Generates a data set with ``datagen`` into an SQLite file, then for each ``--workers`` count
+starts ``flask serve`` with ``--threads`` threads per worker and drives it for ``--seconds`` from
+``--clients`` client processes. Each client keeps one keep-alive connection and requests
+``GET /posts``, ``GET /posts/<id>`` and ``GET /posts/<id>/comments`` at random. Reports req/s,
+errors and the speedup over the first worker count. The response cache is off unless
+``--cache`` is given, so requests reach the database.
+
+Clients and workers share the machine, so near-linear scaling needs more cores than workers
+plus the cores the clients saturate; ``cpu_count`` is reported alongside.
+
+    python -m blog_api.benchmarks.bench_serve --workers 1 2 4 --clients 8
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from blog_api.main import create_app
+from blog_api.models import db, Post
+from blog_api import migrations
+from blog_api.benchmarks.datagen import generate
+
+
+def client(address, post_ids, seconds, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(*address, timeout=30)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        post_id = rng.choice(post_ids)
+        path = rng.choice(("/posts", f"/posts/{post_id}", f"/posts/{post_id}/comments"))
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            errors += response.status >= 500
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(*address, timeout=30)
+        done += 1
+    return done, errors
+
+
+def start_server(args, env, workers):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "blog_api.main", "serve", "--port", "0",
+         "--workers", str(workers), "--threads", str(args.threads)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    host, port = server.stdout.readline().split("http://")[1].split()[0].split(":")
+    address = (host, int(port))
+    for _ in range(100):  # until the workers have warmed up and accept
+        try:
+            conn = http.client.HTTPConnection(*address, timeout=30)
+            conn.request("GET", "/posts")
+            conn.getresponse().read()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return server, address
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--db", default="/tmp/bench_serve.db", help="SQLite file")
+    args = parser.parse_args()
+
+    uri = f"sqlite:///{args.db}"
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    with create_app({"SQLALCHEMY_DATABASE_URI": uri}).app_context():
+        migrations.upgrade()
+        counts = generate(users=args.users, seed=1)
+        post_ids = [pid for (pid,) in db.session.query(Post.id)]
+
+    env = dict(os.environ, DATABASE_URI=uri, CACHE_ENABLED=str(args.cache), METRICS_ENABLED="false",
+               RATELIMIT_ENABLED="false")
+    results = {"cpu_count": os.cpu_count(), "rows": counts, "threads": args.threads, "clients": args.clients,
+               "runs": []}
+    for workers in args.workers:
+        server, address = start_server(args, env, workers)
+        try:
+            with ProcessPoolExecutor(args.clients) as pool:
+                outcomes = list(pool.map(client, [address] * args.clients, [post_ids] * args.clients,
+                                         [args.seconds] * args.clients, range(args.clients)))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        done = sum(n for n, _ in outcomes)
+        results["runs"].append({"workers": workers, "requests": done, "errors": sum(e for _, e in outcomes),
+                                "req_per_s": round(done / args.seconds, 1)})
+    first = results["runs"][0]
+    for run in results["runs"]:
+        run["speedup"] = round(run["req_per_s"] / first["req_per_s"], 2)
+        run["efficiency"] = round(run["speedup"] * first["workers"] / run["workers"], 2)  # 1.0 is linear
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Cold start of a worker: import, ``create_app`` and the first requests.
+
+Each run is a fresh interpreter (``--runs`` of them, medians reported), as an autoscaled worker
+would be. It times importing ``blog_api.main``, ``create_app()``, the first ``GET /posts`` (which
+opens the first database connection) and the first and a repeated ``GET /apispec_1.json``. For
+comparison it also times ``db.create_all()`` against the already migrated database, the work
+every process used to do at import before the schema moved to ``flask db upgrade``.
+
+    python -m blog_api.benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def child(db_uri):
+    timings = {}
+    start = time.perf_counter()
+    from blog_api.main import create_app
+    from blog_api.models import db
+    timings["import_ms"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app = create_app({"SQLALCHEMY_DATABASE_URI": db_uri, "METRICS_ENABLED": False})
+    timings["create_app_ms"] = time.perf_counter() - start
+
+    client = app.test_client()
+    for name, path in (("first_get_posts_ms", "/posts"), ("first_apispec_ms", "/apispec_1.json"),
+                       ("cached_apispec_ms", "/apispec_1.json")):
+        start = time.perf_counter()
+        assert client.get(path).status_code == 200
+        timings[name] = time.perf_counter() - start
+
+    with app.app_context():
+        start = time.perf_counter()
+        db.create_all()
+        timings["create_all_ms"] = time.perf_counter() - start
+    print(json.dumps({k: v * 1000 for k, v in timings.items()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--db", default="sqlite:////tmp/bench_startup.db")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.db)
+
+    from blog_api.main import create_app
+    from blog_api import migrations
+    with create_app({"SQLALCHEMY_DATABASE_URI": args.db}).app_context():
+        migrations.upgrade()
+
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-m", "blog_api.benchmarks.bench_startup", "--child", "--db", args.db],
+                             check=True, capture_output=True, text=True).stdout
+        run = json.loads(out.strip().splitlines()[-1])
+        run["process_total_ms"] = (time.perf_counter() - start) * 1000
+        runs.append(run)
+    results = {key: round(statistics.median(r[key] for r in runs), 2) for key in runs[0]}
+    results["runs"] = args.runs
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
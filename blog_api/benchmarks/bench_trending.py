@@ -0,0 +1,90 @@
+"""Top-N trending posts: score table vs. aggregating engagement at read time.
+
+Generates a data set with ``datagen``, replays every like and comment into the trending scores
+at a random time within the last ``--hours``, then times fetching the top ``--limit`` posts
+from the indexed score table, from the in-process snapshot (``GET /posts/trending``), and by
+aggregating ``post_likes`` and ``comments`` per post as the naive alternative. Also reports the
+cost of one incremental score update.
+
+    python -m blog_api.benchmarks.bench_trending --users 2000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import func, select
+
+from blog_api.main import create_app
+from blog_api.models import db, Comment, Post, PostLike, PostScore
+from blog_api.benchmarks.datagen import generate
+from blog_api import trending
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1000, 3)
+
+
+def aggregate_top(limit):
+    """Rank by likes + 2 * comments, computed from the source tables (no time decay even)."""
+    likes = select(PostLike.post_id.label("post_id"), func.count().label("n")).group_by(PostLike.post_id).subquery()
+    comments = select(Comment.post_id.label("post_id"), func.count().label("n")).group_by(Comment.post_id).subquery()
+    score = func.coalesce(likes.c.n, 0) + 2 * func.coalesce(comments.c.n, 0)
+    return (db.session.query(Post).outerjoin(likes, likes.c.post_id == Post.id)
+            .outerjoin(comments, comments.c.post_id == Post.id).order_by(score.desc()).limit(limit).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--hours", type=float, default=48, help="spread of replayed engagement")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", default="sqlite:////tmp/bench_trending.db")
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db, "BCRYPT_LOG_ROUNDS": 4, "CACHE_ENABLED": False,
+                      "TRENDING_REFRESH_SECONDS": 3600, "TRENDING_DECAY_SECONDS": 0})
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        counts = generate(users=args.users, seed=args.seed)
+        now = time.time()
+        trending.load_epoch()
+        events = [(pid, "like") for (pid,) in db.session.query(PostLike.post_id)]
+        events += [(pid, "comment") for (pid,) in db.session.query(Comment.post_id)]
+        for post_id, kind in events:
+            trending.record(post_id, kind, now=now - rng.random() * args.hours * 3600)
+        db.session.commit()
+        rescaled, removed = trending.decay()
+
+        post_ids = [pid for (pid,) in db.session.query(Post.id)]
+
+        def one_update():
+            trending.record(rng.choice(post_ids), "like")
+            db.session.commit()
+
+        client.get("/posts/trending")  # load the snapshot
+        results = {
+            "rows": counts,
+            "scored_posts": db.session.query(func.count()).select_from(PostScore).scalar(),
+            "decay": {"rescaled": rescaled, "removed": removed, "ms": timed(trending.decay, 5)},
+            "top_from_score_index_ms": timed(lambda: trending.top(args.limit), args.repeat),
+            "top_from_snapshot_http_ms": timed(lambda: client.get(f"/posts/trending?limit={args.limit}"), args.repeat),
+            "top_by_aggregating_engagement_ms": timed(lambda: aggregate_top(args.limit), max(1, args.repeat // 10)),
+            "incremental_update_ms": timed(one_update, args.repeat),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Seeded synthetic social graph: users, follows, posts, comments, likes and notifications.
+
+Popularity follows a power law: every user gets a Pareto-distributed weight that decides how
+many followers they attract and how many likes/comments their posts draw, and activity (posts
+written, accounts followed) is heavy-tailed too. The same ``--seed`` and ``--users`` always
+produce the same data, so numbers from different commits are comparable.
+
+    python -m blog_api.benchmarks.datagen --db sqlite:///bench.db --users 10000
+
+Every generated user's password is ``BENCH_PASSWORD``.
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+
+from blog_api.main import create_app
+from blog_api.models import db, User, Post, Comment, PostLike, Follower, Notification, TimelineEntry
+from blog_api.counters import rebuild_counters
+from blog_api.passwords import hasher
+from blog_api import search
+from blog_api.threads import ID_WIDTH
+
+BENCH_PASSWORD = "bench-password"
+EPOCH = datetime(2024, 1, 1)
+WORDS = ("flask api python database index query cache latency feed post comment like follow "
+         "notification search scale shard replica pool thread worker queue batch stream json").split()
+CHUNK = 5000
+MAX_DEPTH = 8
+
+
+def _chunked_insert(model, rows):
+    for i in range(0, len(rows), CHUNK):
+        db.session.execute(insert(model), rows[i:i + CHUNK])
+
+
+def _text(rng, n):
+    return " ".join(rng.choices(WORDS, k=n))
+
+
+def _heavy_tail(rng, mean, alpha=1.5, cap=None):
+    """Integer with a Pareto tail and roughly the given mean."""
+    value = int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha)
+    return min(value, cap) if cap is not None else value
+
+
+def thread_key(comment_id):
+    return f"{comment_id:0{ID_WIDTH}d}"
+
+
+def generate(users=1000, follows_per_user=20, posts_per_user=5, comments_per_post=3, likes_per_post=8,
+             notifications_per_user=10, alpha=1.2, seed=1, reply_ratio=0.5):
+    """Fill the current app's database; returns the row count of each table.
+
+    ``reply_ratio`` of the comments reply to an earlier comment on the same post.
+    """
+    rng = random.Random(seed)
+    password = hasher().hash(BENCH_PASSWORD)
+    user_ids = list(range(1, users + 1))
+    popularity = [rng.paretovariate(alpha) for _ in user_ids]
+
+    _chunked_insert(User, [
+        {"id": u, "username": f"user{u}", "email": f"user{u}@example.com", "password": password,
+         "created_at": EPOCH}
+        for u in user_ids
+    ])
+
+    follows = set()
+    for u in user_ids:
+        wanted = _heavy_tail(rng, follows_per_user, cap=users - 1)
+        for target in rng.choices(user_ids, popularity, k=wanted):
+            if target != u:
+                follows.add((u, target))
+    _chunked_insert(Follower, [{"follower_id": a, "followed_id": b} for a, b in sorted(follows)])
+
+    posts = []
+    for u in user_ids:
+        for _ in range(_heavy_tail(rng, posts_per_user)):
+            posts.append({"id": len(posts) + 1, "author_id": u, "title": _text(rng, 6).capitalize(),
+                          "content": _text(rng, 60),
+                          "created_at": EPOCH + timedelta(seconds=rng.randrange(90 * 86400))})
+    for p in posts:
+        p["updated_at"] = p["created_at"]
+    _chunked_insert(Post, posts)
+
+    # Popular authors' posts draw more comments and likes
+    post_weights = [popularity[p["author_id"] - 1] for p in posts]
+    total = len(posts)
+    comments, likes = [], set()
+    if posts:
+        by_post = {}
+        for post in rng.choices(posts, post_weights, k=total * comments_per_post):
+            comment = {"id": len(comments) + 1, "post_id": post["id"], "author_id": rng.choice(user_ids),
+                       "content": _text(rng, 20), "parent_id": None, "root_id": None, "path": None, "depth": 0}
+            siblings = by_post.setdefault(post["id"], [])
+            parent = rng.choice(siblings) if siblings and rng.random() < reply_ratio else None
+            if parent is not None and parent["depth"] < MAX_DEPTH:
+                comment.update(parent_id=parent["id"], root_id=parent["root_id"] or parent["id"],
+                               path=f"{parent['path'] or thread_key(parent['id'])}/{thread_key(comment['id'])}",
+                               depth=parent["depth"] + 1)
+                created = parent["created_at"] + timedelta(seconds=rng.randrange(3600))
+            else:
+                created = post["created_at"] + timedelta(seconds=rng.randrange(86400))
+            comment["created_at"] = comment["updated_at"] = created
+            siblings.append(comment)
+            comments.append(comment)
+        for post in rng.choices(posts, post_weights, k=total * likes_per_post):
+            likes.add((post["id"], rng.choice(user_ids)))
+    _chunked_insert(Comment, comments)
+    _chunked_insert(PostLike, [{"post_id": p, "user_id": u, "is_like": True} for p, u in sorted(likes)])
+
+    post_author = {p["id"]: p["author_id"] for p in posts}
+    sources = sorted([("like_post", p, u, post_author[p]) for p, u in likes] +
+                     [("follow", 0, a, b) for a, b in follows])
+    notifications = []
+    for type, post_id, actor, recipient in rng.sample(sources, min(len(sources), users * notifications_per_user)):
+        notifications.append({
+            "user_id": recipient, "actor_id": actor, "type": type, "post_id": post_id or None,
+            "is_read": rng.random() < 0.7, "message": f"user{actor} interacted with you.",
+            "created_at": EPOCH + timedelta(seconds=rng.randrange(90 * 86400)),
+        })
+    _chunked_insert(Notification, notifications)
+    db.session.commit()
+
+    rebuild_counters()
+    # Fan out existing posts of authors under the threshold, as create_post would have
+    threshold = current_app.config["FEED_FANOUT_MAX_FOLLOWERS"]
+    db.session.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"],
+        select(Follower.follower_id, Post.id, Post.author_id, Post.created_at)
+        .join(Post, Post.author_id == Follower.followed_id)
+        .join(User, User.id == Post.author_id)
+        .where(User.follower_count <= threshold)
+    ))
+    # ...and mark the rest as pulled at read time, as migrations.record_fan_out does
+    db.session.execute(update(Post).where(Post.author_id.in_(
+        select(User.id).where(User.follower_count > threshold)
+    )).values(fanned_out=False))
+    db.session.commit()
+    search.rebuild_index()
+
+    return {m.__tablename__: db.session.scalar(select(func.count()).select_from(m))
+            for m in (User, Follower, Post, Comment, PostLike, Notification, TimelineEntry)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="database URI to create tables in and fill")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--follows-per-user", type=int, default=20)
+    parser.add_argument("--posts-per-user", type=int, default=5)
+    parser.add_argument("--comments-per-post", type=int, default=3)
+    parser.add_argument("--likes-per-post", type=int, default=8)
+    parser.add_argument("--notifications-per-user", type=int, default=10)
+    parser.add_argument("--reply-ratio", type=float, default=0.5, help="share of comments that are replies")
+    parser.add_argument("--alpha", type=float, default=1.2, help="Pareto shape of user popularity")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db, "BCRYPT_LOG_ROUNDS": 4})
+    with app.app_context():
+        db.create_all()
+        counts = generate(args.users, args.follows_per_user, args.posts_per_user, args.comments_per_post,
+                          args.likes_per_post, args.notifications_per_user, args.alpha, args.seed, args.reply_ratio)
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Mixed read/write load against the whole app, with latency percentiles per endpoint.
+
+A synthetic graph is generated with ``datagen`` (or an existing one reused with ``--no-generate``),
+then ``--concurrency`` clients send ``--requests`` requests drawn from a weighted mix of reads
+(post lists and details, comments, feed, search, notifications) and writes (posts, comments,
+likes, follows), acting as random generated users. ``--transport client`` goes through Flask's
+test client in-process; ``--transport wsgi`` starts a threaded WSGI server on a local port and
+speaks real HTTP/1.1, which adds sockets and the server's own overhead.
+
+    python -m blog_api.benchmarks.scenarios --db sqlite:////tmp/bench.db --users 2000 --mix mixed
+    python -m blog_api.benchmarks.scenarios --db sqlite:////tmp/bench.db --no-generate --transport wsgi
+
+The JSON report (p50/p95/p99 and req/s per endpoint, plus the git revision) can be saved with
+``--output`` and compared across commits.
+"""
+import argparse
+import http.client
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+from functools import partial
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from blog_api.main import create_app
+from blog_api.models import db
+from blog_api.benchmarks import datagen
+
+WORDS = datagen.WORDS
+
+# (label, weight) for each mix; labels are the keys of OPERATIONS
+MIXES = {
+    "read-heavy": {"list_posts": 30, "get_post": 25, "list_comments": 10, "feed": 20, "search": 5,
+                   "notifications": 8, "create_post": 1, "create_comment": 1},
+    "mixed": {"list_posts": 15, "get_post": 15, "list_comments": 10, "feed": 15, "search": 5,
+              "notifications": 10, "create_post": 8, "create_comment": 10, "like": 10, "follow": 2},
+    "write-heavy": {"list_posts": 5, "get_post": 10, "feed": 10, "notifications": 5,
+                    "create_post": 20, "create_comment": 25, "like": 20, "follow": 5},
+}
+
+
+def _list_posts(rng, ctx):
+    return "GET", "/posts?limit=20", None
+
+
+def _get_post(rng, ctx):
+    return "GET", f"/posts/{rng.randint(1, ctx['posts'])}", None
+
+
+def _list_comments(rng, ctx):
+    return "GET", f"/posts/{rng.randint(1, ctx['posts'])}/comments?limit=20", None
+
+
+def _feed(rng, ctx):
+    return "GET", "/feed?limit=20", None
+
+
+def _search(rng, ctx):
+    return "GET", f"/search?q={rng.choice(WORDS)}+{rng.choice(WORDS)}", None
+
+
+def _notifications(rng, ctx):
+    return "GET", "/notifications?limit=20", None
+
+
+def _create_post(rng, ctx):
+    return "POST", "/posts", {"title": " ".join(rng.choices(WORDS, k=6)),
+                              "content": " ".join(rng.choices(WORDS, k=60))}
+
+
+def _create_comment(rng, ctx):
+    post_id = rng.randint(1, ctx["posts"])
+    return "POST", f"/posts/{post_id}/comments", {"content": " ".join(rng.choices(WORDS, k=20))}
+
+
+def _like(rng, ctx):
+    return "POST", f"/posts/{rng.randint(1, ctx['posts'])}/like", None
+
+
+def _follow(rng, ctx):
+    return "POST", f"/follow/user{rng.randint(1, ctx['users'])}", None
+
+
+OPERATIONS = {
+    "list_posts": _list_posts, "get_post": _get_post, "list_comments": _list_comments, "feed": _feed,
+    "search": _search, "notifications": _notifications, "create_post": _create_post,
+    "create_comment": _create_comment, "like": _like, "follow": _follow,
+}
+
+
+class ClientTransport:
+    """Flask test client; one per worker thread."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body, headers):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+    def close(self):
+        pass
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class WSGIServer:
+    """Threaded werkzeug server on an ephemeral local port, run in a background thread."""
+
+    def __init__(self, app):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_KeepAliveHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class HTTPTransport:
+    """Persistent HTTP/1.1 connection to a ``WSGIServer``; one per worker thread."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    def request(self, method, path, body, headers):
+        headers = dict(headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        self.conn.request(method, path, payload, headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        self.conn.close()
+
+
+def login(transport, username):
+    status, body = transport.request("POST", "/login", {"email": f"{username}@example.com",
+                                                         "password": datagen.BENCH_PASSWORD}, {})
+    if status != 200:
+        raise RuntimeError(f"Login as {username} failed with {status}")
+    return {"Authorization": f"Bearer {body['access_token']}"}
+
+
+def percentile(samples, q):
+    return samples[max(math.ceil(len(samples) * q) - 1, 0)]
+
+
+def summarize(samples, errors, elapsed):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "req_per_s": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+    }
+
+
+def run(transport_factory, mix, requests, concurrency, ctx, seed):
+    """Drive the app with ``concurrency`` threads; returns the JSON-ready report body."""
+    labels, weights = zip(*MIXES[mix].items())
+    per_worker = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    samples = {label: [] for label in labels}
+    errors = dict.fromkeys(labels, 0)
+    lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+
+    def worker(i, count):
+        rng = random.Random(seed * 1000 + i)
+        transport = transport_factory()
+        try:
+            try:
+                headers = login(transport, f"user{rng.randint(1, ctx['users'])}")
+            except Exception:
+                ready.abort()
+                raise
+            plan = rng.choices(labels, weights, k=count)
+            timings = [None] * count
+            failed = [False] * count
+            ready.wait()
+            for n, label in enumerate(plan):
+                method, path, body = OPERATIONS[label](rng, ctx)
+                start = time.perf_counter()
+                status, _ = transport.request(method, path, body, headers)
+                timings[n] = time.perf_counter() - start
+                failed[n] = status >= 500
+            with lock:
+                for label, t, f in zip(plan, timings, failed):
+                    samples[label].append(t)
+                    errors[label] += f
+        finally:
+            transport.close()
+
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_worker)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize([t for ts in samples.values() for t in ts], sum(errors.values()), elapsed),
+        "endpoints": {label: summarize(samples[label], errors[label], elapsed)
+                      for label in sorted(samples) if samples[label]},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite:////tmp/blog_bench.db")
+    parser.add_argument("--no-generate", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--transport", choices=("client", "wsgi"), default="client")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    # Rate limits would throttle the simulated users long before the server is saturated
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db, "BCRYPT_LOG_ROUNDS": 4, "RATELIMIT_ENABLED": False})
+    with app.app_context():
+        if not args.no_generate:
+            db.drop_all()
+            db.create_all()
+            dataset = datagen.generate(users=args.users, seed=args.seed)
+        else:
+            dataset = {"users": db.session.scalar(db.text("SELECT COUNT(*) FROM users")),
+                       "posts": db.session.scalar(db.text("SELECT COUNT(*) FROM posts"))}
+        db.session.remove()
+    ctx = {"users": dataset["users"], "posts": dataset["posts"]}
+
+    server = None
+    if args.transport == "wsgi":
+        server = WSGIServer(app)
+        factory = partial(HTTPTransport, server.port)
+    else:
+        factory = partial(ClientTransport, app)
+    try:
+        report = run(factory, args.mix, args.requests, args.concurrency, ctx, args.seed)
+    finally:
+        if server is not None:
+            server.stop()
+        app.extensions["notifications"].stop()
+
+    report = {"revision": git_revision(), "transport": args.transport, "mix": args.mix,
+              "concurrency": args.concurrency, "dataset": dataset, **report}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ CREATE TABLE users (
     username VARCHAR(120) NOT NULL UNIQUE,
     email VARCHAR(500) NOT NULL UNIQUE,
     password VARCHAR(1000) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    follower_count INT NOT NULL DEFAULT 0,
+    following_count INT NOT NULL DEFAULT 0
 );
 
 -- Posts
@@ -18,7 +20,16 @@ CREATE TABLE posts (
     author_id INT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE CASCADE
+    like_count INT NOT NULL DEFAULT 0,
+    comment_count INT NOT NULL DEFAULT 0,
+    deleted_at DATETIME NULL,
+    fanned_out BOOLEAN NOT NULL DEFAULT TRUE,
+    FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_posts_created_at_id (created_at, id),
+    INDEX idx_posts_author_created_at_id (author_id, created_at, id),
+    INDEX idx_posts_deleted_at (deleted_at),
+    INDEX idx_posts_fanned_out_author_created_at_id (fanned_out, author_id, created_at, id),
+    FULLTEXT INDEX ft_posts_title_content (title, content)
 );
 
 -- Comments
@@ -29,8 +40,22 @@ CREATE TABLE comments (
     author_id INT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    parent_id INT NULL,
+    root_id INT NULL,
+    path VARCHAR(255) NULL,
+    depth INT NOT NULL DEFAULT 0,
+    like_count INT NOT NULL DEFAULT 0,
+    reply_count INT NOT NULL DEFAULT 0,
+    deleted_at DATETIME NULL,
+    INDEX idx_comments_post_created_at_id (post_id, created_at, id),
+    INDEX idx_comments_post_depth_created_at_id (post_id, depth, created_at, id),
+    INDEX idx_comments_root_path (root_id, path),
+    INDEX idx_comments_parent (parent_id),
+    INDEX idx_comments_deleted_at (deleted_at),
+    FULLTEXT INDEX ft_comments_content (content),
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-    FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE CASCADE
+    FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (parent_id) REFERENCES comments(id) ON DELETE CASCADE
 );
 
 -- Post Likes
@@ -61,10 +86,40 @@ CREATE TABLE followers (
     follower_id INT NOT NULL,
     followed_id INT NOT NULL,
     UNIQUE KEY unique_follow (follower_id, followed_id),
+    INDEX idx_followers_followed (followed_id),
     FOREIGN KEY (follower_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (followed_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Timelines (home feed entries pushed to followers on post creation)
+CREATE TABLE timelines (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    post_id INT NOT NULL,
+    author_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    UNIQUE KEY unique_timeline_post (user_id, post_id),
+    INDEX idx_timelines_user_created_at_post (user_id, created_at, post_id),
+    INDEX idx_timelines_post (post_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
+    FOREIGN KEY (author_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Trending: time-decayed post scores, all scaled to trending_state.epoch
+CREATE TABLE post_scores (
+    post_id INT PRIMARY KEY,
+    score DOUBLE NOT NULL,
+    epoch DOUBLE NOT NULL,
+    INDEX idx_post_scores_score (score),
+    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE
+);
+
+CREATE TABLE trending_state (
+    id INT PRIMARY KEY,
+    epoch DOUBLE NOT NULL
+);
+
 -- Notifications
 CREATE TABLE notifications (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -75,10 +130,57 @@ CREATE TABLE notifications (
     comment_id INT NULL,
     is_read BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    message VARCHAR(256) NOT NULL,
+    INDEX idx_notifications_user_created_at_id (user_id, created_at, id),
+    INDEX idx_notifications_user_unread_created_at (user_id, is_read, created_at),
+    INDEX idx_notifications_user_id (user_id, id),
+    INDEX idx_notifications_post (post_id),
+    INDEX idx_notifications_comment (comment_id),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (actor_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
     FOREIGN KEY (comment_id) REFERENCES comments(id) ON DELETE CASCADE
 );
 
+-- Notification outbox (NOTIFICATIONS_MODE = "outbox"); drained into notifications by a worker
+CREATE TABLE notification_outbox (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    actor_id INT NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    post_id INT NULL,
+    comment_id INT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 
+-- Read notifications archived by the prune job (NOTIFICATIONS_ARCHIVE = True)
+CREATE TABLE notifications_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    actor_id INT NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    post_id INT NULL,
+    comment_id INT NULL,
+    is_read BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP NULL,
+    message VARCHAR(256) NOT NULL,
+    INDEX idx_notifications_archive_user_created_at (user_id, created_at)
+);
+
+-- Maintenance job schedule, leases and last results
+CREATE TABLE job_runs (
+    name VARCHAR(64) PRIMARY KEY,
+    locked_until DATETIME NULL,
+    last_started DATETIME NULL,
+    last_finished DATETIME NULL,
+    last_duration DOUBLE NULL,
+    last_rows INT NULL,
+    last_error VARCHAR(500) NULL
+);
+
+-- Applied schema migrations (flask db upgrade)
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at DATETIME NOT NULL
+);
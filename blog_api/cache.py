@@ -0,0 +1,184 @@
+"""Response cache for public read endpoints.
+
+Cached views are keyed by path + query string and by a *generation* number for each
+namespace they depend on (``"posts"``, ``"comments:<post_id>"``). Writes call
+``cache.invalidate(namespace)`` after committing, which bumps the generation so every
+dependent entry misses from then on; stale entries simply age out of the backend.
+
+Every cached response carries an ``ETag`` and honours ``If-None-Match`` with a 304.
+
+A caller pinned to the primary after a write (see ``database.is_sticky``) bypasses the cache:
+an entry filled from a lagging replica would hide its own write from it.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, make_response, request
+
+from blog_api import database
+
+
+class MemoryCache:
+    """Per-process LRU with a TTL per entry."""
+
+    def __init__(self, max_entries=10000, default_ttl=30):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (0, None))
+            self._data[key] = (value + 1, expires)
+            self._data.move_to_end(key)
+            return value + 1
+
+
+class SQLiteCache:
+    """Key-value store in a local SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path, default_ttl=30):
+        self.path = path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires >= ?)", (key, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                     (key, pickle.dumps(value), time.time() + ttl if ttl else None))
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            value = (self.get(key) or 0) + 1
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, NULL)",
+                         (key, pickle.dumps(value)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+
+def make_backend(app):
+    cfg = app.config
+    if cfg["CACHE_BACKEND"] == "sqlite":
+        path = cfg["CACHE_SQLITE_PATH"] or os.path.join(app.instance_path, "cache.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteCache(path, cfg["CACHE_DEFAULT_TTL"])
+    if cfg["CACHE_BACKEND"] == "memory":
+        return MemoryCache(cfg["CACHE_MAX_ENTRIES"], cfg["CACHE_DEFAULT_TTL"])
+    raise ValueError(f"Unknown CACHE_BACKEND {cfg['CACHE_BACKEND']!r}")
+
+
+class ResponseCache:
+
+    def init_app(self, app):
+        app.extensions["cache"] = make_backend(app)
+
+    @property
+    def backend(self):
+        return current_app.extensions["cache"]
+
+    def invalidate(self, *namespaces):
+        if not current_app.config["CACHE_ENABLED"]:
+            return
+        for ns in namespaces:
+            self.backend.incr(f"gen:{ns}")
+
+    def _key(self, namespaces):
+        generations = ",".join(f"{ns}={self.backend.get(f'gen:{ns}') or 0}" for ns in namespaces)
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f"view:{request.path}?{query}|{request.headers.get('Accept', '')}|{generations}"
+
+    def cached(self, *namespaces, ttl=None):
+        """Cache a GET view's 200 responses. Namespaces may use the view's URL arguments,
+        e.g. ``cached("comments:{post_id}")``."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not current_app.config["CACHE_ENABLED"] or database.is_sticky():
+                    return _conditional(make_response(view(*args, **kwargs)))
+                key = self._key([ns.format(**kwargs) for ns in namespaces])
+                entry = self.backend.get(key)
+                if entry is not None:
+                    body, status, mimetype = entry
+                    response = current_app.response_class(body, status=status, mimetype=mimetype)
+                    response.headers["X-Cache"] = "HIT"
+                    return _conditional(response)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, (response.get_data(), response.status_code, response.mimetype), ttl)
+                response.headers["X-Cache"] = "MISS"
+                return _conditional(response)
+            return wrapper
+        return decorator
+
+
+def _conditional(response):
+    if response.status_code == 200 and not response.is_streamed:
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+        response.make_conditional(request)
+    return response
+
+
+cache = ResponseCache()
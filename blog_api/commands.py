@@ -0,0 +1,92 @@
+import json
+
+import click
+
+from blog_api.counters import rebuild_counters
+from blog_api.search import rebuild_index
+from blog_api.trending import decay
+from blog_api import jobs
+from blog_api import migrations
+from blog_api import server
+
+
+def init_commands(app):
+
+    @app.cli.command("rebuild-counters")
+    @click.option("--chunk-size", default=1000, show_default=True, help="Rows updated per transaction.")
+    def rebuild_counters_command(chunk_size):
+        """Recompute like/comment/follower counters from source tables."""
+        rows = rebuild_counters(chunk_size)
+        click.echo(f"Rebuilt counters on {rows} rows.")
+
+    @app.cli.command("search-reindex")
+    @click.option("--chunk-size", default=1000, show_default=True, help="Documents indexed per transaction.")
+    def search_reindex_command(chunk_size):
+        """Rebuild the SQLite full-text index from posts and comments (MySQL indexes itself)."""
+        docs = rebuild_index(chunk_size)
+        click.echo(f"Indexed {docs} documents.")
+
+    @app.cli.command("decay-trending")
+    def decay_trending_command():
+        """Rebase trending scores to now and delete the ones that have decayed away."""
+        rescaled, removed = decay()
+        click.echo(f"Rescaled {rescaled} trending scores, removed {removed}.")
+
+    @app.cli.group("jobs")
+    def jobs_group():
+        """Scheduled maintenance jobs."""
+
+    @jobs_group.command("run")
+    @click.argument("names", nargs=-1, type=click.Choice(sorted(jobs.JOBS)))
+    @click.option("--once", is_flag=True, help="Run what is due once and exit instead of polling.")
+    @click.option("--force", is_flag=True, help="Run even if not due (implies --once).")
+    def jobs_run_command(names, once, force):
+        """Run the job scheduler (all scheduled jobs, or NAMES) in this process."""
+        scheduler = app.extensions["jobs"]
+        if once or force:
+            click.echo(json.dumps(scheduler.run_due(list(names), force=force), indent=2))
+            return
+        try:
+            scheduler.run_forever(list(names))
+        except KeyboardInterrupt:
+            scheduler.stop()
+
+    @jobs_group.command("status")
+    def jobs_status_command():
+        """Show each job's lease and last run."""
+        click.echo(json.dumps(jobs.status(), indent=2, default=str))
+
+    @app.cli.group("db")
+    def db_group():
+        """Database schema migrations."""
+
+    @db_group.command("upgrade")
+    def db_upgrade_command():
+        """Apply pending schema migrations (creates the schema on an empty database)."""
+        applied = migrations.upgrade()
+        for m in applied:
+            click.echo(f"Applied {m.version}: {m.name}")
+        click.echo(f"Schema at version {migrations.MIGRATIONS[-1].version}.")
+
+    @db_group.command("current")
+    def db_current_command():
+        """Show the schema version and any pending migrations."""
+        done = migrations.applied_versions()
+        click.echo(f"Schema at version {max(done) if done else 'none'}.")
+        for m in migrations.pending():
+            click.echo(f"Pending {m.version}: {m.name}")
+
+    @app.cli.command("serve")
+    @click.option("--host", default="127.0.0.1", show_default=True)
+    @click.option("--port", default=8000, show_default=True, help="0 picks a free port.")
+    @click.option("--workers", type=int, help="Worker processes [default: SERVE_WORKERS].")
+    @click.option("--threads", type=int, help="Threads per worker [default: SERVE_THREADS].")
+    def serve_command(host, port, workers, threads):
+        """Serve the app from pre-forked worker processes until SIGTERM or Ctrl-C."""
+        workers = workers or app.config["SERVE_WORKERS"]
+        threads = threads or app.config["SERVE_THREADS"]
+
+        def ready(address):
+            click.echo(f"Listening on http://{address[0]}:{address[1]} ({workers} workers x {threads} threads)")
+
+        server.serve(app, host, port, workers, threads, ready=ready)
@@ -0,0 +1,60 @@
+"""Denormalized counters on posts, comments and users.
+
+Handlers adjust counters with ``UPDATE ... SET col = col + n`` in the same transaction as
+the write they count, so concurrent requests never lose an increment. ``rebuild_counters``
+recomputes everything from the source tables in id-range chunks and is exposed as the
+``flask rebuild-counters`` command for repairing drift.
+"""
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import aliased
+
+from blog_api.models import db, User, Post, Comment, PostLike, CommentLike, Follower
+
+
+def bump(column, pk, delta=1):
+    """Atomically add ``delta`` to ``column`` (e.g. ``Post.like_count``) on the row with id ``pk``,
+    or on every row when ``pk`` is a list of ids."""
+    model = column.class_
+    where = model.id.in_(pk) if isinstance(pk, (list, tuple, set)) else model.id == pk
+    db.session.execute(update(model).where(where).values({column.key: column + delta})
+                       .execution_options(synchronize_session=False))
+
+
+def _count(column, fk, *where):
+    return select(func.count()).where(column == fk, *where).scalar_subquery()
+
+
+def rebuild_counters(chunk_size=1000, after_chunk=None):
+    """Recompute all counters from source rows; returns the number of rows rewritten.
+
+    Each chunk is committed, or handed to ``after_chunk(rows)`` to commit (the jobs runner's throttle).
+    """
+    reply = aliased(Comment)
+    jobs = [
+        (Post, {
+            "like_count": _count(PostLike.post_id, Post.id),
+            "comment_count": _count(Comment.post_id, Post.id, Comment.deleted_at.is_(None)),
+        }),
+        (Comment, {
+            "like_count": _count(CommentLike.comment_id, Comment.id),
+            "reply_count": _count(reply.parent_id, Comment.id, reply.deleted_at.is_(None)),
+        }),
+        (User, {
+            "follower_count": _count(Follower.followed_id, User.id),
+            "following_count": _count(Follower.follower_id, User.id),
+        }),
+    ]
+    total = 0
+    for model, values in jobs:
+        max_id = db.session.query(func.max(model.id)).scalar() or 0
+        for lo in range(1, max_id + 1, chunk_size):
+            result = db.session.execute(
+                update(model).where(model.id.between(lo, lo + chunk_size - 1)).values(values)
+                .execution_options(synchronize_session=False)
+            )
+            if after_chunk is None:
+                db.session.commit()
+            else:
+                after_chunk(result.rowcount)
+            total += result.rowcount
+    return total
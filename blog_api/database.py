@@ -0,0 +1,208 @@
+"""Engine pool configuration and primary/replica routing.
+
+GET handlers decorated with ``@read_replica`` run their queries on one of the read replicas
+listed in ``DATABASE_REPLICA_URIS`` (kept in ``app.extensions["db_replicas"]``). Anything that
+flushes goes to the primary. After a commit, the writer is pinned to the primary for
+``DB_REPLICA_STICKY_SECONDS`` so it reads its own writes despite replication lag, and the
+response cache neither serves nor stores its reads meanwhile (a reader on a lagging replica may
+have just filled it). Pins are kept by JWT identity, and by client address only with
+``DB_REPLICA_STICKY_BY_ADDRESS``: behind a proxy every client shares the proxy's address. They
+live in their own store (``DB_REPLICA_STICKY_BACKEND``), not in the evictable response cache.
+
+Connections must not cross ``fork()``: a pre-fork server (``flask serve``, or gunicorn with
+``--preload``) would otherwise hand the parent's pooled sockets to every worker. ``init_app``
+registers ``after_fork`` so each child starts with empty pools of its own.
+
+SQLite only enforces foreign keys, and so only runs their ``ON DELETE CASCADE``, on connections
+that ask for it; every SQLite connection does so when it opens.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from blog_api import cache
+
+class PoolWaitStats:
+    """How long requests wait to check a connection out of the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {"count": self.count, "total_seconds": self.total, "max_seconds": self.max}
+
+
+pool_wait = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def engine_options(config):
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def init_app(app):
+    """Fill in pool options before ``db.init_app`` creates the primary engine and create one
+    engine per replica. Replicas are not Flask-SQLAlchemy binds: binds register a metadata on
+    the shared ``db`` and would drag every later app's ``create_all`` onto them."""
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    if "SQLALCHEMY_ENGINE_OPTIONS" not in app.config and not uri.startswith("sqlite"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    app.extensions["db_replicas"] = [create_engine(u, **options) for u in app.config["DATABASE_REPLICA_URIS"]]
+    app.extensions["db_sticky"] = make_sticky_store(app)
+    ref = weakref.ref(app)
+    os.register_at_fork(after_in_child=lambda: ref() is not None and after_fork(ref()))
+
+
+def engines(app):
+    """The app's primary engine followed by its replica engines."""
+    sqlalchemy = app.extensions.get("sqlalchemy")
+    if sqlalchemy is None:
+        return list(app.extensions.get("db_replicas", []))
+    with app.app_context():
+        primary = list(sqlalchemy.engines.values())
+    return primary + app.extensions["db_replicas"]
+
+
+def after_fork(app):
+    """Drop the pools inherited from the parent without closing its connections."""
+    for engine in engines(app):
+        engine.dispose(close=False)
+
+
+def make_sticky_store(app):
+    cfg = app.config
+    if cfg["DB_REPLICA_STICKY_BACKEND"] == "sqlite":
+        path = cfg["DB_REPLICA_STICKY_SQLITE_PATH"] or os.path.join(app.instance_path, "replica_sticky.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return cache.SQLiteCache(path)
+    if cfg["DB_REPLICA_STICKY_BACKEND"] == "memory":
+        return cache.MemoryCache(cfg["DB_REPLICA_STICKY_MAX_ENTRIES"])
+    raise ValueError(f"Unknown DB_REPLICA_STICKY_BACKEND {cfg['DB_REPLICA_STICKY_BACKEND']!r}")
+
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        pass
+    # Read views do not require a token; the caller's own still identifies them
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def _sticky_keys():
+    identity = _identity()
+    keys = [f"sticky:user:{identity}"] if identity is not None else []
+    if current_app.config["DB_REPLICA_STICKY_BY_ADDRESS"]:
+        keys.append(f"sticky:addr:{request.remote_addr}")
+    return keys
+
+
+def is_sticky():
+    """Whether the caller wrote within ``DB_REPLICA_STICKY_SECONDS`` and must read the primary."""
+    if not current_app.extensions["db_replicas"]:
+        return False
+    if "db_sticky" not in g:
+        store = current_app.extensions["db_sticky"]
+        g.db_sticky = any(store.get(k) for k in _sticky_keys())
+    return g.db_sticky
+
+
+def read_replica(view):
+    """Run a read-only view against a replica unless the caller wrote recently."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.extensions["db_replicas"]
+        if replicas and not is_sticky():
+            g.db_replica = random.choice(replicas)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context() and g.get("db_replica")
+                and not getattr(clause, "is_dml", False) and not (self.new or self.dirty or self.deleted)):
+            return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _forget_write(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop("wrote", None)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer(session):
+    if not session.info.pop("wrote", False) or not has_request_context():
+        return
+    g.pop("db_replica", None)
+    ttl = current_app.config["DB_REPLICA_STICKY_SECONDS"]
+    if ttl and current_app.config["DATABASE_REPLICA_URIS"]:
+        store = current_app.extensions["db_sticky"]
+        keys = _sticky_keys()
+        for key in keys:
+            store.set(key, True, ttl)
+        g.db_sticky = bool(keys)
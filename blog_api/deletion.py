@@ -0,0 +1,106 @@
+"""Deleting posts and comments, at once or (with ``SOFT_DELETE``) later in chunks.
+
+Every foreign key is ``ON DELETE CASCADE`` and the relationships are ``passive_deletes``, so a
+hard delete is one ``DELETE`` of the post: the database removes its comments, likes, timeline
+entries, notifications and trending score without the ORM loading any of them. That is still a
+single statement whose run time and locks grow with everything the post collected.
+
+With ``SOFT_DELETE`` a delete stamps ``deleted_at`` on the post, or on the comment and its
+replies, and returns. Every ORM query leaves stamped rows out (``_hide_deleted``), so they are
+gone for readers at once. The ``purge_deleted`` job later deletes them and the rows that hang off
+them ``JOBS_CHUNK_SIZE`` at a time, one short transaction per chunk. A stamped post's comments
+are not stamped themselves (that would touch every one): queries leave out comments whose post
+is stamped, a primary-key probe per comment, and the comments leave with the purge.
+
+Only ORM queries are filtered. Core and text statements that read posts or comments, such as
+inserts from a select and the counters' correlated counts, filter ``deleted_at`` themselves. A
+query that needs the stamped rows passes ``execution_options(include_deleted=True)``.
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, delete, event, exists, or_, select, update
+from sqlalchemy.orm import with_loader_criteria
+
+from blog_api.models import db, Post, Comment, PostLike, CommentLike, TimelineEntry, Notification
+from blog_api.database import RoutingSession
+from blog_api import search, trending
+
+# The table, not the mapped class, so the Post criterion is not added inside the subquery too; never
+# correlated, so it still has its own FROM when the outer query joins posts
+_posts = Post.__table__
+
+HIDE_DELETED = (
+    with_loader_criteria(Post, Post.deleted_at.is_(None), include_aliases=True),
+    with_loader_criteria(Comment, lambda cls: and_(
+        cls.deleted_at.is_(None),
+        ~exists().where(_posts.c.id == cls.post_id, _posts.c.deleted_at.isnot(None)).correlate_except(_posts),
+    ), include_aliases=True),
+)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _hide_deleted(orm_execute_state):
+    if (orm_execute_state.is_select and not orm_execute_state.is_column_load
+            and not orm_execute_state.is_relationship_load
+            and not orm_execute_state.execution_options.get("include_deleted", False)):
+        orm_execute_state.statement = orm_execute_state.statement.options(*HIDE_DELETED)
+
+
+def soft():
+    return current_app.config["SOFT_DELETE"]
+
+
+def stamp(model, ids):
+    """Soft-delete the rows of ``model`` with ``ids``."""
+    db.session.execute(update(model).where(model.id.in_(ids)).values(deleted_at=datetime.utcnow())
+                       .execution_options(synchronize_session=False))
+
+
+def delete_post(post):
+    """Delete ``post`` with everything on it, or stamp it for the purge with ``SOFT_DELETE``."""
+    search.remove_post(post.id)
+    trending.remove_post(post.id)
+    if soft():
+        stamp(Post, [post.id])
+        db.session.expunge(post)
+    else:
+        db.session.delete(post)
+
+
+def _purge(chunks, pk, where, order_by=()):
+    """Delete the rows of ``pk``'s table matching ``where``, ``chunks.size`` rows per transaction."""
+    model = pk.class_
+    while True:
+        ids = list(db.session.scalars(select(pk).where(where).order_by(*order_by, pk).limit(chunks.size)
+                                      .execution_options(include_deleted=True)))
+        if not ids:
+            return
+        if model is Comment:
+            search.remove_comments(ids)
+        chunks.done(db.session.execute(
+            delete(model).where(pk.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount)
+
+
+def purge_deleted(chunks):
+    """Job: delete stamped posts and comments with their likes, replies, notifications and timeline entries."""
+    # Replies before their parents, so no delete has to cascade down a thread
+    deepest_first = (Comment.depth.desc(),)
+    post_ids = list(db.session.scalars(select(Post.id).where(Post.deleted_at.isnot(None)).order_by(Post.id)
+                                       .execution_options(include_deleted=True)))
+    for post_id in post_ids:
+        comments = select(Comment.id).where(Comment.post_id == post_id)
+        _purge(chunks, CommentLike.id, CommentLike.comment_id.in_(comments))
+        _purge(chunks, Notification.id, or_(Notification.post_id == post_id, Notification.comment_id.in_(comments)))
+        _purge(chunks, Comment.id, Comment.post_id == post_id, deepest_first)
+        _purge(chunks, PostLike.id, PostLike.post_id == post_id)
+        _purge(chunks, TimelineEntry.id, TimelineEntry.post_id == post_id)
+        chunks.done(db.session.execute(
+            delete(Post).where(Post.id == post_id).execution_options(synchronize_session=False)
+        ).rowcount)
+
+    comments = select(Comment.id).where(Comment.deleted_at.isnot(None))
+    _purge(chunks, CommentLike.id, CommentLike.comment_id.in_(comments))
+    _purge(chunks, Notification.id, Notification.comment_id.in_(comments))
+    _purge(chunks, Comment.id, Comment.deleted_at.isnot(None), deepest_first)
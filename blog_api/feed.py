@@ -0,0 +1,97 @@
+"""Home feed: hybrid fan-out.
+
+Posts by authors with at most ``FEED_FANOUT_MAX_FOLLOWERS`` followers are pushed into a
+``timelines`` row per follower when they are created (fan-out on write). Posts by authors
+above the threshold are not pushed; they are merged in at read time (fan-out on read), so a
+single post never costs more than the threshold in inserts.
+
+Whether a post was pushed is recorded on the post (``fanned_out``) rather than read off the
+author's current follower count, which moves both ways: posts made above the threshold stay
+pulled after the author drops below it, and posts pushed before the author crossed it reach new
+followers through the backfill on follow.
+"""
+from flask import current_app
+from sqlalchemy import exists, insert, literal, select, update
+
+from blog_api.models import db, User, Post, Follower, TimelineEntry
+from blog_api.pagination import encode_cursor, keyset_paginate
+
+
+def _post_key(p):
+    return (p.created_at, p.id)
+
+
+def is_fanout_author(user_id):
+    count = db.session.query(User.follower_count).filter(User.id == user_id).scalar() or 0
+    return count <= current_app.config["FEED_FANOUT_MAX_FOLLOWERS"]
+
+
+def fan_out_post(post):
+    fan_out_posts([post])
+
+
+def fan_out_posts(posts):
+    """Push flushed posts into their authors' followers' timelines with a single INSERT ... SELECT."""
+    fanout = {a: is_fanout_author(a) for a in {p.author_id for p in posts}}
+    ids = [p.id for p in posts if fanout[p.author_id]]
+    pulled = [p.id for p in posts if not fanout[p.author_id]]
+    if pulled:
+        db.session.execute(update(Post).where(Post.id.in_(pulled)).values(fanned_out=False)
+                           .execution_options(synchronize_session=False))
+    if not ids:
+        return
+    db.session.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"],
+        select(Follower.follower_id, Post.id, Post.author_id, Post.created_at)
+        .join(Post, Post.author_id == Follower.followed_id)
+        .where(Post.id.in_(ids))
+    ))
+
+
+def backfill_timeline(user_id, author_id):
+    """Seed a new follower's timeline with the author's most recent pushed posts (the rest are pulled)."""
+    db.session.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"],
+        select(literal(user_id), Post.id, Post.author_id, Post.created_at)
+        .where(Post.author_id == author_id, Post.fanned_out.is_(True), Post.deleted_at.is_(None))
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(current_app.config["FEED_BACKFILL_POSTS"])
+    ))
+
+
+def remove_author_from_timeline(user_id, author_id):
+    TimelineEntry.query.filter_by(user_id=user_id, author_id=author_id).delete(synchronize_session=False)
+
+
+def pull_author_ids(user_id):
+    """Followed authors with posts that were not fanned out and must be merged at read time."""
+    rows = (
+        db.session.query(Follower.followed_id)
+        .filter(Follower.follower_id == user_id,
+                exists().where(Post.fanned_out.is_(False), Post.author_id == Follower.followed_id))
+        .all()
+    )
+    return [r.followed_id for r in rows]
+
+
+def feed_page(user_id, cursor, limit):
+    """Return ``(posts, next_cursor)`` for a user's home feed, newest first.
+
+    Both sources are read with the same (created_at, id) keyset, so each query touches at
+    most ``limit + 1`` rows and the merged page is exact.
+    """
+    pushed, pushed_more = keyset_paginate(
+        Post.query.join(TimelineEntry, TimelineEntry.post_id == Post.id).filter(TimelineEntry.user_id == user_id),
+        (TimelineEntry.created_at, TimelineEntry.post_id), cursor, limit, key=_post_key
+    )
+    pulled, pulled_more = [], None
+    authors = pull_author_ids(user_id)
+    if authors:
+        pulled, pulled_more = keyset_paginate(
+            Post.query.filter(Post.fanned_out.is_(False), Post.author_id.in_(authors)),
+            (Post.created_at, Post.id), cursor, limit, key=_post_key
+        )
+    merged = sorted({p.id: p for p in pushed + pulled}.values(), key=_post_key, reverse=True)
+    page = merged[:limit]
+    has_more = len(merged) > limit or pushed_more or pulled_more
+    return page, encode_cursor(*_post_key(page[-1])) if has_more and page else None
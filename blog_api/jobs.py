@@ -0,0 +1,263 @@
+"""Scheduled maintenance jobs.
+
+Jobs work through their tables in chunks of ``JOBS_CHUNK_SIZE`` rows, committing after every
+chunk so no transaction holds locks for long, and sleep ``JOBS_CHUNK_PAUSE`` seconds between
+chunks to leave room for foreground traffic:
+
+* ``prune_notifications`` – deletes read notifications older than ``NOTIFICATIONS_RETENTION_DAYS``,
+  copying them to ``notifications_archive`` first when ``NOTIFICATIONS_ARCHIVE`` is set.
+* ``vacuum_orphans`` – deletes comments, likes, follows, timeline entries, notifications and trending
+  scores that point at users, posts or comments that no longer exist.
+* ``rebuild_counters`` – recomputes the denormalized like/comment/reply/follower counters.
+* ``decay_trending`` – rebases and compacts the trending scores.
+* ``purge_deleted`` – deletes soft-deleted posts and comments and what hangs off them (see ``deletion.py``).
+
+``JOBS_SCHEDULE`` sets how often each one runs. The ``job_runs`` table holds a lease per job,
+claimed with one conditional UPDATE, so however many processes run the scheduler a job runs in
+one place at a time and no more often than scheduled. It also keeps each job's last duration,
+rows affected and error (``flask jobs status``). Run the scheduler as its own worker with
+``flask jobs run``, or set ``JOBS_ENABLED`` to run it in a thread of every app process. Every run
+is logged and recorded in that process's metrics (``job_runs_total``, ``job_duration_seconds``,
+``job_rows_affected_total``).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, exists, func, literal, or_, select, true, update
+
+from blog_api.models import (db, User, Post, Comment, PostLike, CommentLike, Follower, TimelineEntry, Notification,
+                             NotificationArchive, PostScore, JobRun)
+from blog_api.counters import rebuild_counters
+from blog_api.relations import insert_ignore
+from blog_api.deletion import purge_deleted
+from blog_api import trending
+
+log = logging.getLogger(__name__)
+
+
+class Stopped(Exception):
+    """Raised at a chunk boundary when the scheduler is shutting down."""
+
+
+class Chunks:
+    """Passed to every job: its chunk size, and ``done(rows)`` to call after each chunk."""
+
+    def __init__(self, name, stop=None):
+        cfg = current_app.config
+        self.name = name
+        self.size = cfg["JOBS_CHUNK_SIZE"]
+        self.pause = cfg["JOBS_CHUNK_PAUSE"]
+        self.stop = stop or threading.Event()
+        self.rows = 0
+
+    def done(self, rows):
+        """Commit the chunk (renewing the job's lease with it) and pause before the next."""
+        self.rows += rows
+        db.session.execute(update(JobRun).where(JobRun.name == self.name).values(locked_until=_lease_end()))
+        db.session.commit()
+        if self.stop.wait(self.pause):
+            raise Stopped(self.name)
+
+
+def prune_notifications(chunks):
+    cfg = current_app.config
+    cutoff = datetime.utcnow() - timedelta(days=cfg["NOTIFICATIONS_RETENTION_DAYS"])
+    columns = ["id", "user_id", "actor_id", "type", "post_id", "comment_id", "is_read", "created_at", "message"]
+    last = 0
+    while True:
+        ids = [i for (i,) in db.session.query(Notification.id).filter(
+            Notification.id > last, Notification.is_read == true(), Notification.created_at < cutoff
+        ).order_by(Notification.id).limit(chunks.size)]
+        if not ids:
+            return
+        if cfg["NOTIFICATIONS_ARCHIVE"]:
+            insert_ignore(NotificationArchive, columns, select(*[getattr(Notification, c) for c in columns])
+                          .where(Notification.id.in_(ids)))
+        deleted = db.session.execute(
+            delete(Notification).where(Notification.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        last = ids[-1]
+        chunks.done(deleted)
+
+
+# (table, its primary key, reference, referenced table)
+ORPHANS = [
+    (Comment, Comment.id, Comment.post_id, Post),
+    (PostLike, PostLike.id, PostLike.post_id, Post),
+    (PostLike, PostLike.id, PostLike.user_id, User),
+    (CommentLike, CommentLike.id, CommentLike.comment_id, Comment),
+    (CommentLike, CommentLike.id, CommentLike.user_id, User),
+    (Follower, Follower.id, Follower.follower_id, User),
+    (Follower, Follower.id, Follower.followed_id, User),
+    (TimelineEntry, TimelineEntry.id, TimelineEntry.post_id, Post),
+    (Notification, Notification.id, Notification.post_id, Post),
+    (Notification, Notification.id, Notification.comment_id, Comment),
+    (PostScore, PostScore.post_id, PostScore.post_id, Post),
+]
+
+
+def vacuum_orphans(chunks):
+    for model, pk, ref, target in ORPHANS:
+        lo, hi = db.session.query(func.min(pk), func.max(pk)).one()
+        if lo is None:
+            continue
+        for start in range(lo, hi + 1, chunks.size):
+            removed = db.session.execute(
+                delete(model).where(pk.between(start, start + chunks.size - 1), ref.isnot(None),
+                                    ~exists().where(target.id == ref))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            chunks.done(removed)
+
+
+def rebuild_counters_job(chunks):
+    rebuild_counters(chunks.size, after_chunk=chunks.done)
+
+
+def decay_trending(chunks):
+    rescaled, removed = trending.decay()
+    chunks.done(rescaled)
+
+
+JOBS = {
+    "prune_notifications": prune_notifications,
+    "vacuum_orphans": vacuum_orphans,
+    "rebuild_counters": rebuild_counters_job,
+    "decay_trending": decay_trending,
+    "purge_deleted": purge_deleted,
+}
+
+
+def _lease_end():
+    return datetime.utcnow() + timedelta(seconds=current_app.config["JOBS_LEASE_SECONDS"])
+
+
+def _claim(name, interval):
+    """Take the job's lease if nobody holds it and (unless ``interval`` is None) it is due."""
+    now = datetime.utcnow()
+    insert_ignore(JobRun, ["name"], select(literal(name)))
+    due = true() if interval is None else or_(JobRun.last_started.is_(None),
+                                              JobRun.last_started <= now - timedelta(seconds=interval))
+    claimed = db.session.execute(
+        update(JobRun).where(JobRun.name == name, or_(JobRun.locked_until.is_(None), JobRun.locked_until < now), due)
+        .values(locked_until=_lease_end(), last_started=now)
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def run_job(name, force=False, stop=None):
+    """Run ``name`` if it is due (any time with ``force``) and no other process is running it.
+
+    Returns a summary dict, or None if the job did not run.
+    """
+    interval = current_app.config["JOBS_SCHEDULE"].get(name)
+    if name not in JOBS or (interval is None and not force):
+        return None
+    if not _claim(name, None if force else interval):
+        return None
+    chunks = Chunks(name, stop)
+    start = time.perf_counter()
+    status, error = "ok", None
+    try:
+        JOBS[name](chunks)
+        db.session.commit()
+    except Stopped:
+        status = "stopped"  # Chunks done so far are committed; the rest waits for the next run
+    except Exception as exc:
+        db.session.rollback()
+        status, error = "error", f"{type(exc).__name__}: {exc}"[:500]
+        log.exception("Job %s failed", name)
+    duration = time.perf_counter() - start
+    db.session.execute(update(JobRun).where(JobRun.name == name).values(
+        locked_until=None, last_finished=datetime.utcnow(), last_duration=duration, last_rows=chunks.rows,
+        last_error=error))
+    db.session.commit()
+    current_app.extensions["metrics"].record_job(name, status, duration, chunks.rows)
+    log.info("Job %s %s in %.2f s, %d rows affected", name, status, duration, chunks.rows)
+    return {"job": name, "status": status, "seconds": round(duration, 3), "rows": chunks.rows, "error": error}
+
+
+def status():
+    return [{"job": r.name, "locked_until": r.locked_until, "last_started": r.last_started,
+             "last_finished": r.last_finished, "last_duration": r.last_duration, "last_rows": r.last_rows,
+             "last_error": r.last_error}
+            for r in JobRun.query.order_by(JobRun.name)]
+
+
+class Scheduler:
+    """Runs due jobs every ``JOBS_POLL_INTERVAL`` seconds; stored in ``app.extensions["jobs"]``."""
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run_due(self, names=None, force=False):
+        results = []
+        for name in names or list(current_app.config["JOBS_SCHEDULE"]):
+            if self._stop.is_set():
+                break
+            result = run_job(name, force=force, stop=self._stop)
+            if result is not None:
+                results.append(result)
+        return results
+
+    def run_forever(self, names=None):
+        while not self._stop.is_set():
+            try:
+                self.run_due(names)
+            except Exception:
+                log.exception("Job scheduler pass failed")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+            self._stop.wait(current_app.config["JOBS_POLL_INTERVAL"])
+
+    def _run_thread(self):
+        with self.app.app_context():
+            self.run_forever()
+
+    def ensure_started(self):
+        # Like the notification workers, a forked process starts its own thread on first request
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run_thread, name="jobs-scheduler", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+
+# Schedulers of apps still alive, stopped by one exit hook however many apps were created
+_schedulers = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_schedulers():
+    for scheduler in list(_schedulers):
+        scheduler.stop()
+
+
+def init_app(app):
+    scheduler = Scheduler(app)
+    app.extensions["jobs"] = scheduler
+    if app.config["JOBS_ENABLED"]:
+        app.before_request(scheduler.ensure_started)
+        _schedulers.add(scheduler)
+    return scheduler
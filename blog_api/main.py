@@ -1,10 +1,22 @@
 from flask import Flask
 from flask_jwt_extended import JWTManager
-from flasgger import Swagger
 
 from blog_api.config import Config
 from blog_api.models import db
+from blog_api.serialization import JSONProvider
 from blog_api.routes import init_routes
+from blog_api.commands import init_commands
+from blog_api import notifications
+from blog_api import notification_stream
+from blog_api.cache import cache
+from blog_api import passwords
+from blog_api import database
+from blog_api import metrics
+from blog_api import auth
+from blog_api import ratelimit
+from blog_api import trending
+from blog_api import jobs
+from blog_api import apidocs
 
 def create_app(test_config=None):
     app = Flask(__name__)
@@ -16,42 +28,34 @@ def create_app(test_config=None):
     if test_config:
         app.config.update(test_config)
 
+    app.json = JSONProvider(app)
+
     # Initialize extensions
+    database.init_app(app)
     db.init_app(app)
     jwt = JWTManager(app)
-
-    # Swagger configuration
-    swagger_template = {
-        "swagger": "2.0",
-        "info": {
-            "title": "Blog REST API",
-            "description": "RESTful API for managing blog posts, comments, likes, followers, and notifications",
-            "version": "1.0.0"
-        },
-        "securityDefinitions": {
-            "bearerAuth": {
-                "type": "apiKey",
-                "name": "Authorization",
-                "in": "header",
-                "description": "JWT Authorization header using the Bearer scheme. Example: 'Bearer {token}'"
-            }
-        },
-        "security": [{"bearerAuth": []}]
-    }
-    Swagger(app, template=swagger_template)
+    auth.init_app(app, jwt)
+    notifications.init_app(app)
+    notification_stream.init_app(app)
+    cache.init_app(app)
+    passwords.init_app(app)
+    metrics.init_app(app)
+    ratelimit.init_app(app)
+    trending.init_app(app)
+    jobs.init_app(app)
+
+    # Swagger UI; the spec is built on first request (see apidocs.py)
+    apidocs.init_app(app)
 
     # Register routes
     init_routes(app)
+    init_commands(app)
 
-    # Create tables (only when running normally, not for tests)
-    if not test_config:
-        with app.app_context():
-            db.create_all()
-
+    # No database access here: the schema is managed by `flask db upgrade` (see migrations.py)
     return app
 
-# This is the app used by flask run
-app = create_app()
 
+# Entry points build their own app from the factory: `flask --app blog_api.main run`,
+# `gunicorn "blog_api.main:create_app()"`. Importing this module has no side effects.
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,216 @@
+"""Per-request performance instrumentation.
+
+Every request records its latency, the SQL statements it ran (count and time, via engine
+cursor events), time spent committing, time spent serializing JSON and the response size.
+Aggregates are kept per endpoint in process memory and rendered in the Prometheus text format
+by ``GET /metrics``; with several worker processes each one reports its own numbers.
+
+Maintenance jobs (``jobs.py``) record their runs, duration and rows affected here too.
+
+Setting ``METRICS_SLOW_REQUEST_MS`` logs every slower request with its statements, which is
+the quickest way to spot an N+1 (the same SELECT repeated once per row).
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from blog_api.database import pool_wait
+from blog_api.serialization import JSONProvider
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+JOB_BUCKETS = (0.1, 1.0, 10.0, 60.0, 300.0, 1800.0, 3600.0)
+
+
+class Histogram:
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [[0] * len(self.buckets), 0, 0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, count, total) in sorted(self._series.items()):
+            base = _labels(labels)
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {n}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+        return lines
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels)
+
+
+class Metrics:
+    """Metric registry for one app, stored in ``app.extensions["metrics"]``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.latency = Histogram("http_request_duration_seconds", "Request latency.", LATENCY_BUCKETS)
+        self.queries = Histogram("http_request_sql_queries", "SQL statements per request.", QUERY_BUCKETS)
+        self.sql_time = Histogram("http_request_sql_duration_seconds", "SQL time per request.", LATENCY_BUCKETS)
+        self.commit_time = Histogram("http_request_commit_duration_seconds", "Commit time per request.",
+                                     LATENCY_BUCKETS)
+        self.serialize_time = Histogram("http_request_serialize_duration_seconds",
+                                        "JSON serialization time per request.", LATENCY_BUCKETS)
+        self.size = Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS)
+        self.job_runs = Counter()
+        self.job_rows = Counter()
+        self.job_duration = Histogram("job_duration_seconds", "Maintenance job run time.", JOB_BUCKETS)
+
+    def record(self, endpoint, method, status, stats, elapsed, size):
+        labels = (("endpoint", endpoint), ("method", method))
+        with self._lock:
+            self.requests[labels + (("status", status),)] += 1
+            self.latency.observe(labels, elapsed)
+            self.queries.observe(labels, len(stats["queries"]))
+            self.sql_time.observe(labels, stats["sql_seconds"])
+            self.commit_time.observe(labels, stats["commit_seconds"])
+            self.serialize_time.observe(labels, stats["serialize_seconds"])
+            if size is not None:
+                self.size.observe(labels, size)
+
+    def record_job(self, name, status, elapsed, rows):
+        labels = (("job", name),)
+        with self._lock:
+            self.job_runs[labels + (("status", status),)] += 1
+            self.job_rows[labels] += rows
+            self.job_duration.observe(labels, elapsed)
+
+    def render(self):
+        lines = ["# HELP http_requests_total Requests served.", "# TYPE http_requests_total counter"]
+        with self._lock:
+            for labels, n in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{{{_labels(labels)}}} {n}")
+            for h in (self.latency, self.queries, self.sql_time, self.commit_time, self.serialize_time, self.size):
+                lines.extend(h.render())
+            lines += ["# HELP job_runs_total Maintenance job runs.", "# TYPE job_runs_total counter"]
+            lines += [f"job_runs_total{{{_labels(labels)}}} {n}" for labels, n in sorted(self.job_runs.items())]
+            lines += ["# HELP job_rows_affected_total Rows changed by maintenance jobs.",
+                      "# TYPE job_rows_affected_total counter"]
+            for labels, n in sorted(self.job_rows.items()):
+                lines.append(f"job_rows_affected_total{{{_labels(labels)}}} {n}")
+            lines.extend(self.job_duration.render())
+        wait = pool_wait.snapshot()
+        lines += [
+            "# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+            "# TYPE db_pool_checkout_wait_seconds summary",
+            f"db_pool_checkout_wait_seconds_count {wait['count']}",
+            f"db_pool_checkout_wait_seconds_sum {wait['total_seconds']}",
+            "# TYPE db_pool_checkout_wait_seconds_max gauge",
+            f"db_pool_checkout_wait_seconds_max {wait['max_seconds']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _stats():
+    """The current request's counters, or None outside a request."""
+    if has_request_context():
+        return g.get("request_stats")
+    return None
+
+
+class TimedJSONProvider(JSONProvider):
+    """Adds the time spent encoding to the request's serialization total."""
+
+    def encode(self, obj, indent=None, sort_keys=None):
+        start = time.perf_counter()
+        try:
+            return super().encode(obj, indent, sort_keys)
+        finally:
+            stats = _stats()
+            if stats is not None:
+                stats["serialize_seconds"] += time.perf_counter() - start
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _stats()
+    if stats is not None:
+        stats["sql_seconds"] += elapsed
+        stats["queries"].append((statement, elapsed))
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    stats = _stats()
+    if stats is not None:
+        stats["commit_start"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    stats = _stats()
+    if stats is not None and "commit_start" in stats:
+        stats["commit_seconds"] += time.perf_counter() - stats.pop("commit_start")
+
+
+def _start_request():
+    g.request_stats = {"start": time.perf_counter(), "queries": [], "sql_seconds": 0.0,
+                       "commit_seconds": 0.0, "serialize_seconds": 0.0}
+
+
+def _finish_request(response):
+    stats = g.pop("request_stats", None)
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats["start"]
+    endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+    size = None if response.is_streamed else response.calculate_content_length()
+    current_app.extensions["metrics"].record(endpoint, request.method, response.status_code, stats, elapsed, size)
+
+    slow_ms = current_app.config["METRICS_SLOW_REQUEST_MS"]
+    if slow_ms is not None and elapsed * 1000 >= slow_ms:
+        repeated = Counter(s for s, _ in stats["queries"])
+        log.warning(
+            "Slow request %s %s: %.1f ms, %d queries (%.1f ms SQL, %.1f ms commit, %.1f ms JSON)\n%s",
+            request.method, request.full_path.rstrip("?"), elapsed * 1000, len(stats["queries"]),
+            stats["sql_seconds"] * 1000, stats["commit_seconds"] * 1000, stats["serialize_seconds"] * 1000,
+            "\n".join(f"  {d * 1000:7.2f} ms  {'x%d  ' % repeated[s] if repeated[s] > 1 else ''}{' '.join(s.split())}"
+                      for s, d in stats["queries"]),
+        )
+    return response
+
+
+def init_app(app):
+    app.extensions["metrics"] = Metrics()
+    if not app.config["METRICS_ENABLED"]:
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def render():
+    return current_app.extensions["metrics"].render()
@@ -0,0 +1,178 @@
+"""Versioned schema migrations, applied with ``flask db upgrade``.
+
+The app never creates or alters tables when it starts. ``MIGRATIONS`` lists the schema changes
+in order; ``upgrade()`` applies the ones a database has not had yet, each in its own
+transaction, and records them in ``schema_migrations``. Run it once per deploy, before the new
+workers start.
+
+An empty database skips the history: the current models are created in one pass and every
+migration is recorded as applied. A database created before migrations existed (by the old
+``create_all`` at startup) has tables but no ``schema_migrations`` and starts from version 1.
+Because version 1 creates missing tables from the current models, later migrations must
+tolerate a schema that already has their change; ``add_missing`` and ``cascade_foreign_keys``
+do. To change the schema, change the models and append a migration with the next version number.
+
+On SQLite, migrations run with foreign key enforcement off, as SQLite requires for rebuilding a
+table: dropping the old copy would otherwise cascade into, or be refused by, the tables that
+reference it.
+"""
+import logging
+from collections import namedtuple
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.schema import AddConstraint, CreateColumn, CreateIndex, CreateTable
+
+from blog_api.models import db, Post, SchemaMigration, User
+from blog_api import search  # noqa: F401  (registers the full-text index DDL on the models)
+
+log = logging.getLogger(__name__)
+
+Migration = namedtuple("Migration", "version name apply")
+
+# Tables of the original schema, which predate the counters, threads and indexes added since
+ORIGINAL_TABLES = ("users", "posts", "comments", "post_likes", "comment_likes", "followers", "notifications")
+
+
+def add_missing(conn, tables):
+    """Add the columns and indexes the models define but the existing ``tables`` lack."""
+    inspector = inspect(conn)
+    for name in tables:
+        table = db.metadata.tables[name]
+        columns = {c["name"] for c in inspector.get_columns(name)}
+        for column in table.columns:
+            if column.name not in columns:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {name} ADD COLUMN {ddl}"))
+        indexes = {i["name"] for i in inspector.get_indexes(name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                conn.execute(CreateIndex(index))
+
+
+def _rebuild_sqlite_table(conn, table):
+    """Re-create ``table`` from the model, keeping its rows (SQLite cannot alter constraints)."""
+    name = table.name
+    columns = ", ".join(c["name"] for c in inspect(conn).get_columns(name) if c["name"] in table.c)
+    create = str(CreateTable(table).compile(dialect=conn.dialect))
+    conn.execute(text(create.replace(f"CREATE TABLE {name} (", f"CREATE TABLE _new_{name} (", 1)))
+    conn.execute(text(f"INSERT INTO _new_{name} ({columns}) SELECT {columns} FROM {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
+    conn.execute(text(f"ALTER TABLE _new_{name} RENAME TO {name}"))
+    for index in table.indexes:
+        conn.execute(CreateIndex(index))
+
+
+def cascade_foreign_keys(conn):
+    """Give existing foreign keys the ``ON DELETE`` action the models declare."""
+    inspector = inspect(conn)
+    for name in inspector.get_table_names():
+        table = db.metadata.tables.get(name)
+        if table is None:
+            continue
+        declared = {tuple(fk.column_keys): fk for fk in table.foreign_key_constraints}
+        stale = []
+        for fk in inspector.get_foreign_keys(name):
+            model_fk = declared.get(tuple(fk["constrained_columns"]))
+            ondelete = (fk["options"].get("ondelete") or "").upper()
+            if model_fk is not None and ondelete != (model_fk.ondelete or "").upper():
+                stale.append((fk, model_fk))
+        if not stale:
+            continue
+        if conn.dialect.name == "sqlite":
+            _rebuild_sqlite_table(conn, table)
+            continue
+        drop = "FOREIGN KEY" if conn.dialect.name == "mysql" else "CONSTRAINT"
+        for existing, model_fk in stale:
+            conn.execute(text(f"ALTER TABLE {name} DROP {drop} {existing['name']}"))
+            conn.execute(AddConstraint(model_fk))
+
+
+def cascade_and_soft_delete(conn):
+    cascade_foreign_keys(conn)
+    add_missing(conn, ["posts", "comments", "notifications"])
+
+
+def record_fan_out(conn):
+    """Posts by authors now above the fan-out threshold were pulled, not pushed (the best guess left)."""
+    add_missing(conn, ["posts"])
+    conn.execute(update(Post).where(Post.author_id.in_(
+        select(User.id).where(User.follower_count > current_app.config["FEED_FANOUT_MAX_FOLLOWERS"])
+    )).values(fanned_out=False))
+
+
+def create_tables(conn):
+    db.metadata.create_all(conn, checkfirst=True)
+
+
+def upgrade_original_tables(conn):
+    add_missing(conn, ORIGINAL_TABLES)
+    if conn.dialect.name == "mysql":
+        indexes = {name: {i["name"] for i in inspect(conn).get_indexes(name)} for name in ("posts", "comments")}
+        if "ft_posts_title_content" not in indexes["posts"]:
+            conn.execute(text("ALTER TABLE posts ADD FULLTEXT INDEX ft_posts_title_content (title, content)"))
+        if "ft_comments_content" not in indexes["comments"]:
+            conn.execute(text("ALTER TABLE comments ADD FULLTEXT INDEX ft_comments_content (content)"))
+    log.warning("Counters and the search index start empty: run `flask rebuild-counters` and `flask search-reindex`")
+
+
+MIGRATIONS = [
+    Migration(1, "create missing tables", create_tables),
+    Migration(2, "counters, comment threads and indexes on the original tables", upgrade_original_tables),
+    Migration(3, "index notifications by user and id", lambda conn: add_missing(conn, ["notifications"])),
+    Migration(4, "cascading deletes and soft-delete columns", cascade_and_soft_delete),
+    Migration(5, "record which posts were fanned out", record_fan_out),
+]
+
+
+def _record(conn, migrations):
+    conn.execute(SchemaMigration.__table__.insert(), [{"version": m.version, "name": m.name} for m in migrations])
+
+
+def applied_versions():
+    """Versions recorded in ``schema_migrations``; None if the database has never been migrated."""
+    with db.engine.connect() as conn:
+        if not inspect(conn).has_table(SchemaMigration.__tablename__):
+            return None
+        return set(conn.scalars(select(SchemaMigration.version)))
+
+
+def pending():
+    done = applied_versions() or set()
+    return [m for m in MIGRATIONS if m.version not in done]
+
+
+@contextmanager
+def _migrating():
+    """A connection in a transaction to apply one migration in."""
+    with db.engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:  # only takes effect outside a transaction
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        try:
+            with conn.begin():
+                yield conn
+        finally:
+            if sqlite:
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+                conn.commit()
+
+
+def upgrade():
+    """Apply pending migrations; returns the ones applied."""
+    with db.engine.begin() as conn:
+        tables = inspect(conn).get_table_names()
+        if "users" not in tables and SchemaMigration.__tablename__ not in tables:
+            create_tables(conn)
+            _record(conn, MIGRATIONS)
+            return list(MIGRATIONS)
+        SchemaMigration.__table__.create(conn, checkfirst=True)
+    todo = pending()
+    for migration in todo:
+        log.info("Applying migration %d: %s", migration.version, migration.name)
+        with _migrating() as conn:
+            migration.apply(conn)
+            _record(conn, [migration])
+    return todo
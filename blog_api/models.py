@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-db = SQLAlchemy()
+from blog_api.database import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 class User(db.Model):
     __tablename__ = "users"
@@ -10,69 +12,188 @@ class User(db.Model):
     email = db.Column(db.String(500), nullable=False, unique=True)
     password = db.Column(db.String(1000), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    follower_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    following_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
-    posts = db.relationship("Post", backref="author", lazy=True)
-    comments = db.relationship("Comment", backref="author", lazy=True)
-    notifications = db.relationship("Notification", foreign_keys="Notification.user_id", back_populates="recipient", lazy=True)
-    sent_notifications = db.relationship("Notification", foreign_keys="Notification.actor_id", back_populates="actor", lazy=True)
-    followers = db.relationship("Follower", foreign_keys="Follower.followed_id", backref="followed", lazy=True)
-    following = db.relationship("Follower", foreign_keys="Follower.follower_id", backref="follower", lazy=True)
+    # Dependent rows go with their user through ON DELETE CASCADE; the ORM never loads them to delete them
+    posts = db.relationship("Post", backref="author", lazy=True, cascade="all, delete", passive_deletes=True)
+    comments = db.relationship("Comment", backref="author", lazy=True, cascade="all, delete", passive_deletes=True)
+    notifications = db.relationship("Notification", foreign_keys="Notification.user_id", back_populates="recipient",
+                                    lazy=True, cascade="all, delete", passive_deletes=True)
+    sent_notifications = db.relationship("Notification", foreign_keys="Notification.actor_id", back_populates="actor",
+                                         lazy=True, cascade="all, delete", passive_deletes=True)
+    followers = db.relationship("Follower", foreign_keys="Follower.followed_id", backref="followed", lazy=True,
+                                cascade="all, delete", passive_deletes=True)
+    following = db.relationship("Follower", foreign_keys="Follower.follower_id", backref="follower", lazy=True,
+                                cascade="all, delete", passive_deletes=True)
 
 class Post(db.Model):
     __tablename__ = "posts"
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    author_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    comments = db.relationship("Comment", backref="post", lazy=True)
-    likes = db.relationship("PostLike", backref="post", lazy=True)
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    deleted_at = db.Column(db.DateTime, nullable=True)   # Soft-deleted, awaiting purge (see deletion.py)
+    # Pushed into followers' timelines when created; otherwise pulled into feeds at read time
+    fanned_out = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    comments = db.relationship("Comment", backref="post", lazy=True, cascade="all, delete", passive_deletes=True)
+    likes = db.relationship("PostLike", backref="post", lazy=True, cascade="all, delete", passive_deletes=True)
+    __table_args__ = (
+        db.Index("idx_posts_created_at_id", "created_at", "id"),
+        db.Index("idx_posts_author_created_at_id", "author_id", "created_at", "id"),
+        db.Index("idx_posts_deleted_at", "deleted_at"),
+        db.Index("idx_posts_fanned_out_author_created_at_id", "fanned_out", "author_id", "created_at", "id"),
+    )
 
 class Comment(db.Model):
+    """A comment or a reply. Replies carry a materialized path (see ``threads.py``); top-level
+    comments leave ``root_id``/``path`` empty."""
     __tablename__ = "comments"
     id = db.Column(db.Integer, primary_key=True)
-    post_id = db.Column(db.Integer, db.ForeignKey("posts.id"), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    author_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    likes = db.relationship("CommentLike", backref="comment", lazy=True)
+    parent_id = db.Column(db.Integer, db.ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)   # Direct parent
+    root_id = db.Column(db.Integer, nullable=True)       # Top-level comment of the thread
+    path = db.Column(db.String(255), nullable=True)      # Ancestor ids and own id, zero-padded
+    depth = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")   # Direct replies
+    deleted_at = db.Column(db.DateTime, nullable=True)   # Soft-deleted, awaiting purge (see deletion.py)
+    likes = db.relationship("CommentLike", backref="comment", lazy=True, cascade="all, delete", passive_deletes=True)
+    __table_args__ = (
+        db.Index("idx_comments_post_created_at_id", "post_id", "created_at", "id"),
+        db.Index("idx_comments_post_depth_created_at_id", "post_id", "depth", "created_at", "id"),
+        db.Index("idx_comments_root_path", "root_id", "path"),
+        db.Index("idx_comments_parent", "parent_id"),
+        db.Index("idx_comments_deleted_at", "deleted_at"),
+    )
 
 class PostLike(db.Model):
     __tablename__ = "post_likes"
     id = db.Column(db.Integer, primary_key=True)
-    post_id = db.Column(db.Integer, db.ForeignKey("posts.id"), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     is_like = db.Column(db.Boolean, default=True)
     __table_args__ = (db.UniqueConstraint("post_id", "user_id", name="unique_post_user"),)
 
 class CommentLike(db.Model):
     __tablename__ = "comment_likes"
     id = db.Column(db.Integer, primary_key=True)
-    comment_id = db.Column(db.Integer, db.ForeignKey("comments.id"), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comments.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     is_like = db.Column(db.Boolean, default=True)
     __table_args__ = (db.UniqueConstraint("comment_id", "user_id", name="unique_comment_user"),)
 
 class Follower(db.Model):
     __tablename__ = "followers"
     id = db.Column(db.Integer, primary_key=True)
-    follower_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    followed_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    __table_args__ = (db.UniqueConstraint("follower_id", "followed_id", name="unique_follow"),)
+    follower_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    followed_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint("follower_id", "followed_id", name="unique_follow"),
+        db.Index("idx_followers_followed", "followed_id"),
+    )
+
+class TimelineEntry(db.Model):
+    """A post pushed into a follower's home feed when it was created (fan-out on write)."""
+    __tablename__ = "timelines"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)   # Feed owner
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    # Copied from post, for unfollow
+    author_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)   # Copied from post, for ordering
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "post_id", name="unique_timeline_post"),
+        db.Index("idx_timelines_user_created_at_post", "user_id", "created_at", "post_id"),
+        db.Index("idx_timelines_post", "post_id"),
+    )
+
+class PostScore(db.Model):
+    """Time-decayed popularity of a post (see ``trending.py``); only posts with recent activity have a row."""
+    __tablename__ = "post_scores"
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    epoch = db.Column(db.Float, nullable=False)   # Scale of score; equals trending_state.epoch
+    __table_args__ = (db.Index("idx_post_scores_score", "score"),)
+
+class TrendingState(db.Model):
+    """Single row holding the epoch all trending scores are currently scaled to."""
+    __tablename__ = "trending_state"
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.Float, nullable=False)
 
 class Notification(db.Model):
     __tablename__ = "notifications"
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)   # Recipient
-    actor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)  # Actor
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)   # Recipient
+    actor_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # Actor
     type = db.Column(db.String(50), nullable=False)  # e.g. "follow", "like_post"
-    post_id = db.Column(db.Integer, db.ForeignKey("posts.id"), nullable=True)
-    comment_id = db.Column(db.Integer, db.ForeignKey("comments.id"), nullable=True)
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.id", ondelete="CASCADE"), nullable=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     message = db.Column(db.String(256), nullable=False)  # required not nullable
 
     recipient = db.relationship("User", foreign_keys=[user_id], back_populates="notifications")
     actor = db.relationship("User", foreign_keys=[actor_id], back_populates="sent_notifications")
+    __table_args__ = (
+        db.Index("idx_notifications_user_created_at_id", "user_id", "created_at", "id"),
+        db.Index("idx_notifications_user_unread_created_at", "user_id", "is_read", "created_at"),
+        db.Index("idx_notifications_user_id", "user_id", "id"),   # Streams: a user's rows after an id
+        db.Index("idx_notifications_post", "post_id"),            # Cascading and purging deletes
+        db.Index("idx_notifications_comment", "comment_id"),
+    )
+
+class NotificationOutbox(db.Model):
+    """Durable hand-off for notifications written in the request's transaction (NOTIFICATIONS_MODE="outbox").
+
+    Rows are short-lived, so there are no foreign keys to check on the hot insert path.
+    """
+    __tablename__ = "notification_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    post_id = db.Column(db.Integer, nullable=True)
+    comment_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class NotificationArchive(db.Model):
+    """Read notifications moved out of ``notifications`` by the prune job (NOTIFICATIONS_ARCHIVE = True)."""
+    __tablename__ = "notifications_archive"
+    id = db.Column(db.Integer, primary_key=True)   # Same id as in notifications
+    user_id = db.Column(db.Integer, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    post_id = db.Column(db.Integer, nullable=True)
+    comment_id = db.Column(db.Integer, nullable=True)
+    is_read = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime)
+    message = db.Column(db.String(256), nullable=False)
+    __table_args__ = (db.Index("idx_notifications_archive_user_created_at", "user_id", "created_at"),)
+
+class JobRun(db.Model):
+    """Schedule, lease and last result of one maintenance job (see ``jobs.py``)."""
+    __tablename__ = "job_runs"
+    name = db.Column(db.String(64), primary_key=True)
+    locked_until = db.Column(db.DateTime, nullable=True)   # Lease held by the process running it
+    last_started = db.Column(db.DateTime, nullable=True)
+    last_finished = db.Column(db.DateTime, nullable=True)
+    last_duration = db.Column(db.Float, nullable=True)      # Seconds
+    last_rows = db.Column(db.Integer, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+
+class SchemaMigration(db.Model):
+    """A schema migration applied by ``flask db upgrade`` (see ``migrations.py``)."""
+    __tablename__ = "schema_migrations"
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,240 @@
+"""Live notification delivery for ``GET /notifications/stream`` (Server-Sent Events).
+
+Each process has a ``Hub`` of open streams by user. When notification rows commit, whether
+from the request ("inline"), the worker threads or the outbox poller, ``notifications`` tells the
+hub which users got some, and it wakes their streams. A woken stream reads its user's rows past
+the last id it sent from the primary and sends each as an event whose id is the notification
+id. A client that reconnects with ``Last-Event-ID`` resumes with the same query, so nothing
+falls between connections. Between events a stream holds no database connection.
+
+``NOTIFICATIONS_STREAM_BACKEND`` carries wake-ups between processes:
+
+* ``"memory"`` – this process only; enough when one process serves everything.
+* ``"poll"`` – while this process has streams open, one thread reads the ids and recipients of
+  notifications newer than the last it saw every ``NOTIFICATIONS_STREAM_POLL_INTERVAL`` seconds
+  and wakes their streams. Ids that appear late (an earlier transaction committing after a later
+  one) are rechecked for a few polls. One small indexed query per process replaces the polling of
+  every client.
+
+A broker (Redis pub/sub, PostgreSQL LISTEN/NOTIFY) would be another class in ``BACKENDS`` with
+``publish``, ``start`` and ``stop``.
+
+Every stream occupies a server thread, so size ``SERVE_THREADS`` for them. Streams are capped per
+user (``NOTIFICATIONS_STREAM_MAX_PER_USER``) and per process
+(``NOTIFICATIONS_STREAM_MAX_CONNECTIONS``), both counted per process. A stream sends a comment
+line every ``NOTIFICATIONS_STREAM_HEARTBEAT`` seconds so proxies keep it open. It ends after
+``NOTIFICATIONS_STREAM_MAX_SECONDS``, and the client reconnects with ``Last-Event-ID``. Streams
+end at once when the worker shuts down.
+"""
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from blog_api.models import db, Notification
+from blog_api.schemas import serialize_notification
+
+log = logging.getLogger(__name__)
+
+# Polls an id missing from the sequence is rechecked for before it is taken as rolled back
+GAP_POLLS = 10
+MAX_GAPS = 10000
+# Milliseconds a client waits before reconnecting once a stream ends
+RETRY_MS = 2000
+
+
+class TooManyStreams(Exception):
+    """The user, or this process, already has the maximum number of streams open."""
+
+
+class Subscription:
+    """One open stream; woken when its user may have new notifications."""
+
+    def __init__(self, hub, user_id):
+        self.hub = hub
+        self.user_id = user_id
+        self._woken = threading.Event()
+
+    def wake(self):
+        self._woken.set()
+
+    def wait(self, timeout):
+        """Block until woken or ``timeout`` seconds pass; returns whether it was woken."""
+        woken = self._woken.wait(timeout)
+        self._woken.clear()
+        return woken
+
+    @property
+    def closed(self):
+        return self.hub.closed
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class MemoryBackend:
+    """Wakes streams in this process only."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, user_ids):
+        self.hub.wake(user_ids)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class PollingBackend(MemoryBackend):
+    """Also wakes this process's streams for notifications committed by other processes."""
+
+    def __init__(self, hub):
+        super().__init__(hub)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = None
+
+    def start(self):
+        # Threads do not survive fork(); each worker process starts its own poller
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            threading.Thread(target=self._run, name="notification-stream-poll", daemon=True).start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        if self._pid == os.getpid():
+            self._stop.set()
+            self._pid = None
+
+    def _run(self):
+        app, stop = self.hub.app, self._stop
+        last, gaps = None, {}
+        while not stop.wait(app.config["NOTIFICATIONS_STREAM_POLL_INTERVAL"]):
+            if not self.hub.has_streams():
+                last, gaps = None, {}
+                continue
+            try:
+                with app.app_context():
+                    last, gaps = self.poll(last, gaps)
+            except Exception:
+                log.exception("Notification stream poll failed")
+
+    def poll(self, last, gaps):
+        """Wake the recipients of notifications after ``last`` or in ``gaps``; returns the new state."""
+        if last is None:
+            return db.session.query(func.max(Notification.id)).scalar() or 0, {}
+        condition = Notification.id > last
+        if gaps:
+            condition = or_(condition, Notification.id.in_(list(gaps)))
+        rows = db.session.query(Notification.id, Notification.user_id).filter(condition).all()
+        db.session.close()
+        if rows:
+            self.hub.wake({user_id for _, user_id in rows})
+        seen = {i for i, _ in rows}
+        top = max(seen | {last})
+        gaps = {i: n - 1 for i, n in gaps.items() if i not in seen and n > 1}
+        if top - last <= MAX_GAPS:
+            gaps.update((i, GAP_POLLS) for i in range(last + 1, top) if i not in seen)
+        return top, gaps
+
+
+BACKENDS = {"memory": MemoryBackend, "poll": PollingBackend}
+
+
+class Hub:
+    """Open streams of this process by user; stored in ``app.extensions["notification_stream"]``."""
+
+    def __init__(self, app):
+        self.app = app
+        self.closed = False
+        self._lock = threading.Lock()
+        self._streams = {}
+        self._count = 0
+        self.backend = BACKENDS[app.config["NOTIFICATIONS_STREAM_BACKEND"]](self)
+
+    def subscribe(self, user_id):
+        cfg = self.app.config
+        with self._lock:
+            streams = self._streams.get(user_id, ())
+            if (len(streams) >= cfg["NOTIFICATIONS_STREAM_MAX_PER_USER"]
+                    or self._count >= cfg["NOTIFICATIONS_STREAM_MAX_CONNECTIONS"]):
+                raise TooManyStreams(user_id)
+            subscription = Subscription(self, user_id)
+            self._streams.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        self.backend.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._streams.get(subscription.user_id)
+            if streams and subscription in streams:
+                streams.discard(subscription)
+                self._count -= 1
+                if not streams:
+                    del self._streams[subscription.user_id]
+
+    def has_streams(self):
+        return self._count > 0
+
+    def wake(self, user_ids):
+        with self._lock:
+            woken = [s for user_id in user_ids for s in self._streams.get(user_id, ())]
+        for subscription in woken:
+            subscription.wake()
+
+    def published(self, user_ids):
+        """Notifications for ``user_ids`` were just committed in this process."""
+        self.backend.publish(user_ids)
+
+    def close(self):
+        """End every stream (worker shutdown)."""
+        self.closed = True
+        self.backend.stop()
+        with self._lock:
+            woken = [s for streams in self._streams.values() for s in streams]
+        for subscription in woken:
+            subscription.wake()
+
+
+def events(subscription, last_id):
+    """The SSE body for ``subscription``: its user's notifications after ``last_id``, then new ones."""
+    cfg = current_app.config
+    dumps = current_app.json.dumps
+    batch = cfg["NOTIFICATIONS_STREAM_BATCH"]
+    deadline = time.monotonic() + cfg["NOTIFICATIONS_STREAM_MAX_SECONDS"]
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while not subscription.closed:
+            rows = (Notification.query
+                    .filter(Notification.user_id == subscription.user_id, Notification.id > last_id)
+                    .order_by(Notification.id).limit(batch).all())
+            db.session.close()  # give the connection back while the stream waits
+            for n in rows:
+                yield f"id: {n.id}\nevent: notification\ndata: {dumps(serialize_notification(n))}\n\n"
+                last_id = n.id
+            if len(rows) == batch:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not subscription.wait(min(cfg["NOTIFICATIONS_STREAM_HEARTBEAT"], remaining)):
+                yield ": heartbeat\n\n"
+    finally:
+        subscription.close()
+
+
+def init_app(app):
+    hub = Hub(app)
+    app.extensions["notification_stream"] = hub
+    return hub
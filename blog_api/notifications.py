@@ -0,0 +1,267 @@
+"""Notification delivery, decoupled from the request transaction.
+
+Handlers call ``notify(...)`` before committing. What happens next depends on
+``NOTIFICATIONS_MODE``:
+
+* ``"thread"`` – events ride on the session and are handed to an in-process queue only once the
+  request's commit succeeds. A small pool of worker threads drains the queue in batches, looks up
+  actor names once per batch, coalesces bursts ("alice and 4 others liked your post.") and writes
+  them with one multi-row INSERT.
+* ``"outbox"`` – a ``notification_outbox`` row is written in the request's transaction, so the event
+  survives a crash; a poller thread moves outbox rows into ``notifications`` in batches.
+* ``"inline"`` – notifications are built and added to the request's own transaction (tests, scripts).
+
+Whichever way they are written, the recipients' open ``/notifications/stream`` connections are
+woken once the rows commit (see ``notification_stream.py``).
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import weakref
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, insert
+
+from blog_api.models import db, User, Notification, NotificationOutbox
+
+log = logging.getLogger(__name__)
+
+TEMPLATES = {
+    "like_post": "{actor} liked your post.",
+    "like_comment": "{actor} liked your comment.",
+    "reply_comment": "{actor} replied to your comment.",
+    "follow": "{actor} started following you.",
+}
+COALESCED_TEMPLATES = {
+    "like_post": "{actor} and {others} liked your post.",
+    "like_comment": "{actor} and {others} liked your comment.",
+    "reply_comment": "{actor} and {others} replied to your comment.",
+}
+
+
+def notify(user_id, actor_id, type, post_id=None, comment_id=None, actor_name=None):
+    """Queue a notification for ``user_id``; delivery depends on ``NOTIFICATIONS_MODE``.
+
+    Pass ``actor_name`` when the caller already knows it to save looking it up.
+    """
+    evt = {"user_id": user_id, "actor_id": actor_id, "type": type, "post_id": post_id,
+           "comment_id": comment_id, "created_at": datetime.utcnow()}
+    mode = current_app.config["NOTIFICATIONS_MODE"]
+    if actor_name is not None and mode != "outbox":
+        evt["actor_name"] = actor_name
+    if mode == "outbox":
+        db.session.add(NotificationOutbox(**evt))
+        current_app.extensions["notifications"].start()
+    elif mode == "inline":
+        insert_rows(build_rows([evt]))
+    else:
+        db.session.info.setdefault("pending_notifications", []).append(
+            (current_app.extensions["notifications"], evt))
+
+
+def insert_rows(rows):
+    """Insert ``notifications`` rows in the current transaction; their recipients' streams wake on commit."""
+    db.session.execute(insert(Notification), rows)
+    db.session.info.setdefault("notified_users", set()).update(r["user_id"] for r in rows)
+
+
+def build_rows(events):
+    """Turn raw events into ``notifications`` rows, merging repeated events on the same target."""
+    names = {e["actor_id"]: e["actor_name"] for e in events if "actor_name" in e}
+    missing = {e["actor_id"] for e in events} - names.keys()
+    if missing:
+        names.update(db.session.query(User.id, User.username).filter(User.id.in_(missing)).all())
+    groups = {}
+    for e in events:
+        if e["type"] in COALESCED_TEMPLATES:
+            key = (e["user_id"], e["type"], e["post_id"], e["comment_id"])
+        else:
+            key = id(e)
+        groups.setdefault(key, []).append(e)
+    rows = []
+    for group in groups.values():
+        latest = max(group, key=lambda e: e["created_at"])
+        actors = list(dict.fromkeys(e["actor_id"] for e in reversed(group)))
+        actor = names.get(latest["actor_id"], "Someone")
+        if len(actors) > 1:
+            others = len(actors) - 1
+            message = COALESCED_TEMPLATES[latest["type"]].format(
+                actor=actor, others=f"{others} other" if others == 1 else f"{others} others")
+        else:
+            message = TEMPLATES.get(latest["type"], "{actor} interacted with you.").format(actor=actor)
+        rows.append({
+            "user_id": latest["user_id"],
+            "actor_id": latest["actor_id"],
+            "type": latest["type"],
+            "post_id": latest["post_id"],
+            "comment_id": latest["comment_id"],
+            "created_at": latest["created_at"],
+            "message": message[:256],
+        })
+    return rows
+
+
+class NotificationDispatcher:
+    """Per-app worker pool; created by ``init_app`` and stored in ``app.extensions``."""
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._outbox_lock = threading.Lock()
+        self._pid = None
+        self._threads = []
+        self._queue = None
+        self._stop = None
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so a forked worker starts its own pool on first use
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            cfg = self.app.config
+            self._queue = queue.Queue()
+            self._stop = threading.Event()
+            if cfg["NOTIFICATIONS_MODE"] == "outbox":
+                targets = [self._poll_outbox]
+            else:
+                targets = [self._drain_queue] * cfg["NOTIFICATIONS_WORKERS"]
+            self._threads = [
+                threading.Thread(target=t, name=f"notifications-{i}", daemon=True)
+                for i, t in enumerate(targets)
+            ]
+            for t in self._threads:
+                t.start()
+            self._pid = os.getpid()
+
+    def start(self):
+        self._ensure_started()
+
+    def submit(self, evt):
+        self._ensure_started()
+        self._queue.put(evt)
+
+    def flush(self):
+        """Block until every submitted event has been written (or every outbox row moved)."""
+        if self.app.config["NOTIFICATIONS_MODE"] == "outbox":
+            with self.app.app_context():
+                while self.process_outbox():
+                    pass
+        elif self._queue is not None:
+            self._queue.join()
+
+    def stop(self, timeout=5):
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._pid = None
+
+    def _drain_queue(self):
+        batch_size = self.app.config["NOTIFICATIONS_BATCH_SIZE"]
+        linger = self.app.config["NOTIFICATIONS_LINGER"]
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._queue.task_done()
+                return
+            batch = [first]
+            try:
+                # Give a burst a moment to accumulate so it lands as one INSERT
+                while len(batch) < batch_size:
+                    evt = self._queue.get(timeout=linger)
+                    if evt is None:
+                        self._queue.put(None)
+                        self._queue.task_done()
+                        break
+                    batch.append(evt)
+            except queue.Empty:
+                pass
+            try:
+                with self.app.app_context():
+                    insert_rows(build_rows(batch))
+                    db.session.commit()
+            except Exception:
+                log.exception("Dropped %d notifications", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def process_outbox(self):
+        """Move one batch from the outbox into notifications; returns the number of events moved.
+
+        SKIP LOCKED keeps workers in different processes off each other's rows on MySQL; the
+        lock does the same for threads of this process on backends without row locks.
+        """
+        with self._outbox_lock:
+            return self._process_outbox()
+
+    def _process_outbox(self):
+        rows = (NotificationOutbox.query.order_by(NotificationOutbox.id)
+                .limit(self.app.config["NOTIFICATIONS_BATCH_SIZE"])
+                .with_for_update(skip_locked=True).all())
+        if not rows:
+            db.session.rollback()
+            return 0
+        events = [{c: getattr(r, c) for c in ("user_id", "actor_id", "type", "post_id", "comment_id", "created_at")}
+                  for r in rows]
+        insert_rows(build_rows(events))
+        NotificationOutbox.query.filter(NotificationOutbox.id.in_([r.id for r in rows])) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        return len(rows)
+
+    def _poll_outbox(self):
+        interval = self.app.config["NOTIFICATIONS_POLL_INTERVAL"]
+        moved = 0
+        while not self._stop.wait(0 if moved else interval):
+            try:
+                with self.app.app_context():
+                    moved = self.process_outbox()
+            except Exception:
+                log.exception("Outbox batch failed")
+                moved = 0
+
+
+def _after_commit(session):
+    for dispatcher, evt in session.info.pop("pending_notifications", ()):
+        dispatcher.submit(evt)
+    users = session.info.pop("notified_users", None)
+    if users and has_app_context():
+        hub = current_app.extensions.get("notification_stream")
+        if hub is not None:
+            hub.published(users)
+
+
+def _after_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop("pending_notifications", None)
+        session.info.pop("notified_users", None)
+
+
+# Dispatchers of apps still alive, flushed by one exit hook however many apps were created
+_dispatchers = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_dispatchers():
+    for dispatcher in list(_dispatchers):
+        dispatcher.stop()
+
+
+def init_app(app):
+    dispatcher = NotificationDispatcher(app)
+    app.extensions["notifications"] = dispatcher
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_soft_rollback", _after_rollback)
+    _dispatchers.add(dispatcher)
+    return dispatcher
@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import DateTime, and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row of a page into an opaque string."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values],
+                     separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    """Inverse of encode_cursor, coercing each value to the type of its column."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor(cursor)
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for v, col in zip(values, columns)
+        ]
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def page_args():
+    """Read ``limit`` and ``cursor`` from the query string, clamping limit to the configured bounds."""
+    default = current_app.config.get("PAGE_SIZE_DEFAULT", 20)
+    maximum = current_app.config.get("PAGE_SIZE_MAX", 100)
+    limit = request.args.get("limit", default, type=int)
+    return max(1, min(limit, maximum)), request.args.get("cursor") or None
+
+
+def keyset_filter(columns, values, descending=True):
+    """Build ``(c1, c2, ...) < (v1, v2, ...)`` (or ``>``) as nested OR/AND so MySQL can use the index."""
+    clauses = []
+    for i, (col, val) in enumerate(zip(columns, values)):
+        equal = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal, col < val if descending else col > val))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, columns, cursor, limit, key, descending=True):
+    """Return ``(rows, next_cursor)`` for one page of ``query`` ordered by ``columns``.
+
+    ``key`` maps a row to the tuple of values for ``columns``; it is used to build the cursor
+    that resumes after the last row. ``next_cursor`` is None on the last page.
+    """
+    if cursor:
+        query = query.filter(keyset_filter(columns, decode_cursor(cursor, columns), descending))
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    rows = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(*key(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,89 @@
+"""Password hashing off the request thread.
+
+``PASSWORD_HASH_ALGORITHM`` selects bcrypt, scrypt or pbkdf2 with the cost set in config.
+Hashing runs in a small thread pool (the hash functions release the GIL), so at most
+``PASSWORD_HASH_WORKERS`` hashes burn CPU at once and other requests stay responsive during a
+login spike. At most ``PASSWORD_HASH_MAX_PENDING`` more may wait; beyond that callers get
+``HasherBusy`` and the route answers 503.
+
+Stored hashes made with another algorithm or cost still verify, and ``needs_rehash`` tells
+login to upgrade them.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+
+    def __init__(self, config):
+        self.algorithm = config["PASSWORD_HASH_ALGORITHM"]
+        self.bcrypt_rounds = config["BCRYPT_LOG_ROUNDS"]
+        self.pbkdf2_iterations = config["PBKDF2_ITERATIONS"]
+        self.scrypt_n = config["SCRYPT_N"]
+        self.workers = config["PASSWORD_HASH_WORKERS"] or os.cpu_count() or 1
+        self.max_pending = config["PASSWORD_HASH_MAX_PENDING"]
+        if self.algorithm not in ("bcrypt", "scrypt", "pbkdf2"):
+            raise ValueError(f"Unknown PASSWORD_HASH_ALGORITHM {self.algorithm!r}")
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    @property
+    def _werkzeug_method(self):
+        if self.algorithm == "scrypt":
+            return f"scrypt:{self.scrypt_n}:8:1"
+        return f"pbkdf2:sha256:{self.pbkdf2_iterations}"
+
+    def _hash(self, password):
+        if self.algorithm == "bcrypt":
+            return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.bcrypt_rounds)).decode()
+        return generate_password_hash(password, method=self._werkzeug_method)
+
+    @staticmethod
+    def _verify(stored, password):
+        if stored.startswith("$2"):
+            return bcrypt.checkpw(password.encode(), stored.encode())
+        return check_password_hash(stored, password)
+
+    def needs_rehash(self, stored):
+        if self.algorithm == "bcrypt":
+            return not stored.startswith("$2") or int(stored.split("$")[2]) != self.bcrypt_rounds
+        return stored.split("$", 1)[0] != self._werkzeug_method
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            if self._pid != os.getpid():
+                # A pool's threads do not survive fork(); each worker process builds its own
+                with self._lock:
+                    if self._pid != os.getpid():
+                        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+                        self._pid = os.getpid()
+            return self._pool.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(self._hash, password)
+
+    def verify(self, stored, password):
+        return self._run(self._verify, stored, password)
+
+
+def init_app(app):
+    app.extensions["passwords"] = PasswordHasher(app.config)
+
+
+def hasher():
+    return current_app.extensions["passwords"]
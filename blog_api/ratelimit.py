@@ -0,0 +1,156 @@
+"""Per-client rate limits and a global concurrency cap.
+
+``RATELIMITS`` maps an endpoint name to ``(requests, seconds)``: a token bucket that holds
+``requests`` tokens and refills at ``requests / seconds`` per second, one bucket per endpoint
+per client. Clients are identified by JWT identity when the request carries a valid token and
+by remote address otherwise. An empty bucket answers 429 with ``Retry-After``.
+
+Buckets live in process memory (``RATELIMIT_BACKEND = "memory"``), or in a local SQLite file
+shared by every worker process on the host (``"sqlite"``). Anything with a
+``take(key, capacity, rate)`` method can be plugged in via ``app.extensions["ratelimit"]``.
+
+``ADMISSION_MAX_CONCURRENT`` caps the requests a process works on at once; requests that
+cannot get a slot within ``ADMISSION_QUEUE_TIMEOUT`` seconds are shed with 503, so a spike
+queues at the load balancer instead of inflating every request's latency here.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+
+class MemoryBuckets:
+    """Token buckets in an LRU dict; an evicted client simply starts with a full bucket."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take one token; returns ``(allowed, seconds until a token is available)``."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class SQLiteBuckets:
+    """Token buckets in a local SQLite file, updated atomically under ``BEGIN IMMEDIATE``."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+def make_backend(app):
+    cfg = app.config
+    if cfg["RATELIMIT_BACKEND"] == "sqlite":
+        path = cfg["RATELIMIT_SQLITE_PATH"] or os.path.join(app.instance_path, "ratelimit.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteBuckets(path)
+    if cfg["RATELIMIT_BACKEND"] == "memory":
+        return MemoryBuckets(cfg["RATELIMIT_MAX_KEYS"])
+    raise ValueError(f"Unknown RATELIMIT_BACKEND {cfg['RATELIMIT_BACKEND']!r}")
+
+
+def client_key():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # A bad token is rejected by the view itself; until then treat it as anonymous
+        identity = None
+    return f"user:{identity}" if identity is not None else f"ip:{request.remote_addr}"
+
+
+def _too_many(retry_after):
+    response = jsonify({"error": "Too many requests"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _check_rate_limit():
+    budget = current_app.config["RATELIMITS"].get(request.endpoint)
+    if budget is None:
+        return None
+    requests, seconds = budget
+    allowed, retry_after = current_app.extensions["ratelimit"].take(
+        f"{request.endpoint}:{client_key()}", requests, requests / seconds)
+    return None if allowed else _too_many(retry_after)
+
+
+class Admission:
+    """Process-wide cap on requests in flight."""
+
+    def __init__(self, max_concurrent, timeout):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def enter(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            response = jsonify({"error": "Server busy, try again shortly"})
+            response.status_code = 503
+            response.headers["Retry-After"] = "1"
+            return response
+        g.admitted = True
+        return None
+
+    def leave(self, exc=None):
+        if g.pop("admitted", False):
+            self._slots.release()
+
+
+def init_app(app):
+    cfg = app.config
+    app.extensions["ratelimit"] = make_backend(app)
+    if cfg["ADMISSION_MAX_CONCURRENT"]:
+        admission = app.extensions["admission"] = Admission(cfg["ADMISSION_MAX_CONCURRENT"],
+                                                            cfg["ADMISSION_QUEUE_TIMEOUT"])
+        app.before_request(admission.enter)
+        app.teardown_request(admission.leave)
+    if cfg["RATELIMIT_ENABLED"]:
+        app.before_request(_check_rate_limit)
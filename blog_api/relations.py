@@ -0,0 +1,98 @@
+"""Likes (of posts and comments) and follows as idempotent set/unset operations.
+
+Adding is a single ``INSERT ... SELECT`` that skips an existing row instead of failing on the
+unique constraint (``ON CONFLICT DO NOTHING`` on SQLite and PostgreSQL, ``INSERT IGNORE`` on
+MySQL). Removing is a single ``DELETE``. Either way the statement's row count says whether
+anything changed, and counters, timelines and notifications are only touched when it did, so
+two concurrent requests for the same pair can neither fail nor double count.
+"""
+from importlib import import_module
+
+from sqlalchemy import delete, insert, literal, select, true
+
+from blog_api.models import db, User, Post, PostLike, Comment, CommentLike, Follower
+from blog_api.counters import bump
+from blog_api import feed
+
+
+def insert_ignore(model, columns, select_stmt):
+    """``INSERT INTO model (columns) <select_stmt>``, skipping rows that hit a unique constraint.
+    Returns the number of rows inserted."""
+    dialect = db.engine.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # Looked up here: the engine has already loaded its own dialect, importing both costs startup time
+        dialect_insert = import_module(f"sqlalchemy.dialects.{dialect}").insert
+        stmt = dialect_insert(model).from_select(columns, select_stmt).on_conflict_do_nothing()
+    else:
+        stmt = insert(model).from_select(columns, select_stmt)
+    if dialect == "mysql":
+        # ON DUPLICATE KEY UPDATE reports a matched row as affected, so it cannot tell "inserted"
+        # from "already there"; IGNORE can
+        stmt = stmt.prefix_with("IGNORE")
+    return db.session.execute(stmt).rowcount
+
+
+def _add_like(like_model, target_model, target_fk, user_id, target_id):
+    added = insert_ignore(like_model, [target_fk, "user_id", "is_like"],
+                          select(target_model.id, literal(user_id), true())
+                          .where(target_model.id == target_id, target_model.deleted_at.is_(None)))
+    if added:
+        bump(target_model.like_count, target_id)
+        return True
+    if db.session.query(target_model.id).filter(target_model.id == target_id).first() is None:
+        return None
+    return False
+
+
+def _remove_like(like_model, target_model, target_fk, user_id, target_id):
+    removed = db.session.execute(
+        delete(like_model).where(target_fk == target_id, like_model.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if removed:
+        bump(target_model.like_count, target_id, -1)
+    return bool(removed)
+
+
+def add_like(user_id, post_id):
+    """Like ``post_id``; returns True if newly liked, False if already liked, None if no such post."""
+    return _add_like(PostLike, Post, "post_id", user_id, post_id)
+
+
+def remove_like(user_id, post_id):
+    """Unlike ``post_id``; returns True if a like was removed."""
+    return _remove_like(PostLike, Post, PostLike.post_id, user_id, post_id)
+
+
+def add_comment_like(user_id, comment_id):
+    """Like ``comment_id``; returns True if newly liked, False if already liked, None if no such comment."""
+    return _add_like(CommentLike, Comment, "comment_id", user_id, comment_id)
+
+
+def remove_comment_like(user_id, comment_id):
+    """Unlike ``comment_id``; returns True if a like was removed."""
+    return _remove_like(CommentLike, Comment, CommentLike.comment_id, user_id, comment_id)
+
+
+def add_follow(follower_id, followed_id):
+    """Follow ``followed_id``; returns True if newly followed."""
+    added = insert_ignore(Follower, ["follower_id", "followed_id"],
+                          select(User.id, literal(followed_id)).where(User.id == follower_id))
+    if added:
+        bump(User.follower_count, followed_id)
+        bump(User.following_count, follower_id)
+        feed.backfill_timeline(follower_id, followed_id)
+    return bool(added)
+
+
+def remove_follow(follower_id, followed_id):
+    """Unfollow ``followed_id``; returns True if a follow was removed."""
+    removed = db.session.execute(
+        delete(Follower).where(Follower.follower_id == follower_id, Follower.followed_id == followed_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if removed:
+        bump(User.follower_count, followed_id, -1)
+        bump(User.following_count, follower_id, -1)
+        feed.remove_author_from_timeline(follower_id, followed_id)
+    return bool(removed)
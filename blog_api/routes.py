@@ -1,9 +1,21 @@
-from flask import request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Response, request, jsonify, stream_with_context
+from flask_jwt_extended import create_access_token, current_user, get_jwt, get_jwt_identity, jwt_required
+from sqlalchemy import false, literal, select, true
+from sqlalchemy.orm import joinedload, load_only
 from flasgger import swag_from
 
-from blog_api.models import db, User, Post, Comment, PostLike, CommentLike, Follower, Notification
+from blog_api.models import db, User, Post, Comment, PostLike, Notification
+from blog_api.pagination import InvalidCursor, decode_cursor, keyset_filter, keyset_paginate, page_args
+from blog_api import deletion, feed, metrics, relations, search, threads, trending
+from blog_api.counters import bump
+from blog_api.notifications import notify
+from blog_api.notification_stream import TooManyStreams, events as notification_events
+from blog_api.cache import cache
+from blog_api.passwords import HasherBusy, hasher
+from blog_api.database import read_replica
+from blog_api.auth import blocklist
+from blog_api.streaming import stream_rows, wants_stream
+from blog_api.schemas import serialize_comment, serialize_notification, serialize_post
 
 def init_routes(app):
 
@@ -11,6 +23,22 @@ def init_routes(app):
     def home():
         return "Welcome to the Blog API 🚀"
 
+    @app.route("/metrics")
+    @swag_from({
+        "tags": ["Monitoring"],
+        "responses": {"200": {"description": "Per-endpoint latency, SQL, serialization and size metrics (Prometheus text)"}}
+    })
+    def get_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.errorhandler(InvalidCursor)
+    def invalid_cursor(e):
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(e):
+        return jsonify({"error": "Server busy, try again shortly"}), 503, {"Retry-After": "1"}
+
     # ---------------- Authentication ---------------- #
     @app.route("/register", methods=["POST"])
     @swag_from({
@@ -24,7 +52,8 @@ def init_routes(app):
             }}}}},
         "responses": {
             "201": {"description": "User registered successfully"},
-            "400": {"description": "Username or Email already exists"}
+            "400": {"description": "Username or Email already exists"},
+            "503": {"description": "Password hashing capacity exhausted"}
         }
     })
     def register():
@@ -38,7 +67,7 @@ def init_routes(app):
             return jsonify({"error": "Username already exists"}), 400
         if User.query.filter_by(email=email).first():
             return jsonify({"error": "Email already exists"}), 400
-        hashed_pw = generate_password_hash(password)
+        hashed_pw = hasher().hash(password)
         new_user = User(username=username, email=email, password=hashed_pw)
         db.session.add(new_user)
         db.session.commit()
@@ -63,7 +92,8 @@ def init_routes(app):
             }}}}},
         "responses": {
             "200": {"description": "JWT token returned"},
-            "401": {"description": "Invalid credentials"}
+            "401": {"description": "Invalid credentials"},
+            "503": {"description": "Password hashing capacity exhausted"}
         }
     })
     def login():
@@ -75,14 +105,29 @@ def init_routes(app):
         user = User.query.filter(
             (User.username == username_or_email) | (User.email == username_or_email)
         ).first()
-        if not user or not check_password_hash(user.password, password):
+        if not user or not hasher().verify(user.password, password):
             return jsonify({"error": "Invalid credentials"}), 401
+        if hasher().needs_rehash(user.password):
+            # Transparently move old hashes to the configured algorithm and cost
+            user.password = hasher().hash(password)
+            db.session.commit()
         access_token = create_access_token(identity=user.id)
         return jsonify({
             "message": "Login successful!",
             "access_token": access_token
         }), 200
 
+    @app.route("/logout", methods=["POST"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Authentication"],
+        "security": [{"bearerAuth": []}],
+        "responses": {"200": {"description": "Token revoked"}}
+    })
+    def logout():
+        blocklist().revoke(get_jwt())
+        return jsonify({"message": "Logged out"}), 200
+
     # ---------------- Posts ---------------- #
     @app.route("/posts", methods=["POST"])
     @jwt_required()
@@ -112,7 +157,11 @@ def init_routes(app):
         current_user_id = get_jwt_identity()
         new_post = Post(title=title, content=content, author_id=current_user_id)
         db.session.add(new_post)
+        db.session.flush()
+        feed.fan_out_post(new_post)
+        search.index_post(new_post)
         db.session.commit()
+        cache.invalidate("posts")
         return jsonify({
             "message": "Post created successfully!",
             "post": {
@@ -127,14 +176,89 @@ def init_routes(app):
     @app.route("/posts", methods=["GET"])
     @swag_from({
         "tags": ["Posts"],
-        "responses": {"200": {"description": "List of posts"}}
+        "parameters": [
+            {"name": "limit", "in": "query", "type": "integer", "required": False},
+            {"name": "cursor", "in": "query", "type": "string", "required": False},
+            {"name": "stream", "in": "query", "type": "boolean", "required": False,
+             "description": "Stream every remaining row (JSON, or NDJSON with Accept: application/x-ndjson)"}
+        ],
+        "responses": {
+            "200": {"description": "Page of posts, newest first, with next_cursor"},
+            "304": {"description": "Not modified (If-None-Match)"},
+            "400": {"description": "Invalid cursor"}
+        }
     })
+    @cache.cached("posts")
+    @read_replica
     def get_posts():
-        posts = Post.query.all()
-        return jsonify({"posts": [
-            {"id": p.id, "title": p.title, "content": p.content, "author_id": p.author_id, "created_at": p.created_at}
-            for p in posts
-        ]}), 200
+        limit, cursor = page_args()
+        if wants_stream():
+            return stream_rows("posts", Post.query, (Post.created_at, Post.id), cursor, serialize_post)
+        posts, next_cursor = keyset_paginate(
+            Post.query, (Post.created_at, Post.id), cursor, limit,
+            key=lambda p: (p.created_at, p.id)
+        )
+        return jsonify({"posts": [serialize_post(p) for p in posts], "next_cursor": next_cursor}), 200
+
+    @app.route("/posts/trending", methods=["GET"])
+    @swag_from({
+        "tags": ["Posts"],
+        "parameters": [
+            {"name": "limit", "in": "query", "type": "integer", "required": False,
+             "description": "Number of posts (at most TRENDING_SNAPSHOT_SIZE)"}
+        ],
+        "responses": {"200": {"description": "Most popular posts right now, best first, with their scores"}}
+    })
+    def get_trending_posts():
+        limit = request.args.get("limit", app.config["PAGE_SIZE_DEFAULT"], type=int)
+        posts = trending.snapshot()
+        return jsonify({"posts": posts[:max(1, limit)]}), 200
+
+    @app.route("/posts/<int:post_id>", methods=["GET"])
+    @swag_from({
+        "tags": ["Posts"],
+        "parameters": [
+            {"name": "limit", "in": "query", "type": "integer", "required": False,
+             "description": "Number of comments to include"}
+        ],
+        "responses": {
+            "200": {"description": "Post with author, counts and its first page of comments"},
+            "304": {"description": "Not modified (If-None-Match)"},
+            "404": {"description": "Post not found"}
+        }
+    })
+    @cache.cached("post:{post_id}", "comments:{post_id}")
+    @read_replica
+    def get_post(post_id):
+        # Exactly two queries: the post joined to its author, then one page of comments joined to theirs
+        author_fields = load_only(User.id, User.username)
+        post = Post.query.options(joinedload(Post.author).options(author_fields)).filter_by(id=post_id).first()
+        if not post:
+            return jsonify({"error": "Post not found"}), 404
+        limit, _ = page_args()
+        comments, next_cursor = keyset_paginate(
+            Comment.query.options(joinedload(Comment.author).options(author_fields)).filter_by(post_id=post_id),
+            (Comment.created_at, Comment.id), None, limit,
+            key=lambda c: (c.created_at, c.id), descending=False
+        )
+        return jsonify({
+            "post": {
+                "id": post.id,
+                "title": post.title,
+                "content": post.content,
+                "author": {"id": post.author.id, "username": post.author.username},
+                "created_at": post.created_at,
+                "updated_at": post.updated_at,
+                "like_count": post.like_count,
+                "comment_count": post.comment_count
+            },
+            "comments": [
+                {"id": c.id, "content": c.content, "author": {"id": c.author.id, "username": c.author.username},
+                 "created_at": c.created_at}
+                for c in comments
+            ],
+            "comments_next_cursor": next_cursor
+        }), 200
 
     @app.route("/posts/<int:post_id>", methods=["PUT"])
     @jwt_required()
@@ -171,7 +295,9 @@ def init_routes(app):
             post.title = title.strip()
         if content:
             post.content = content.strip()
+        search.index_post(post)
         db.session.commit()
+        cache.invalidate("posts", f"post:{post_id}")
         return jsonify({
             "message": "Post updated successfully",
             "post": {
@@ -197,8 +323,9 @@ def init_routes(app):
             return jsonify({"error": "Post not found"}), 404
         if post.author_id != current_user_id:
             return jsonify({"error": "Not authorized"}), 403
-        db.session.delete(post)
+        deletion.delete_post(post)
         db.session.commit()
+        cache.invalidate("posts", f"post:{post_id}", f"comments:{post_id}")
         return jsonify({"message": "Post deleted successfully"}), 200
 
     # ---------------- Comments ---------------- #
@@ -212,11 +339,16 @@ def init_routes(app):
             "content": {"application/json": {"schema": {
                 "type": "object",
                 "properties": {
-                    "content": {"type": "string"}
+                    "content": {"type": "string"},
+                    "parent_id": {"type": "integer", "description": "Comment to reply to (optional)"}
                 }
             }}}
         },
-        "responses": {"201": {"description": "Comment created successfully"}}
+        "responses": {
+            "201": {"description": "Comment created successfully"},
+            "400": {"description": "Content missing, or the reply would be nested too deeply"},
+            "404": {"description": "Post not found, or parent comment not found on this post"}
+        }
     })
     def create_comment_for_post(post_id):
         data = request.get_json() or {}
@@ -224,14 +356,31 @@ def init_routes(app):
         if not content:
             return jsonify({"error": "Content is required"}), 400
         current_user_id = get_jwt_identity()
-        new_comment = Comment(post_id=post_id, content=content, author_id=current_user_id)
-        db.session.add(new_comment)
+        if db.session.query(Post.id).filter(Post.id == post_id).first() is None:
+            return jsonify({"error": "Post not found"}), 404
+        parent = None
+        if data.get("parent_id") is not None:
+            parent = db.session.get(Comment, data["parent_id"]) if isinstance(data["parent_id"], int) else None
+            if parent is None or parent.post_id != post_id:
+                return jsonify({"error": "Parent comment not found"}), 404
+        try:
+            new_comment = threads.add_comment(post_id, current_user_id, content, parent,
+                                              max_depth=app.config["COMMENT_MAX_DEPTH"])
+        except threads.TooDeep:
+            return jsonify({"error": "Replies cannot be nested any deeper"}), 400
+        search.index_comment(new_comment)
+        if parent is not None and parent.author_id != current_user_id:
+            notify(parent.author_id, current_user_id, "reply_comment", post_id=post_id, comment_id=parent.id,
+                   actor_name=current_user.username)
         db.session.commit()
+        cache.invalidate(f"comments:{post_id}")
         return jsonify({
             "message": "Comment created successfully!",
             "comment": {
                 "id": new_comment.id,
                 "post_id": new_comment.post_id,
+                "parent_id": new_comment.parent_id,
+                "depth": new_comment.depth,
                 "content": new_comment.content,
                 "author_id": new_comment.author_id,
                 "created_at": new_comment.created_at
@@ -241,14 +390,61 @@ def init_routes(app):
     @app.route("/posts/<int:post_id>/comments", methods=["GET"])
     @swag_from({
         "tags": ["Comments"],
-        "responses": {"200": {"description": "List of comments"}}
+        "parameters": [
+            {"name": "limit", "in": "query", "type": "integer", "required": False},
+            {"name": "cursor", "in": "query", "type": "string", "required": False},
+            {"name": "stream", "in": "query", "type": "boolean", "required": False,
+             "description": "Stream every remaining row (JSON, or NDJSON with Accept: application/x-ndjson)"},
+            {"name": "thread", "in": "query", "type": "boolean", "required": False,
+             "description": "Page through top-level comments with their replies nested under them"},
+            {"name": "replies", "in": "query", "type": "integer", "required": False,
+             "description": "Replies nested per top-level comment with thread=true"}
+        ],
+        "responses": {
+            "200": {"description": "Page of comments, oldest first, with next_cursor"},
+            "304": {"description": "Not modified (If-None-Match)"}
+        }
     })
+    @cache.cached("comments:{post_id}")
+    @read_replica
     def get_comments_for_post(post_id):
-        comments = Comment.query.filter_by(post_id=post_id).all()
-        return jsonify({"comments": [
-            {"id": c.id, "post_id": c.post_id, "content": c.content, "author_id": c.author_id, "created_at": c.created_at}
-            for c in comments
-        ]}), 200
+        limit, cursor = page_args()
+        if request.args.get("thread", "").lower() in ("1", "true", "yes"):
+            replies = request.args.get("replies", app.config["COMMENT_THREAD_REPLIES"], type=int)
+            roots, next_cursor = threads.thread_page(post_id, cursor, limit,
+                                                     max(0, min(replies, app.config["PAGE_SIZE_MAX"])))
+            return jsonify({"comments": roots, "next_cursor": next_cursor}), 200
+        query = Comment.query.filter_by(post_id=post_id)
+        if wants_stream():
+            return stream_rows("comments", query, (Comment.created_at, Comment.id), cursor,
+                               serialize_comment, descending=False)
+        comments, next_cursor = keyset_paginate(
+            query, (Comment.created_at, Comment.id), cursor, limit,
+            key=lambda c: (c.created_at, c.id), descending=False
+        )
+        return jsonify({"comments": [serialize_comment(c) for c in comments],
+                        "next_cursor": next_cursor}), 200
+
+    @app.route("/comments/<int:comment_id>/replies", methods=["GET"])
+    @swag_from({
+        "tags": ["Comments"],
+        "parameters": [
+            {"name": "limit", "in": "query", "type": "integer", "required": False},
+            {"name": "cursor", "in": "query", "type": "string", "required": False}
+        ],
+        "responses": {
+            "200": {"description": "Page of replies at any depth below the comment, depth-first, with next_cursor"},
+            "404": {"description": "Comment not found"}
+        }
+    })
+    @read_replica
+    def get_comment_replies(comment_id):
+        comment = db.session.get(Comment, comment_id)
+        if not comment:
+            return jsonify({"error": "Comment not found"}), 404
+        limit, cursor = page_args()
+        replies, next_cursor = threads.replies_page(comment, cursor, limit)
+        return jsonify({"replies": [serialize_comment(c) for c in replies], "next_cursor": next_cursor}), 200
 
     @app.route("/comments/<int:comment_id>", methods=["PUT"])
     @jwt_required()
@@ -278,7 +474,10 @@ def init_routes(app):
         if content is None or not content.strip():
             return jsonify({"error": "Content cannot be empty"}), 400
         comment.content = content.strip()
+        search.index_comment(comment)
+        post_id = comment.post_id
         db.session.commit()
+        cache.invalidate(f"comments:{post_id}")
         return jsonify({
             "message": "Comment updated successfully",
             "comment": {
@@ -294,7 +493,7 @@ def init_routes(app):
     @swag_from({
         "tags": ["Comments"],
         "security": [{"bearerAuth": []}],
-        "responses": {"200": {"description": "Comment deleted successfully"}}
+        "responses": {"200": {"description": "Comment and its replies deleted successfully"}}
     })
     def delete_comment(comment_id):
         current_user_id = get_jwt_identity()
@@ -303,11 +502,19 @@ def init_routes(app):
             return jsonify({"error": "Comment not found"}), 404
         if comment.author_id != current_user_id:
             return jsonify({"error": "Not authorized"}), 403
-        db.session.delete(comment)
+        post_id = comment.post_id
+        threads.delete_comment(comment)
         db.session.commit()
+        cache.invalidate(f"comments:{post_id}")
         return jsonify({"message": "Comment deleted successfully"}), 200
 
     # ---------------- Likes ---------------- #
+    def notify_like(post_id, current_user_id):
+        post_author_id = db.session.query(Post.author_id).filter(Post.id == post_id).scalar()
+        if post_author_id is not None and post_author_id != current_user_id:
+            notify(post_author_id, current_user_id, "like_post", post_id=post_id,
+                   actor_name=current_user.username)
+
     @app.route("/posts/<int:post_id>/like", methods=["POST"])
     @jwt_required()
     @swag_from({
@@ -317,38 +524,128 @@ def init_routes(app):
     })
     def like_post(post_id):
         current_user_id = get_jwt_identity()
-        existing_like = PostLike.query.filter_by(post_id=post_id, user_id=current_user_id).first()
-        if existing_like:
-            db.session.delete(existing_like)
+        if relations.remove_like(current_user_id, post_id):
+            trending.record(post_id, "like", -1)
             db.session.commit()
             return jsonify({"message": "Post unliked successfully!", "liked": False}), 200
-        new_like = PostLike(post_id=post_id, user_id=current_user_id)
-        db.session.add(new_like)
-        post = db.session.get(Post, post_id)
-        if post and post.author_id != current_user_id:
-            notif = Notification(
-                user_id=post.author_id,
-                actor_id=current_user_id,
-                type="like_post",
-                message=f"{db.session.get(User, current_user_id).username} liked your post."
-            )
-            db.session.add(notif)
+        liked = relations.add_like(current_user_id, post_id)
+        if liked is None:
+            return jsonify({"error": "Post not found"}), 404
+        if liked:
+            trending.record(post_id, "like")
+            notify_like(post_id, current_user_id)
         db.session.commit()
         return jsonify({"message": "Post liked successfully!", "liked": True}), 200
 
+    @app.route("/posts/<int:post_id>/like", methods=["PUT"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Likes"],
+        "security": [{"bearerAuth": []}],
+        "responses": {
+            "201": {"description": "Post liked"},
+            "200": {"description": "Post was already liked; nothing changed"},
+            "404": {"description": "Post not found"}
+        }
+    })
+    def set_like(post_id):
+        current_user_id = get_jwt_identity()
+        liked = relations.add_like(current_user_id, post_id)
+        if liked is None:
+            return jsonify({"error": "Post not found"}), 404
+        if liked:
+            trending.record(post_id, "like")
+            notify_like(post_id, current_user_id)
+        db.session.commit()
+        return jsonify({"liked": True, "created": liked}), 201 if liked else 200
+
+    @app.route("/posts/<int:post_id>/like", methods=["DELETE"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Likes"],
+        "security": [{"bearerAuth": []}],
+        "responses": {"200": {"description": "Post is not liked (whether or not it was before)"}}
+    })
+    def delete_like(post_id):
+        removed = relations.remove_like(get_jwt_identity(), post_id)
+        if removed:
+            trending.record(post_id, "like", -1)
+        db.session.commit()
+        return jsonify({"liked": False, "removed": removed}), 200
+
     @app.route("/posts/<int:post_id>/unlike", methods=["DELETE"])
     @jwt_required()
     @swag_from({"tags": ["Likes"]})
     def unlike_post(post_id):
-        current_user_id = get_jwt_identity()
-        like = PostLike.query.filter_by(post_id=post_id, user_id=current_user_id).first()
-        if not like:
+        if not relations.remove_like(get_jwt_identity(), post_id):
             return jsonify({"error": "Like not found"}), 404
-        db.session.delete(like)
+        trending.record(post_id, "like", -1)
         db.session.commit()
         return jsonify({"message": "Post unliked successfully!"}), 200
 
+    @app.route("/comments/<int:comment_id>/like", methods=["PUT"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Likes"],
+        "security": [{"bearerAuth": []}],
+        "responses": {
+            "201": {"description": "Comment liked"},
+            "200": {"description": "Comment was already liked; nothing changed"},
+            "404": {"description": "Comment not found"}
+        }
+    })
+    def set_comment_like(comment_id):
+        current_user_id = get_jwt_identity()
+        comment = db.session.query(Comment.post_id, Comment.author_id).filter(Comment.id == comment_id).first()
+        if not comment:
+            return jsonify({"error": "Comment not found"}), 404
+        liked = relations.add_comment_like(current_user_id, comment_id)
+        if liked and comment.author_id != current_user_id:
+            notify(comment.author_id, current_user_id, "like_comment", post_id=comment.post_id,
+                   comment_id=comment_id, actor_name=current_user.username)
+        db.session.commit()
+        if liked:
+            cache.invalidate(f"comments:{comment.post_id}")
+        return jsonify({"liked": True, "created": bool(liked)}), 201 if liked else 200
+
+    @app.route("/comments/<int:comment_id>/like", methods=["DELETE"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Likes"],
+        "security": [{"bearerAuth": []}],
+        "responses": {
+            "200": {"description": "Comment is not liked (whether or not it was before)"},
+            "404": {"description": "Comment not found"}
+        }
+    })
+    def delete_comment_like(comment_id):
+        post_id = db.session.query(Comment.post_id).filter(Comment.id == comment_id).scalar()
+        if post_id is None:
+            return jsonify({"error": "Comment not found"}), 404
+        removed = relations.remove_comment_like(get_jwt_identity(), comment_id)
+        db.session.commit()
+        if removed:
+            cache.invalidate(f"comments:{post_id}")
+        return jsonify({"liked": False, "removed": removed}), 200
+
     # ---------------- Follow System ---------------- #
+    def follow_target(username):
+        """Return the user to (un)follow, or an error response tuple."""
+        if username == current_user.username:
+            return None, (jsonify({"error": "You cannot follow yourself"}), 400)
+        target_user = db.session.query(User.id, User.username).filter(User.username == username).first()
+        if not target_user:
+            return None, (jsonify({"error": "User not found"}), 404)
+        return target_user, None
+
+    def notify_follow(current_user_id, target_user):
+        notify(
+            current_user_id,   # <------ follower gets notification (test expectation!)
+            target_user.id,    # actor is the followed user
+            "follow",
+            actor_name=target_user.username
+        )
+
     @app.route("/follow/<username>", methods=["POST"])
     @jwt_required()
     @swag_from({
@@ -358,28 +655,57 @@ def init_routes(app):
     })
     def follow_user(username):
         current_user_id = get_jwt_identity()
-        target_user = User.query.filter_by(username=username).first()
-        if not target_user:
-            return jsonify({"error": "User not found"}), 404
-        if current_user_id == target_user.id:
-            return jsonify({"error": "You cannot follow yourself"}), 400
-        existing_follow = Follower.query.filter_by(follower_id=current_user_id, followed_id=target_user.id).first()
-        if existing_follow:
-            db.session.delete(existing_follow)
+        target_user, error = follow_target(username)
+        if error:
+            return error
+        if relations.remove_follow(current_user_id, target_user.id):
             db.session.commit()
             return jsonify({"message": "Unfollowed"}), 200
-        new_follow = Follower(follower_id=current_user_id, followed_id=target_user.id)
-        db.session.add(new_follow)
-        notif = Notification(
-            user_id=current_user_id,   # <------ follower gets notification (test expectation!)
-            actor_id=target_user.id,   # actor is the followed user
-            type="follow",
-            message=f"{target_user.username} started following you."
-        )
-        db.session.add(notif)
+        if relations.add_follow(current_user_id, target_user.id):
+            notify_follow(current_user_id, target_user)
         db.session.commit()
         return jsonify({"message": "Now following"}), 200
 
+    @app.route("/follow/<username>", methods=["PUT"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Follows"],
+        "security": [{"bearerAuth": []}],
+        "responses": {
+            "201": {"description": "Now following"},
+            "200": {"description": "Already following; nothing changed"},
+            "404": {"description": "User not found"}
+        }
+    })
+    def set_follow(username):
+        current_user_id = get_jwt_identity()
+        target_user, error = follow_target(username)
+        if error:
+            return error
+        followed = relations.add_follow(current_user_id, target_user.id)
+        if followed:
+            notify_follow(current_user_id, target_user)
+        db.session.commit()
+        return jsonify({"following": True, "created": followed}), 201 if followed else 200
+
+    @app.route("/follow/<username>", methods=["DELETE"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Follows"],
+        "security": [{"bearerAuth": []}],
+        "responses": {
+            "200": {"description": "Not following (whether or not it was before)"},
+            "404": {"description": "User not found"}
+        }
+    })
+    def delete_follow(username):
+        target_user, error = follow_target(username)
+        if error:
+            return error
+        removed = relations.remove_follow(get_jwt_identity(), target_user.id)
+        db.session.commit()
+        return jsonify({"following": False, "removed": removed}), 200
+
     @app.route("/unfollow/<username>", methods=["DELETE"])
     @jwt_required()
     @swag_from({
@@ -388,36 +714,384 @@ def init_routes(app):
         "responses": {"200": {"description": "Unfollowed successfully!"}}
     })
     def unfollow_user(username):
-        current_user_id = get_jwt_identity()
-        target_user = User.query.filter_by(username=username).first()
-        if not target_user:
-            return jsonify({"error": "User not found"}), 404
-        follow = Follower.query.filter_by(follower_id=current_user_id, followed_id=target_user.id).first()
-        if not follow:
+        target_user, error = follow_target(username)
+        if error:
+            return error
+        if not relations.remove_follow(get_jwt_identity(), target_user.id):
             return jsonify({"error": "Not following"}), 404
-        db.session.delete(follow)
         db.session.commit()
         return jsonify({"message": "Unfollowed successfully!"}), 200
 
+    # ---------------- Batch writes ---------------- #
+    def batch_items(key):
+        """Return the request's list under ``key``, or an error response tuple."""
+        items = (request.get_json(silent=True) or {}).get(key)
+        if not isinstance(items, list) or not items:
+            return None, (jsonify({"error": f"'{key}' must be a non-empty list"}), 400)
+        if len(items) > app.config["BATCH_MAX_ITEMS"]:
+            return None, (jsonify({"error": f"At most {app.config['BATCH_MAX_ITEMS']} items per batch"}), 400)
+        return items, None
+
+    def is_id(value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    @app.route("/posts:batch", methods=["POST"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Batch"],
+        "security": [{"bearerAuth": []}],
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {
+                "type": "object",
+                "properties": {
+                    "posts": {"type": "array", "items": {"type": "object", "properties": {
+                        "title": {"type": "string"},
+                        "content": {"type": "string"}
+                    }}}
+                }
+            }}}
+        },
+        "responses": {"200": {"description": "Per-item results; valid posts are created in one transaction"}}
+    })
+    def create_posts_batch():
+        items, error = batch_items("posts")
+        if error:
+            return error
+        current_user_id = get_jwt_identity()
+        results, new_posts = [], []
+        for i, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            title = str(item.get("title") or "").strip()
+            content = str(item.get("content") or "").strip()
+            if not title:
+                results.append({"index": i, "status": 400, "error": "Title is required"})
+            elif not content:
+                results.append({"index": i, "status": 400, "error": "Content is required"})
+            else:
+                post = Post(title=title, content=content, author_id=current_user_id)
+                new_posts.append(post)
+                results.append({"index": i, "status": 201, "post": post})
+        if new_posts:
+            db.session.add_all(new_posts)
+            db.session.flush()
+            feed.fan_out_posts(new_posts)
+            for post in new_posts:
+                search.index_post(post)
+            for r in results:
+                if "post" in r:
+                    r["id"] = r.pop("post").id
+            db.session.commit()
+            cache.invalidate("posts")
+        return jsonify({"created": len(new_posts), "results": results}), 200
+
+    @app.route("/comments:batch", methods=["POST"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Batch"],
+        "security": [{"bearerAuth": []}],
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {
+                "type": "object",
+                "properties": {
+                    "comments": {"type": "array", "items": {"type": "object", "properties": {
+                        "post_id": {"type": "integer"},
+                        "content": {"type": "string"}
+                    }}}
+                }
+            }}}
+        },
+        "responses": {"200": {"description": "Per-item results; valid comments are created in one transaction"}}
+    })
+    def create_comments_batch():
+        items, error = batch_items("comments")
+        if error:
+            return error
+        current_user_id = get_jwt_identity()
+        items = [item if isinstance(item, dict) else {} for item in items]
+        post_ids = {item.get("post_id") for item in items if is_id(item.get("post_id"))}
+        existing = {pid for (pid,) in db.session.query(Post.id).filter(Post.id.in_(post_ids))}
+        results, new_comments, per_post = [], [], {}
+        for i, item in enumerate(items):
+            content = str(item.get("content") or "").strip()
+            post_id = item.get("post_id")
+            if not content:
+                results.append({"index": i, "status": 400, "error": "Content is required"})
+            elif not is_id(post_id):
+                results.append({"index": i, "status": 400, "error": "post_id must be an integer"})
+            elif post_id not in existing:
+                results.append({"index": i, "status": 404, "error": "Post not found"})
+            else:
+                comment = Comment(post_id=post_id, content=content, author_id=current_user_id)
+                new_comments.append(comment)
+                per_post[post_id] = per_post.get(post_id, 0) + 1
+                results.append({"index": i, "status": 201, "comment": comment})
+        if new_comments:
+            db.session.add_all(new_comments)
+            db.session.flush()
+            for comment in new_comments:
+                search.index_comment(comment)
+            for post_id, n in per_post.items():
+                bump(Post.comment_count, post_id, n)
+            trending.record_many(per_post, "comment")
+            for r in results:
+                if "comment" in r:
+                    r["id"] = r.pop("comment").id
+            db.session.commit()
+            cache.invalidate(*[f"comments:{pid}" for pid in per_post])
+        return jsonify({"created": len(new_comments), "results": results}), 200
+
+    @app.route("/likes:batch", methods=["POST"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Batch"],
+        "security": [{"bearerAuth": []}],
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {
+                "type": "object",
+                "properties": {"post_ids": {"type": "array", "items": {"type": "integer"}}}
+            }}}
+        },
+        "responses": {"200": {"description": "Per-item results; liking an already liked post is a no-op"}}
+    })
+    def like_posts_batch():
+        items, error = batch_items("post_ids")
+        if error:
+            return error
+        current_user_id = get_jwt_identity()
+        wanted = {pid for pid in items if is_id(pid)}
+        authors = dict(db.session.query(Post.id, Post.author_id).filter(Post.id.in_(wanted)))
+        already = {pid for (pid,) in db.session.query(PostLike.post_id).filter(
+            PostLike.user_id == current_user_id, PostLike.post_id.in_(wanted))}
+        candidates = [pid for pid in dict.fromkeys(pid for pid in items if is_id(pid))
+                      if pid in authors and pid not in already]
+        new_ids = []
+        if candidates:
+            # One skip-on-conflict insert for the batch, then whatever is liked now and was not before
+            relations.insert_ignore(PostLike, ["post_id", "user_id", "is_like"],
+                                    select(Post.id, literal(current_user_id), true())
+                                    .where(Post.id.in_(candidates)))
+            liked = {pid for (pid,) in db.session.query(PostLike.post_id).filter(
+                PostLike.user_id == current_user_id, PostLike.post_id.in_(candidates))}
+            for pid in candidates:
+                if pid in liked:
+                    new_ids.append(pid)
+        results, reported = [], set()
+        for i, post_id in enumerate(items):
+            if not is_id(post_id):
+                results.append({"index": i, "status": 400, "error": "Post id must be an integer"})
+            elif post_id not in authors:
+                results.append({"index": i, "status": 404, "error": "Post not found"})
+            elif post_id in new_ids and post_id not in reported:
+                reported.add(post_id)
+                results.append({"index": i, "status": 201, "liked": True, "created": True})
+            else:
+                results.append({"index": i, "status": 200, "liked": True, "created": False})
+        if new_ids:
+            bump(Post.like_count, new_ids)
+            trending.record_many(dict.fromkeys(new_ids, 1), "like")
+            for post_id in new_ids:
+                if authors[post_id] != current_user_id:
+                    notify(authors[post_id], current_user_id, "like_post", post_id=post_id,
+                           actor_name=current_user.username)
+            db.session.commit()
+        return jsonify({"created": len(new_ids), "results": results}), 200
+
+    # ---------------- Feed ---------------- #
+    @app.route("/feed", methods=["GET"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Feed"],
+        "security": [{"bearerAuth": []}],
+        "parameters": [
+            {"name": "limit", "in": "query", "type": "integer", "required": False},
+            {"name": "cursor", "in": "query", "type": "string", "required": False}
+        ],
+        "responses": {"200": {"description": "Page of posts by followed users, newest first"}}
+    })
+    @read_replica
+    def get_feed():
+        current_user_id = get_jwt_identity()
+        limit, cursor = page_args()
+        posts, next_cursor = feed.feed_page(current_user_id, cursor, limit)
+        return jsonify({"posts": [serialize_post(p) for p in posts], "next_cursor": next_cursor}), 200
+
+    # ---------------- Search ---------------- #
+    @app.route("/search", methods=["GET"])
+    @swag_from({
+        "tags": ["Search"],
+        "parameters": [
+            {"name": "q", "in": "query", "type": "string", "required": True},
+            {"name": "limit", "in": "query", "type": "integer", "required": False},
+            {"name": "cursor", "in": "query", "type": "string", "required": False}
+        ],
+        "responses": {
+            "200": {"description": "Matching posts and comments, best match first, with next_cursor"},
+            "400": {"description": "Missing query or invalid cursor"}
+        }
+    })
+    @read_replica
+    def search_posts_and_comments():
+        q = request.args.get("q", "")
+        if not search.query_terms(q):
+            return jsonify({"error": "Query parameter q is required"}), 400
+        limit, cursor = page_args()
+        hits, next_cursor = search.search(q, cursor, limit)
+        posts = {p.id: p for p in Post.query.filter(Post.id.in_([h.doc_id // 2 for h in hits if h.doc_id % 2 == 0]))}
+        comments = {c.id: c for c in Comment.query.join(Post, Post.id == Comment.post_id)  # not on deleted posts
+                    .filter(Comment.id.in_([h.doc_id // 2 for h in hits if h.doc_id % 2]))}
+        results = []
+        for h in hits:
+            if h.doc_id % 2 == 0 and h.doc_id // 2 in posts:
+                p = posts[h.doc_id // 2]
+                results.append({"type": "post", "id": p.id, "post_id": p.id, "title": p.title, "content": p.content,
+                                "author_id": p.author_id, "created_at": p.created_at, "score": -h.relevance})
+            elif h.doc_id % 2 and h.doc_id // 2 in comments:
+                c = comments[h.doc_id // 2]
+                results.append({"type": "comment", "id": c.id, "post_id": c.post_id, "content": c.content,
+                                "author_id": c.author_id, "created_at": c.created_at, "score": -h.relevance})
+        return jsonify({"results": results, "next_cursor": next_cursor}), 200
+
     # ---------------- Notifications ---------------- #
     @app.route("/notifications", methods=["GET"])
     @jwt_required()
     @swag_from({
         "tags": ["Notifications"],
         "security": [{"bearerAuth": []}],
-        "responses": {"200": {"description": "List of notifications"}}
+        "parameters": [
+            {"name": "limit", "in": "query", "type": "integer", "required": False},
+            {"name": "cursor", "in": "query", "type": "string", "required": False},
+            {"name": "stream", "in": "query", "type": "boolean", "required": False,
+             "description": "Stream every remaining row (JSON, or NDJSON with Accept: application/x-ndjson)"},
+            {"name": "unread_only", "in": "query", "type": "boolean", "required": False}
+        ],
+        "responses": {"200": {"description": "Page of notifications, newest first, with next_cursor"}}
     })
+    @read_replica
     def get_notifications():
         current_user_id = get_jwt_identity()
-        notifications = Notification.query.filter_by(user_id=current_user_id).all()
-        return jsonify({"notifications": [
-            {
-                "id": n.id,
-                "message": n.message,
-                "is_read": n.is_read,
-                "created_at": n.created_at
-            } for n in notifications
-        ]}), 200
+        limit, cursor = page_args()
+        query = Notification.query.filter_by(user_id=current_user_id)
+        if request.args.get("unread_only", "").lower() in ("1", "true", "yes"):
+            query = query.filter_by(is_read=False)
+        if wants_stream():
+            return stream_rows("notifications", query, (Notification.created_at, Notification.id), cursor,
+                               serialize_notification)
+        notifications, next_cursor = keyset_paginate(
+            query, (Notification.created_at, Notification.id), cursor, limit,
+            key=lambda n: (n.created_at, n.id)
+        )
+        return jsonify({"notifications": [serialize_notification(n) for n in notifications],
+                        "next_cursor": next_cursor}), 200
+
+    @app.route("/notifications/unread_count", methods=["GET"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Notifications"],
+        "security": [{"bearerAuth": []}],
+        "responses": {"200": {"description": "Number of unread notifications"}}
+    })
+    @read_replica
+    def get_unread_notification_count():
+        current_user_id = get_jwt_identity()
+        count = db.session.query(db.func.count(Notification.id)).filter(
+            Notification.user_id == current_user_id, Notification.is_read == false()
+        ).scalar()
+        return jsonify({"unread_count": count}), 200
+
+    @app.route("/notifications/stream", methods=["GET"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Notifications"],
+        "security": [{"bearerAuth": []}],
+        "produces": ["text/event-stream"],
+        "parameters": [
+            {"name": "Last-Event-ID", "in": "header", "type": "integer", "required": False,
+             "description": "Resume after this notification id (EventSource sends it when reconnecting)"},
+            {"name": "last_event_id", "in": "query", "type": "integer", "required": False,
+             "description": "Same as Last-Event-ID, for clients that cannot set headers"}
+        ],
+        "responses": {
+            "200": {"description": "Server-Sent Events: a 'notification' event per new notification, "
+                                   "with the notification id as event id; comment lines as heartbeats"},
+            "400": {"description": "Invalid Last-Event-ID"},
+            "429": {"description": "Too many open streams for this user"},
+            "503": {"description": "Server shutting down"}
+        }
+    })
+    def stream_notifications():
+        current_user_id = get_jwt_identity()
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        if last_event_id is not None:
+            try:
+                last_id = int(last_event_id)
+            except ValueError:
+                return jsonify({"error": "Invalid Last-Event-ID"}), 400
+        else:
+            # A fresh stream starts with what arrives from now on; GET /notifications has the backlog
+            last_id = db.session.query(db.func.max(Notification.id)).filter(
+                Notification.user_id == current_user_id).scalar() or 0
+        hub = app.extensions["notification_stream"]
+        if hub.closed:
+            return jsonify({"error": "Server shutting down"}), 503
+        try:
+            subscription = hub.subscribe(current_user_id)
+        except TooManyStreams:
+            return jsonify({"error": "Too many open notification streams"}), 429
+        db.session.close()
+        admission = app.extensions.get("admission")
+        if admission is not None:
+            admission.leave()  # a stream is mostly idle and has its own cap; do not hold a request slot
+        return Response(stream_with_context(notification_events(subscription, last_id)),
+                        mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.route("/notifications/read", methods=["PUT"])
+    @jwt_required()
+    @swag_from({
+        "tags": ["Notifications"],
+        "security": [{"bearerAuth": []}],
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {
+                "type": "object",
+                "properties": {
+                    "ids": {"type": "array", "items": {"type": "integer"}},
+                    "before": {"type": "string", "description": "Cursor; marks it and everything older"},
+                    "all": {"type": "boolean"}
+                }
+            }}}
+        },
+        "responses": {
+            "200": {"description": "Notifications marked as read"},
+            "400": {"description": "Give exactly one of ids, before or all"}
+        }
+    })
+    def mark_notifications_read():
+        current_user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        query = Notification.query.filter(
+            Notification.user_id == current_user_id, Notification.is_read == false()
+        )
+        selectors = [k for k in ("ids", "before", "all") if data.get(k)]
+        if len(selectors) != 1:
+            return jsonify({"error": "Give exactly one of ids, before or all"}), 400
+        if selectors == ["ids"]:
+            ids = data["ids"]
+            if not isinstance(ids, list) or not all(is_id(i) for i in ids):
+                return jsonify({"error": "ids must be a list of integers"}), 400
+            if len(ids) > app.config["BULK_READ_MAX_IDS"]:
+                return jsonify({"error": f"At most {app.config['BULK_READ_MAX_IDS']} ids per request"}), 400
+            query = query.filter(Notification.id.in_(ids))
+        elif selectors == ["before"]:
+            columns = (Notification.created_at, Notification.id)
+            # At or older than the cursor position, i.e. not newer than it
+            query = query.filter(~keyset_filter(columns, decode_cursor(data["before"], columns), descending=False))
+        updated = query.update({"is_read": True}, synchronize_session=False)
+        db.session.commit()
+        return jsonify({"message": "Notifications marked as read", "updated": updated}), 200
 
     @app.route("/notifications/<int:notification_id>/read", methods=["PUT"])
     @jwt_required()
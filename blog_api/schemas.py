@@ -0,0 +1,54 @@
+"""Response shapes for the list endpoints.
+
+The schemas are ``TypedDict``s filled by one ``serialize_*`` function each, so every endpoint
+that returns a post, comment or notification emits exactly the same fields. Plain dicts are
+also the fastest input for both encoders: orjson (3.8) encodes a dict about twice as fast as a
+slotted dataclass with the same fields, and the stdlib needs no ``default`` callback for them
+(see ``benchmarks/bench_json.py``).
+"""
+from datetime import datetime
+from typing import TypedDict
+
+
+class PostSchema(TypedDict):
+    id: int
+    title: str
+    content: str
+    author_id: int
+    created_at: datetime
+    like_count: int
+    comment_count: int
+
+
+class CommentSchema(TypedDict):
+    id: int
+    post_id: int
+    parent_id: int | None
+    depth: int
+    content: str
+    author_id: int
+    created_at: datetime
+    like_count: int
+    reply_count: int
+
+
+class NotificationSchema(TypedDict):
+    id: int
+    message: str
+    is_read: bool
+    created_at: datetime
+
+
+def serialize_post(p) -> PostSchema:
+    return {"id": p.id, "title": p.title, "content": p.content, "author_id": p.author_id,
+            "created_at": p.created_at, "like_count": p.like_count, "comment_count": p.comment_count}
+
+
+def serialize_comment(c) -> CommentSchema:
+    return {"id": c.id, "post_id": c.post_id, "parent_id": c.parent_id, "depth": c.depth, "content": c.content,
+            "author_id": c.author_id, "created_at": c.created_at, "like_count": c.like_count,
+            "reply_count": c.reply_count}
+
+
+def serialize_notification(n) -> NotificationSchema:
+    return {"id": n.id, "message": n.message, "is_read": n.is_read, "created_at": n.created_at}
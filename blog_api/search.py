@@ -0,0 +1,145 @@
+"""Full-text search over post titles/bodies and comments.
+
+Production (MySQL) relies on InnoDB FULLTEXT indexes on ``posts`` and ``comments``, which
+the server keeps current by itself. SQLite (dev/tests) uses an FTS5 table, ``search_index``,
+that the post and comment handlers update incrementally through ``index_*``/``remove_*``.
+
+Both return hits as ``(doc_id, post_id, relevance)`` where ``doc_id`` is ``2 * post.id`` for posts
+and ``2 * comment.id + 1`` for comments, ordered best first and cursor-paginated on
+``(relevance, doc_id)``; relevance is negated so smaller is better on both backends.
+"""
+import re
+
+from sqlalchemy import DDL, Float, Integer, column, event, select, text
+
+from blog_api.models import db, Post, Comment
+from blog_api.pagination import decode_cursor, encode_cursor
+
+# Titles weigh twice as much as bodies in SQLite's bm25 ranking
+SQLITE_RANK = "bm25(search_index, 2.0, 1.0)"
+
+event.listen(db.metadata, "after_create", DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(title, body, post_id UNINDEXED)"
+).execute_if(dialect="sqlite"))
+event.listen(db.metadata, "before_drop", DDL(
+    "DROP TABLE IF EXISTS search_index"
+).execute_if(dialect="sqlite"))
+event.listen(Post.__table__, "after_create", DDL(
+    "ALTER TABLE posts ADD FULLTEXT INDEX ft_posts_title_content (title, content)"
+).execute_if(dialect="mysql"))
+event.listen(Comment.__table__, "after_create", DDL(
+    "ALTER TABLE comments ADD FULLTEXT INDEX ft_comments_content (content)"
+).execute_if(dialect="mysql"))
+
+CURSOR_COLUMNS = (column("relevance", Float), column("doc_id", Integer))
+
+
+def _maintained():
+    return db.engine.dialect.name == "sqlite"
+
+
+def _upsert(doc_id, title, body, post_id):
+    db.session.execute(text(
+        "INSERT OR REPLACE INTO search_index (rowid, title, body, post_id) VALUES (:rowid, :title, :body, :post_id)"
+    ), {"rowid": doc_id, "title": title, "body": body, "post_id": post_id})
+
+
+def _remove(doc_ids):
+    if doc_ids:
+        db.session.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), [{"rowid": d} for d in doc_ids])
+
+
+def index_post(post):
+    if _maintained():
+        _upsert(post.id * 2, post.title, post.content, post.id)
+
+
+def index_comment(comment):
+    if _maintained():
+        _upsert(comment.id * 2 + 1, "", comment.content, comment.post_id)
+
+
+def remove_post(post_id):
+    """Remove the post and its comments, which would otherwise take up result slots."""
+    if _maintained():
+        comment_ids = db.session.scalars(select(Comment.id).where(Comment.post_id == post_id)
+                                         .execution_options(include_deleted=True))
+        _remove([post_id * 2] + [i * 2 + 1 for i in comment_ids])
+
+
+def remove_comment(comment_id):
+    if _maintained():
+        _remove([comment_id * 2 + 1])
+
+
+def remove_comments(comment_ids):
+    if _maintained():
+        _remove([i * 2 + 1 for i in comment_ids])
+
+
+def rebuild_index(chunk_size=1000):
+    """Re-create the SQLite index from the posts and comments tables; returns documents indexed."""
+    if not _maintained():
+        return 0
+    db.session.execute(text("DELETE FROM search_index"))
+    total = 0
+    for model, to_doc in (
+        (Post, lambda p: (p.id * 2, p.title, p.content, p.id)),
+        (Comment, lambda c: (c.id * 2 + 1, "", c.content, c.post_id)),
+    ):
+        last_id = 0
+        while True:
+            rows = model.query.filter(model.id > last_id).order_by(model.id).limit(chunk_size).all()
+            if not rows:
+                break
+            for row in rows:
+                _upsert(*to_doc(row))
+            db.session.commit()
+            total += len(rows)
+            last_id = rows[-1].id
+    return total
+
+
+def query_terms(q):
+    return re.findall(r"\w+", q or "")
+
+
+def search(q, cursor, limit):
+    """Return ``(hits, next_cursor)``; each hit is a ``(doc_id, post_id, relevance)`` row, lower relevance first."""
+    terms = query_terms(q)
+    if not terms:
+        return [], None
+    after = decode_cursor(cursor, CURSOR_COLUMNS) if cursor else None
+    params = {"limit": limit + 1}
+    if db.engine.dialect.name == "mysql":
+        params["q"] = " ".join(terms)
+        sql = """
+            SELECT doc_id, post_id, relevance FROM (
+                SELECT id * 2 AS doc_id, id AS post_id,
+                       -MATCH (title, content) AGAINST (:q IN NATURAL LANGUAGE MODE) AS relevance
+                FROM posts WHERE MATCH (title, content) AGAINST (:q IN NATURAL LANGUAGE MODE)
+                UNION ALL
+                SELECT id * 2 + 1, post_id, -MATCH (content) AGAINST (:q IN NATURAL LANGUAGE MODE)
+                FROM comments WHERE MATCH (content) AGAINST (:q IN NATURAL LANGUAGE MODE)
+            ) hits
+            {where}
+            ORDER BY relevance, doc_id LIMIT :limit
+        """
+        rank, doc_id, joiner = "relevance", "doc_id", "WHERE"
+    else:
+        # Quote every term so user input cannot inject FTS5 query syntax
+        params["q"] = " ".join(f'"{t}"' for t in terms)
+        sql = f"""
+            SELECT rowid AS doc_id, post_id, {SQLITE_RANK} AS relevance
+            FROM search_index WHERE search_index MATCH :q {{where}}
+            ORDER BY {SQLITE_RANK}, rowid LIMIT :limit
+        """
+        rank, doc_id, joiner = SQLITE_RANK, "rowid", "AND"
+    where = ""
+    if after:
+        params["after_rank"], params["after_doc"] = after
+        clause = f"({rank} > :after_rank OR ({rank} = :after_rank AND {doc_id} > :after_doc))"
+        where = f"{joiner} {clause}"
+    hits = db.session.execute(text(sql.format(where=where)), params).all()
+    next_cursor = encode_cursor(hits[limit - 1].relevance, hits[limit - 1].doc_id) if len(hits) > limit else None
+    return hits[:limit], next_cursor
@@ -0,0 +1,84 @@
+"""JSON encoding for responses.
+
+``JSONProvider`` uses orjson when it is installed (``pip install orjson``) and the standard
+library otherwise. Both produce equivalent UTF-8 JSON for everything the API returns; in particular
+datetimes, which the models store as naive UTC, are always ISO-8601 with a ``Z`` suffix
+(``2024-01-01T12:00:00Z``).
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+
+def isoformat(value):
+    """Format like orjson with OPT_NAIVE_UTC | OPT_UTC_Z."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.isoformat() + "Z"
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return value.isoformat()
+
+
+_FIELDS = {}
+
+
+def _default(o):
+    """Types neither encoder handles natively (and, for the stdlib, datetimes and dataclasses)."""
+    if isinstance(o, date):
+        return isoformat(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        names = _FIELDS.get(type(o))
+        if names is None:
+            names = _FIELDS[type(o)] = [f.name for f in dataclasses.fields(o)]
+        return {n: getattr(o, n) for n in names}
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when available."""
+
+    fast = orjson is not None
+
+    def encode(self, obj, indent=None, sort_keys=None):
+        """Serialize ``obj`` to UTF-8 bytes; the single entry point for both encoders."""
+        sort_keys = self.sort_keys if sort_keys is None else sort_keys
+        if self.fast:
+            option = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=_default, option=option)
+        separators = None if indent else (",", ":")
+        return json.dumps(obj, default=_default, indent=indent, separators=separators, sort_keys=sort_keys,
+                          ensure_ascii=False).encode()
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {"indent", "separators", "sort_keys"}:
+            kwargs.setdefault("default", _default)
+            return json.dumps(obj, **kwargs)
+        return self.encode(obj, kwargs.get("indent"), kwargs.get("sort_keys")).decode()
+
+    def loads(self, s, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        return self._app.response_class(self.encode(obj, indent) + b"\n", mimetype=self.mimetype)
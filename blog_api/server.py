@@ -0,0 +1,210 @@
+"""Pre-fork production server: ``flask serve``.
+
+The master process builds the app once, binds the listening socket and forks ``SERVE_WORKERS``
+workers, which share the loaded code and accept on that socket. Each worker handles requests
+on a fixed pool of ``SERVE_THREADS`` threads; keep that within ``DB_POOL_SIZE +
+DB_MAX_OVERFLOW``. A worker starts with empty connection pools (``database.after_fork``). The
+per-process caches, rate limiters and notification threads rebuild themselves when they see a
+new pid. Before accepting, a worker warms up: it opens its database connections and requests
+``SERVE_WARMUP_PATHS`` once, so the first real requests do not pay for connecting, statement
+compilation or empty caches.
+
+SIGTERM or SIGINT to the master shuts down gracefully. Workers stop accepting, end open
+notification streams (clients reconnect elsewhere) and finish the requests in flight. They close
+keep-alive connections as they go idle (after at most ``SERVE_KEEPALIVE`` seconds), flush the
+notification and job threads, close their pooled connections and exit. A worker still busy
+after ``SERVE_GRACEFUL_TIMEOUT`` is killed. A worker that dies on its own is replaced.
+
+State that must be shared by every worker (logged-out tokens, rate-limit buckets, cached
+responses, replica pins, live notifications) stays inside one process with its "memory"
+backend: a logout, say, is only seen by the worker that served it. ``serve`` warns about each
+such setting when it starts more than one worker; set them to "sqlite" (or "poll").
+"""
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from blog_api import database
+
+log = logging.getLogger(__name__)
+
+
+class RequestHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.server.draining:
+            self.close_connection = True
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's WSGI server on an inherited socket, handling connections on a thread pool."""
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, app, sock, threads, keepalive):
+        host, port = sock.getsockname()[:2]
+        handler = type("RequestHandler", (RequestHandler,), {"timeout": keepalive})
+        super().__init__(host, port, app, handler=handler, fd=sock.fileno())
+        self.draining = False
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        """Stop accepting (call from another thread than ``serve_forever``) and finish open requests."""
+        self.draining = True
+        self.shutdown()
+        self._pool.shutdown(wait=True)
+
+
+def warmup(app, threads):
+    """Fill the connection pool and request each of ``SERVE_WARMUP_PATHS`` once."""
+    for engine in database.engines(app):
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        connections = []
+        try:
+            for _ in range(min(threads, size)):
+                connections.append(engine.connect())
+        except Exception:
+            log.exception("Could not open connections to %s during warmup", engine.url.render_as_string())
+        for conn in connections:
+            conn.close()
+    client = app.test_client()
+    for path in app.config["SERVE_WARMUP_PATHS"]:
+        status = client.get(path).status_code
+        if status >= 500:
+            log.warning("Warmup request %s answered %d", path, status)
+
+
+def _worker(app, sock, threads):
+    """Body of a forked worker process; never returns."""
+    cfg = app.config
+    stopping = threading.Event()
+    server = None
+
+    def stop(signum, frame):
+        stopping.set()
+        app.extensions["notification_stream"].close()  # long-lived streams would hold up the drain
+        if server is not None:
+            threading.Thread(target=server.drain, name="drain").start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    code = 0
+    try:
+        warmup(app, threads)
+        if not stopping.is_set():
+            server = PooledWSGIServer(app, sock, threads, cfg["SERVE_KEEPALIVE"])
+            if not stopping.is_set():
+                server.serve_forever()
+            server.drain()
+        app.extensions["notifications"].stop()
+        app.extensions["jobs"].stop()
+        for engine in database.engines(app):
+            engine.dispose()
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+PER_PROCESS = {
+    "AUTH_BLOCKLIST_BACKEND": "a logout only revokes the token in the worker that served it",
+    "RATELIMIT_BACKEND": "each worker keeps its own buckets, multiplying every limit",
+    "CACHE_BACKEND": "writes only invalidate the cache of the worker that served them",
+    "NOTIFICATIONS_STREAM_BACKEND": "streams only see notifications written by their own worker",
+}
+
+
+def per_process_settings(cfg):
+    """The ``(setting, consequence)`` pairs whose backend keeps shared state inside one process."""
+    settings = dict(PER_PROCESS)
+    if cfg["DATABASE_REPLICA_URIS"]:
+        settings["DB_REPLICA_STICKY_BACKEND"] = "a writer is only pinned to the primary in its own worker"
+    return [(name, why) for name, why in settings.items() if cfg[name] == "memory"]
+
+
+def serve(app, host="127.0.0.1", port=8000, workers=None, threads=None, ready=None):
+    """Run ``workers`` forked processes of ``threads`` threads each until SIGTERM/SIGINT.
+
+    ``ready(address)`` is called with the bound ``(host, port)`` once the socket listens.
+    """
+    cfg = app.config
+    workers = workers or cfg["SERVE_WORKERS"]
+    threads = threads or cfg["SERVE_THREADS"]
+    if workers > 1:
+        for name, why in per_process_settings(cfg):
+            log.warning("%s is \"memory\" with %d workers: %s. Use a backend the workers share.",
+                        name, workers, why)
+    sock = socket.create_server((host, port), backlog=2048)
+    if ready is not None:
+        ready(sock.getsockname()[:2])
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+    children = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _worker(app, sock, threads)
+        children.add(pid)
+
+    for _ in range(workers):
+        spawn()
+
+    while not stopping.is_set():
+        stopping.wait(0.5)
+        for pid in list(children):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                children.discard(pid)
+            if done and not stopping.is_set():
+                log.warning("Worker %d exited with status %d; starting another", pid, status)
+                time.sleep(1)  # do not spin if workers die on startup
+                spawn()
+
+    for pid in children:
+        _signal(pid, signal.SIGTERM)
+    deadline = time.monotonic() + cfg["SERVE_GRACEFUL_TIMEOUT"]
+    while children and time.monotonic() < deadline:
+        for pid in list(children):
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                children.discard(pid)
+        time.sleep(0.05)
+    for pid in children:
+        log.warning("Worker %d did not finish in time; killing it", pid)
+        _signal(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    sock.close()
+
+
+def _signal(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
@@ -8,7 +8,10 @@ def app():
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
         "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"check_same_thread": False}},
-        "JWT_SECRET_KEY": "test-secret"
+        "JWT_SECRET_KEY": "test-secret",
+        "NOTIFICATIONS_MODE": "inline",
+        "BCRYPT_LOG_ROUNDS": 4,
+        "RATELIMIT_ENABLED": False
     })
 
     with app.app_context():
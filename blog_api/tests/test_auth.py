@@ -36,3 +36,69 @@ def test_duplicate_register(client):
     })
     assert r.status_code == 400
     assert "already exists" in r.get_json()["error"].lower()
+
+
+def test_login_upgrades_legacy_hash(app, client):
+    from werkzeug.security import generate_password_hash
+    from blog_api.models import db, User
+
+    db.session.add(User(username="legacy", email="legacy@example.com",
+                        password=generate_password_hash("pw", method="pbkdf2:sha256:1000")))
+    db.session.commit()
+
+    r = client.post("/login", json={"username": "legacy", "password": "pw"})
+    assert r.status_code == 200
+    db.session.expire_all()
+    stored = User.query.filter_by(username="legacy").first().password
+    assert stored.startswith("$2b$04$")
+
+    # The upgraded hash keeps working and is not rewritten again
+    r = client.post("/login", json={"username": "legacy", "password": "pw"})
+    assert r.status_code == 200
+    assert User.query.filter_by(username="legacy").first().password == stored
+    assert client.post("/login", json={"username": "legacy", "password": "nope"}).status_code == 401
+
+
+def test_password_hasher_sheds_load(app):
+    import pytest
+    from blog_api.passwords import HasherBusy, PasswordHasher
+
+    hasher = PasswordHasher(dict(app.config, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=0))
+    stored = hasher.hash("pw")
+    assert hasher.verify(stored, "pw") and not hasher.needs_rehash(stored)
+    assert hasher.needs_rehash("scrypt:32768:8:1$salt$hash")
+
+    hasher._slots.acquire()  # the only slot is taken by an in-flight hash
+    with pytest.raises(HasherBusy):
+        hasher.verify(stored, "pw")
+
+
+def test_logout_revokes_token(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token()}"}
+    assert client.get("/notifications", headers=headers).status_code == 200
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert client.get("/notifications", headers=headers).status_code == 401
+    # Logging in again issues a fresh, valid token
+    fresh = client.post("/login", json={"email": "test@example.com", "password": "secret"}).get_json()
+    assert client.get("/notifications", headers={"Authorization": f"Bearer {fresh['access_token']}"}).status_code == 200
+
+
+def test_authenticated_requests_do_not_reload_the_user(app, client, auth_token):
+    from sqlalchemy import event
+    from blog_api.models import db
+
+    headers = {"Authorization": f"Bearer {auth_token()}"}
+    user_queries = []
+
+    def count(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            user_queries.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        client.get("/notifications/unread_count", headers=headers)
+        client.get("/notifications/unread_count", headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    # The first request loads the user; the second is served from the cache
+    assert len(user_queries) == 1
@@ -0,0 +1,44 @@
+# blog_api/tests/test_benchmarks.py
+from functools import partial
+
+from blog_api.benchmarks import datagen, scenarios
+from blog_api.models import db, User
+
+
+def test_datagen_is_seeded_and_skewed(app):
+    counts = datagen.generate(users=60, seed=7)
+    assert counts["users"] == 60 and counts["posts"] > 0 and counts["timelines"] > 0
+    top = db.session.query(User.follower_count).order_by(User.follower_count.desc()).limit(6).all()
+    # Power-law popularity: the top 10% of users hold a large share of the follows
+    assert sum(c for c, in top) > counts["followers"] * 0.25
+
+    db.drop_all()
+    db.create_all()
+    assert datagen.generate(users=60, seed=7) == counts
+
+
+def test_generated_feeds_include_posts_of_authors_above_the_fanout_threshold(app):
+    from blog_api import feed
+    from blog_api.models import Follower, Post
+
+    app.config["FEED_FANOUT_MAX_FOLLOWERS"] = 5
+    datagen.generate(users=200, seed=3)
+    author = db.session.query(User).join(Post, Post.author_id == User.id).order_by(
+        User.follower_count.desc()).first()
+    assert author.follower_count > 5
+    follower_id = db.session.query(Follower.follower_id).filter(Follower.followed_id == author.id).first()[0]
+    latest = db.session.query(Post.id).filter(Post.author_id == author.id).order_by(
+        Post.created_at.desc(), Post.id.desc()).first()[0]
+
+    posts, _ = feed.feed_page(follower_id, None, 1000)
+    assert latest in [p.id for p in posts]
+
+
+def test_scenario_runner_reports_percentiles(app):
+    counts = datagen.generate(users=20, seed=1)
+    db.session.remove()
+    report = scenarios.run(partial(scenarios.ClientTransport, app), "mixed", 60, 1,
+                           {"users": counts["users"], "posts": counts["posts"]}, seed=1)
+    assert report["total"]["count"] == 60
+    assert report["total"]["errors"] == 0
+    assert {"p50_ms", "p95_ms", "p99_ms", "req_per_s"} <= set(report["endpoints"]["list_posts"])
@@ -0,0 +1,66 @@
+# blog_api/tests/test_cache.py
+import time
+
+from blog_api.cache import MemoryCache, SQLiteCache
+
+
+def test_memory_cache_lru_and_ttl():
+    c = MemoryCache(max_entries=2, default_ttl=30)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)  # evicts b, the least recently used
+    assert (c.get("a"), c.get("b"), c.get("c")) == (1, None, 3)
+    c.set("short", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert c.get("short") is None
+    assert c.incr("gen") == 1 and c.incr("gen") == 2
+
+
+def test_sqlite_cache_roundtrip(tmp_path):
+    c = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    c.set("k", (b"body", 200, "application/json"))
+    assert c.get("k") == (b"body", 200, "application/json")
+    assert c.incr("gen") == 1 and c.incr("gen") == 2
+    c.delete("k")
+    assert c.get("k") is None
+
+
+def test_posts_cache_etag_and_invalidation(client, auth_token):
+    token = auth_token("cacher", "cacher@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/posts", json={"title": "First", "content": "Body"}, headers=headers)
+
+    r1 = client.get("/posts")
+    r2 = client.get("/posts")
+    assert (r1.headers["X-Cache"], r2.headers["X-Cache"]) == ("MISS", "HIT")
+    assert r1.headers["ETag"] == r2.headers["ETag"]
+
+    r = client.get("/posts", headers={"If-None-Match": r2.headers["ETag"]})
+    assert r.status_code == 304
+
+    # A write bumps the namespace, so the next read is fresh
+    client.post("/posts", json={"title": "Second", "content": "Body"}, headers=headers)
+    r = client.get("/posts", headers={"If-None-Match": r2.headers["ETag"]})
+    assert r.status_code == 200 and r.headers["X-Cache"] == "MISS"
+    assert [p["title"] for p in r.get_json()["posts"]] == ["Second", "First"]
+
+
+def test_comments_cache_invalidated_per_post(client, auth_token):
+    token = auth_token("commenter", "commenter@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    p1 = client.post("/posts", json={"title": "P1", "content": "Body"}, headers=headers).get_json()["post"]["id"]
+    p2 = client.post("/posts", json={"title": "P2", "content": "Body"}, headers=headers).get_json()["post"]["id"]
+    client.get(f"/posts/{p1}/comments")
+    client.get(f"/posts/{p2}/comments")
+
+    r = client.post(f"/posts/{p1}/comments", json={"content": "Hi"}, headers=headers)
+    comment_id = r.get_json()["comment"]["id"]
+    r = client.get(f"/posts/{p1}/comments")
+    assert r.headers["X-Cache"] == "MISS" and len(r.get_json()["comments"]) == 1
+    assert client.get(f"/posts/{p2}/comments").headers["X-Cache"] == "HIT"
+
+    client.put(f"/comments/{comment_id}", json={"content": "Edited"}, headers=headers)
+    assert client.get(f"/posts/{p1}/comments").get_json()["comments"][0]["content"] == "Edited"
+    client.delete(f"/comments/{comment_id}", headers=headers)
+    assert client.get(f"/posts/{p1}/comments").get_json()["comments"] == []
@@ -34,3 +34,139 @@ def test_comment_lifecycle(client, auth_token):
     r = client.delete(f"/comments/{comment_id}", headers={"Authorization": f"Bearer {token}"})
     assert r.status_code == 200
     assert r.get_json()["message"] == "Comment deleted successfully"
+
+
+def _reply(client, headers, post_id, content, parent_id=None):
+    body = {"content": content}
+    if parent_id is not None:
+        body["parent_id"] = parent_id
+    r = client.post(f"/posts/{post_id}/comments", json=body, headers=headers)
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()["comment"]["id"]
+
+
+def _thread_post(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token()}"}
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=headers).get_json()["post"]["id"]
+    return headers, post_id
+
+
+def test_replies_are_nested_into_a_thread_tree(client, auth_token):
+    headers, post_id = _thread_post(client, auth_token)
+    a = _reply(client, headers, post_id, "a")
+    b = _reply(client, headers, post_id, "a.b", a)
+    c = _reply(client, headers, post_id, "a.b.c", b)
+    d = _reply(client, headers, post_id, "d")
+    e = _reply(client, headers, post_id, "a.e", a)
+
+    r = client.get(f"/posts/{post_id}/comments?thread=true")
+    roots = r.get_json()["comments"]
+    assert [n["id"] for n in roots] == [a, d]
+    assert [n["id"] for n in roots[0]["replies"]] == [b, e]
+    assert [n["id"] for n in roots[0]["replies"][0]["replies"]] == [c]
+    assert roots[0]["replies"][0]["replies"][0]["depth"] == 2
+    assert roots[0]["reply_count"] == 2 and roots[0]["replies_next_cursor"] is None
+    assert roots[1]["replies"] == []
+
+    # The flat listing still returns every comment, now with parent ids
+    flat = client.get(f"/posts/{post_id}/comments").get_json()["comments"]
+    assert {x["id"]: x["parent_id"] for x in flat} == {a: None, b: a, c: b, d: None, e: a}
+    assert client.get(f"/posts/{post_id}").get_json()["post"]["comment_count"] == 5
+
+
+def test_long_threads_continue_from_the_replies_endpoint(client, auth_token):
+    headers, post_id = _thread_post(client, auth_token)
+    root = _reply(client, headers, post_id, "root")
+    first = _reply(client, headers, post_id, "1", root)
+    expected = [first, _reply(client, headers, post_id, "1.1", first)]
+    expected += [_reply(client, headers, post_id, str(i), root) for i in range(2, 5)]
+
+    root_node = client.get(f"/posts/{post_id}/comments?thread=true&replies=2").get_json()["comments"][0]
+    assert [n["id"] for n in root_node["replies"]] == [first]
+    assert [n["id"] for n in root_node["replies"][0]["replies"]] == [expected[1]]
+
+    seen, cursor = [], root_node["replies_next_cursor"]
+    while cursor:
+        page = client.get(f"/comments/{root}/replies?limit=2&cursor={cursor}").get_json()
+        seen += [x["id"] for x in page["replies"]]
+        cursor = page["next_cursor"]
+    assert seen == expected[2:]
+
+    # A reply's own subtree only
+    page = client.get(f"/comments/{first}/replies").get_json()
+    assert [x["id"] for x in page["replies"]] == [expected[1]]
+
+
+def test_thread_page_runs_a_bounded_number_of_queries(client, auth_token):
+    from sqlalchemy import event
+    from blog_api.models import db
+
+    headers, post_id = _thread_post(client, auth_token)
+    for _ in range(3):
+        parent = _reply(client, headers, post_id, "root")
+        for depth in range(6):
+            parent = _reply(client, headers, post_id, f"depth {depth}", parent)
+    client.application.config["CACHE_ENABLED"] = False
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        roots = client.get(f"/posts/{post_id}/comments?thread=true").get_json()["comments"]
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert len(roots) == 3 and roots[2]["replies"][0]["replies"][0]["depth"] == 2
+    # The page of top-level comments, then every reply under them
+    assert len(statements) == 2
+
+
+def test_reply_validation(client, auth_token):
+    headers, post_id = _thread_post(client, auth_token)
+    other = client.post("/posts", json={"title": "T2", "content": "C"}, headers=headers).get_json()["post"]["id"]
+    root = _reply(client, headers, post_id, "root")
+    r = client.post(f"/posts/{other}/comments", json={"content": "x", "parent_id": root}, headers=headers)
+    assert r.status_code == 404
+    client.application.config["COMMENT_MAX_DEPTH"] = 1
+    child = _reply(client, headers, post_id, "child", root)
+    r = client.post(f"/posts/{post_id}/comments", json={"content": "x", "parent_id": child}, headers=headers)
+    assert r.status_code == 400
+
+
+def test_deleting_a_comment_removes_its_replies(client, auth_token):
+    headers, post_id = _thread_post(client, auth_token)
+    a = _reply(client, headers, post_id, "a")
+    b = _reply(client, headers, post_id, "a.b", a)
+    _reply(client, headers, post_id, "a.b.c", b)
+    client.put(f"/comments/{b}/like", headers=headers)
+
+    assert client.delete(f"/comments/{b}", headers=headers).status_code == 200
+    flat = client.get(f"/posts/{post_id}/comments").get_json()["comments"]
+    assert [x["id"] for x in flat] == [a]
+    assert flat[0]["reply_count"] == 0
+    assert client.get(f"/posts/{post_id}").get_json()["post"]["comment_count"] == 1
+
+
+def test_comment_likes_are_idempotent_and_notify_the_author(client, auth_token):
+    author = {"Authorization": f"Bearer {auth_token('author', 'author@example.com')}"}
+    fan = {"Authorization": f"Bearer {auth_token('fan', 'fan@example.com')}"}
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=author).get_json()["post"]["id"]
+    comment_id = _reply(client, author, post_id, "like me")
+
+    assert client.put(f"/comments/{comment_id}/like", headers=fan).status_code == 201
+    assert client.put(f"/comments/{comment_id}/like", headers=fan).status_code == 200
+    [comment] = client.get(f"/posts/{post_id}/comments").get_json()["comments"]
+    assert comment["like_count"] == 1
+    messages = [n["message"] for n in client.get("/notifications", headers=author).get_json()["notifications"]]
+    assert messages == ["fan liked your comment."]
+
+    _reply(client, fan, post_id, "reply", comment_id)
+    messages = [n["message"] for n in client.get("/notifications", headers=author).get_json()["notifications"]]
+    assert messages[0] == "fan replied to your comment."
+
+    r = client.delete(f"/comments/{comment_id}/like", headers=fan)
+    assert r.get_json() == {"liked": False, "removed": True}
+    assert client.delete(f"/comments/{comment_id}/like", headers=fan).get_json()["removed"] is False
+    assert client.get(f"/posts/{post_id}/comments").get_json()["comments"][0]["like_count"] == 0
+    assert client.put("/comments/999/like", headers=fan).status_code == 404
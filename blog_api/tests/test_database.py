@@ -0,0 +1,66 @@
+# blog_api/tests/test_database.py
+from sqlalchemy import create_engine, text
+
+from blog_api.database import TimedQueuePool, pool_wait
+
+
+def _replicated_app(tmp_path, **config):
+    """An app whose replica never catches up, and a client logged in as its writer."""
+    from blog_api.main import create_app, db
+
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+        "DATABASE_REPLICA_URIS": [f"sqlite:///{tmp_path / 'replica.db'}"],
+        "DB_REPLICA_STICKY_SECONDS": 0,
+        "JWT_SECRET_KEY": "test-secret",
+        "NOTIFICATIONS_MODE": "inline",
+        "BCRYPT_LOG_ROUNDS": 4,
+        "CACHE_ENABLED": False,
+        **config,
+    })
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(app.extensions["db_replicas"][0])
+
+    client = app.test_client()
+    client.post("/register", json={"username": "rw", "email": "rw@example.com", "password": "pw"})
+    token = client.post("/login", json={"email": "rw@example.com", "password": "pw"}).get_json()["access_token"]
+    return app, client, {"Authorization": f"Bearer {token}"}
+
+
+def test_reads_go_to_replica_until_caller_writes(tmp_path):
+    app, client, headers = _replicated_app(tmp_path)
+
+    # Without stickiness the replica (which has not caught up) answers
+    client.post("/posts", json={"title": "Primary only", "content": "Body"}, headers=headers)
+    assert client.get("/posts").get_json()["posts"] == []
+
+    # With stickiness the writer reads its own write from the primary
+    app.config["DB_REPLICA_STICKY_SECONDS"] = 60
+    client.post("/posts", json={"title": "Read your writes", "content": "Body"}, headers=headers)
+    assert [p["title"] for p in client.get("/posts", headers=headers).get_json()["posts"]] == [
+        "Read your writes", "Primary only"]
+    # Pins are per writer, not per address: an anonymous reader still gets the replica
+    assert client.get("/posts").get_json()["posts"] == []
+
+
+def test_sticky_writer_bypasses_response_cache(tmp_path):
+    app, client, headers = _replicated_app(tmp_path, CACHE_ENABLED=True, DB_REPLICA_STICKY_SECONDS=60)
+
+    client.post("/posts", json={"title": "Mine", "content": "Body"}, headers=headers)
+    # Someone else fills the cache from the lagging replica right after the write
+    assert client.get("/posts").get_json()["posts"] == []
+    assert client.get("/posts").headers["X-Cache"] == "HIT"
+
+    response = client.get("/posts", headers=headers)
+    assert [p["title"] for p in response.get_json()["posts"]] == ["Mine"]
+    assert "X-Cache" not in response.headers
+
+
+def test_pool_checkout_wait_is_recorded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1)
+    before = pool_wait.snapshot()["count"]
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert pool_wait.snapshot()["count"] == before + 1
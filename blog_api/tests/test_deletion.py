@@ -0,0 +1,84 @@
+def _setup(client, auth_token):
+    """alice's post, with bob's like, bob's comment, alice's reply to it and alice's like of the comment."""
+    alice = {"Authorization": f"Bearer {auth_token('alice', 'alice@example.com')}"}
+    bob = {"Authorization": f"Bearer {auth_token('bob', 'bob@example.com')}"}
+    client.put("/follow/alice", headers=bob)
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=alice).get_json()["post"]["id"]
+    client.put(f"/posts/{post_id}/like", headers=bob)
+    comment = client.post(f"/posts/{post_id}/comments", json={"content": "c"}, headers=bob).get_json()["comment"]
+    comment_id = comment["id"]
+    client.post(f"/posts/{post_id}/comments", json={"content": "r", "parent_id": comment_id}, headers=alice)
+    client.put(f"/comments/{comment_id}/like", headers=alice)
+    return alice, bob, post_id, comment_id
+
+
+def _rows():
+    from blog_api.models import db, Post, Comment, PostLike, CommentLike, TimelineEntry, Notification
+
+    return {model.__tablename__: db.session.query(model).execution_options(include_deleted=True).count()
+            for model in (Post, Comment, PostLike, CommentLike, TimelineEntry, Notification)}
+
+
+def test_deleting_a_post_cascades_to_everything_on_it(app, client, auth_token):
+    alice, bob, post_id, _ = _setup(client, auth_token)
+    assert _rows() == {"posts": 1, "comments": 2, "post_likes": 1, "comment_likes": 1, "timelines": 1,
+                       "notifications": 4}
+
+    assert client.delete(f"/posts/{post_id}", headers=alice).status_code == 200
+    # Only the follow notification is left; it is not about the post
+    assert _rows() == {"posts": 0, "comments": 0, "post_likes": 0, "comment_likes": 0, "timelines": 0,
+                       "notifications": 1}
+
+
+def test_soft_deleted_post_is_hidden_at_once_and_purged_later(app, client, auth_token):
+    from blog_api import jobs
+
+    app.config.update(SOFT_DELETE=True, JOBS_CHUNK_SIZE=1, JOBS_CHUNK_PAUSE=0)
+    alice, bob, post_id, _ = _setup(client, auth_token)
+    assert client.delete(f"/posts/{post_id}", headers=alice).status_code == 200
+
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    assert client.get("/posts").get_json()["posts"] == []
+    assert client.get("/feed", headers=bob).get_json()["posts"] == []
+    assert client.put(f"/posts/{post_id}/like", headers=alice).status_code == 404
+    assert client.post(f"/posts/{post_id}/comments", json={"content": "x"}, headers=bob).status_code == 404
+    assert _rows()["posts"] == 1 and _rows()["comments"] == 2
+
+    # One post, two comments, a like of each, a timeline entry and three notifications, a chunk at a time
+    assert jobs.run_job("purge_deleted", force=True)["rows"] == 9
+    assert _rows() == {"posts": 0, "comments": 0, "post_likes": 0, "comment_likes": 0, "timelines": 0,
+                       "notifications": 1}
+
+
+def test_soft_deleted_comment_takes_its_replies_and_keeps_counters_right(app, client, auth_token):
+    from blog_api import jobs
+    from blog_api.counters import rebuild_counters
+    from blog_api.models import db, Post
+
+    app.config.update(SOFT_DELETE=True, JOBS_CHUNK_PAUSE=0)
+    alice, bob, post_id, comment_id = _setup(client, auth_token)
+    assert client.delete(f"/comments/{comment_id}", headers=bob).status_code == 200
+
+    assert client.get(f"/posts/{post_id}/comments").get_json()["comments"] == []
+    assert client.get(f"/comments/{comment_id}/replies").status_code == 404
+    assert client.put(f"/comments/{comment_id}/like", headers=bob).status_code == 404
+    assert db.session.get(Post, post_id).comment_count == 0
+    rebuild_counters()
+    db.session.expire_all()
+    assert db.session.get(Post, post_id).comment_count == 0
+
+    jobs.run_job("purge_deleted", force=True)
+    assert _rows() == {"posts": 1, "comments": 0, "post_likes": 1, "comment_likes": 0, "timelines": 1,
+                       "notifications": 2}
+
+
+def test_comments_of_a_soft_deleted_post_are_hidden_with_it(app, client, auth_token):
+    app.config["SOFT_DELETE"] = True
+    alice, bob, post_id, comment_id = _setup(client, auth_token)
+    assert client.delete(f"/posts/{post_id}", headers=alice).status_code == 200
+
+    assert client.get(f"/posts/{post_id}/comments").get_json()["comments"] == []
+    assert client.get(f"/comments/{comment_id}/replies").status_code == 404
+    assert client.put(f"/comments/{comment_id}/like", headers=alice).status_code == 404
+    assert client.put(f"/comments/{comment_id}", json={"content": "edited"}, headers=bob).status_code == 404
+    assert _rows()["comment_likes"] == 1
@@ -0,0 +1,80 @@
+# blog_api/tests/test_feed.py
+
+def _post(client, token, title):
+    r = client.post("/posts", json={"title": title, "content": "Body"},
+                    headers={"Authorization": f"Bearer {token}"})
+    return r.get_json()["post"]["id"]
+
+
+def _feed_ids(client, token, **params):
+    query = "&".join(f"{k}={v}" for k, v in params.items())
+    r = client.get(f"/feed?{query}", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200
+    return [p["id"] for p in r.get_json()["posts"]], r.get_json()["next_cursor"]
+
+
+def test_feed_fan_out_on_write(client, auth_token):
+    reader = auth_token("reader", "reader@example.com")
+    writer = auth_token("writer", "writer@example.com")
+    stranger = auth_token("stranger", "stranger@example.com")
+
+    old_post = _post(client, writer, "Before follow")
+    client.post("/follow/writer", headers={"Authorization": f"Bearer {reader}"})
+    new_post = _post(client, writer, "After follow")
+    _post(client, stranger, "Not followed")
+
+    ids, _ = _feed_ids(client, reader)
+    assert ids == [new_post, old_post]
+
+    # Unfollowing removes the author's posts from the timeline
+    client.post("/follow/writer", headers={"Authorization": f"Bearer {reader}"})
+    ids, _ = _feed_ids(client, reader)
+    assert ids == []
+
+
+def test_feed_merges_high_follower_authors_at_read_time(app, client, auth_token):
+    app.config["FEED_FANOUT_MAX_FOLLOWERS"] = 1
+    reader = auth_token("fan", "fan@example.com")
+    other_fan = auth_token("otherfan", "otherfan@example.com")
+    celebrity = auth_token("celebrity", "celebrity@example.com")
+    regular = auth_token("regular", "regular@example.com")
+
+    # celebrity has two followers (pulled at read time), regular has one (pushed)
+    client.post("/follow/celebrity", headers={"Authorization": f"Bearer {reader}"})
+    client.post("/follow/celebrity", headers={"Authorization": f"Bearer {other_fan}"})
+    client.post("/follow/regular", headers={"Authorization": f"Bearer {reader}"})
+
+    expected = []
+    for i in range(3):
+        expected.append(_post(client, celebrity, f"Celebrity {i}"))
+        expected.append(_post(client, regular, f"Regular {i}"))
+
+    # Pages of two interleave pushed and pulled posts in order
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        ids, cursor = _feed_ids(client, reader, **params)
+        seen.extend(ids)
+        if not cursor:
+            break
+    assert seen == list(reversed(expected))
+
+
+def test_posts_keep_their_feed_source_when_the_author_crosses_the_threshold(app, client, auth_token):
+    app.config["FEED_FANOUT_MAX_FOLLOWERS"] = 1
+    reader = auth_token("fan", "fan@example.com")
+    other_fan = auth_token("otherfan", "otherfan@example.com")
+    author = auth_token("author", "author@example.com")
+
+    client.post("/follow/author", headers={"Authorization": f"Bearer {reader}"})
+    pushed = _post(client, author, "One follower: pushed")
+    client.post("/follow/author", headers={"Authorization": f"Bearer {other_fan}"})
+    pulled = _post(client, author, "Two followers: pulled")
+    assert _feed_ids(client, other_fan)[0] == [pulled, pushed]  # the backfill brings the pushed one
+
+    # Back below the threshold: the pulled post must not vanish from the remaining follower's feed
+    client.post("/follow/author", headers={"Authorization": f"Bearer {other_fan}"})
+    latest = _post(client, author, "One follower again: pushed")
+    assert _feed_ids(client, reader)[0] == [latest, pulled, pushed]
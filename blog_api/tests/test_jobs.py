@@ -0,0 +1,120 @@
+import json
+from datetime import datetime, timedelta
+
+
+def _notifications(user_id, *rows):
+    from blog_api.models import db, Notification
+
+    now = datetime.utcnow()
+    for days, is_read in rows:
+        db.session.add(Notification(user_id=user_id, actor_id=user_id, type="follow", message="m", is_read=is_read,
+                                    created_at=now - timedelta(days=days)))
+    db.session.commit()
+
+
+def test_prune_deletes_only_old_read_notifications_in_chunks(app, client, auth_token):
+    from blog_api import jobs
+    from blog_api.models import User, Notification, NotificationArchive
+
+    auth_token("alice", "alice@example.com")
+    alice = User.query.filter_by(username="alice").one().id
+    app.config.update(JOBS_CHUNK_SIZE=2, JOBS_CHUNK_PAUSE=0, NOTIFICATIONS_RETENTION_DAYS=30)
+    _notifications(alice, (100, True), (100, True), (100, True), (100, False), (5, True))
+
+    result = jobs.run_job("prune_notifications")
+    assert (result["status"], result["rows"]) == ("ok", 3)
+    assert sorted((n.is_read, n.created_at > datetime.utcnow() - timedelta(days=30)) for n in Notification.query) \
+        == [(False, False), (True, True)]
+    assert NotificationArchive.query.count() == 0
+
+    # With archiving on, pruned rows are copied before they are deleted
+    app.config["NOTIFICATIONS_ARCHIVE"] = True
+    _notifications(alice, (60, True))
+    assert jobs.run_job("prune_notifications", force=True)["rows"] == 1
+    assert [n.user_id for n in NotificationArchive.query] == [alice]
+    assert Notification.query.count() == 2
+
+
+def test_vacuum_removes_rows_pointing_at_missing_parents(app, client, auth_token):
+    from sqlalchemy import insert, text
+    from blog_api import jobs
+    from blog_api.models import db, Comment, CommentLike, PostLike, TimelineEntry
+
+    headers = {"Authorization": f"Bearer {auth_token('alice', 'alice@example.com')}"}
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=headers).get_json()["post"]["id"]
+    client.put(f"/posts/{post_id}/like", headers=headers)
+    app.config.update(JOBS_CHUNK_SIZE=1, JOBS_CHUNK_PAUSE=0)
+    # Left behind by a database that did not enforce foreign keys
+    db.session.execute(text("PRAGMA foreign_keys=OFF"))
+    db.session.execute(insert(PostLike), [{"post_id": 999, "user_id": 1}, {"post_id": post_id, "user_id": 998}])
+    db.session.execute(insert(TimelineEntry), [{"user_id": 1, "post_id": 999, "author_id": 1,
+                                                "created_at": datetime.utcnow()}])
+    db.session.execute(insert(Comment), [{"id": 50, "post_id": 999, "author_id": 1, "content": "c"}])
+    db.session.execute(insert(CommentLike), [{"comment_id": 50, "user_id": 1}])
+    db.session.commit()
+    db.session.execute(text("PRAGMA foreign_keys=ON"))
+
+    assert jobs.run_job("vacuum_orphans")["rows"] == 4  # the comment's like goes with it (ON DELETE CASCADE)
+    assert [(l.post_id, l.user_id) for l in PostLike.query] == [(post_id, 1)]
+    assert TimelineEntry.query.filter_by(post_id=999).count() == 0
+    assert Comment.query.count() == CommentLike.query.count() == 0
+
+
+def test_lease_and_schedule_keep_a_job_from_running_twice(app, client):
+    from blog_api import jobs
+    from blog_api.models import db, JobRun
+
+    app.config["JOBS_CHUNK_PAUSE"] = 0
+    assert jobs.run_job("decay_trending")["status"] == "ok"
+    assert jobs.run_job("decay_trending") is None  # not due again for an hour
+    assert jobs.run_job("decay_trending", force=True)["status"] == "ok"
+
+    # Another process holds the lease: not even a forced run starts
+    db.session.get(JobRun, "decay_trending").locked_until = datetime.utcnow() + timedelta(minutes=5)
+    db.session.commit()
+    assert jobs.run_job("decay_trending", force=True) is None
+    # ...until the lease expires without being renewed
+    db.session.get(JobRun, "decay_trending").locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert jobs.run_job("decay_trending", force=True)["status"] == "ok"
+
+    [row] = jobs.status()
+    assert row["job"] == "decay_trending" and row["locked_until"] is None and row["last_error"] is None
+
+
+def test_failed_job_releases_its_lease_and_is_recorded(app, client, monkeypatch):
+    from blog_api import jobs
+
+    def boom(chunks):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setitem(jobs.JOBS, "decay_trending", boom)
+    result = jobs.run_job("decay_trending")
+    assert result["status"] == "error" and "disk full" in result["error"]
+    assert jobs.status()[0]["locked_until"] is None
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'job_runs_total{job="decay_trending",status="error"} 1' in body
+    assert 'job_duration_seconds_count{job="decay_trending"} 1' in body
+
+
+def test_cli_runs_and_reports_jobs(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["jobs", "run", "--once", "rebuild_counters", "decay_trending"])
+    assert result.exit_code == 0, result.output
+    assert [r["job"] for r in json.loads(result.output)] == ["rebuild_counters", "decay_trending"]
+
+    result = runner.invoke(args=["jobs", "status"])
+    assert [r["job"] for r in json.loads(result.output)] == ["decay_trending", "rebuild_counters"]
+
+
+def test_dropped_app_does_not_keep_its_scheduler_alive():
+    import gc
+    import weakref
+    from blog_api.main import create_app
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "JOBS_ENABLED": True})
+    scheduler = weakref.ref(app.extensions["jobs"])
+    del app
+    gc.collect()
+    assert scheduler() is None
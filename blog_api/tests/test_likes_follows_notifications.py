@@ -58,3 +58,275 @@ def test_notifications_basic(client, auth_token):
     assert r.status_code == 200
     notifications = r.get_json()["notifications"]
     assert len(notifications) >= 1
+
+
+def test_counters_follow_writes(app, client, auth_token):
+    from blog_api.models import db, User, Post
+
+    t1 = auth_token("counted", "counted@example.com")
+    t2 = auth_token("counter", "counter@example.com")
+    headers = {"Authorization": f"Bearer {t1}"}
+    r = client.post("/posts", json={"title": "Counted", "content": "Body"}, headers=headers)
+    post_id = r.get_json()["post"]["id"]
+
+    client.post(f"/posts/{post_id}/like", headers={"Authorization": f"Bearer {t2}"})
+    r = client.post(f"/posts/{post_id}/comments", json={"content": "One"}, headers=headers)
+    comment_id = r.get_json()["comment"]["id"]
+    client.post(f"/posts/{post_id}/comments", json={"content": "Two"}, headers=headers)
+    client.delete(f"/comments/{comment_id}", headers=headers)
+    client.post("/follow/counted", headers={"Authorization": f"Bearer {t2}"})
+
+    post = client.get("/posts").get_json()["posts"][0]
+    assert (post["like_count"], post["comment_count"]) == (1, 1)
+    assert db.session.get(User, 1).follower_count == 1
+    assert db.session.get(User, 2).following_count == 1
+
+    client.delete(f"/posts/{post_id}/unlike", headers={"Authorization": f"Bearer {t2}"})
+    client.delete("/unfollow/counted", headers={"Authorization": f"Bearer {t2}"})
+    assert db.session.get(Post, post_id).like_count == 0
+    assert db.session.get(User, 1).follower_count == 0
+
+    # Drifted counters are repaired by the rebuild command
+    db.session.get(Post, post_id).comment_count = 42
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=["rebuild-counters", "--chunk-size", "1"])
+    assert result.exit_code == 0
+    db.session.expire_all()
+    assert db.session.get(Post, post_id).comment_count == 1
+
+
+def _file_app(tmp_path, mode):
+    from blog_api.main import create_app, db
+
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'blog.db'}",
+        "JWT_SECRET_KEY": "test-secret",
+        "NOTIFICATIONS_MODE": mode,
+        "BCRYPT_LOG_ROUNDS": 4,
+        "RATELIMIT_ENABLED": False,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def _like_storm(app, likers):
+    client = app.test_client()
+    tokens = []
+    for name in ["author"] + likers:
+        client.post("/register", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+        r = client.post("/login", json={"email": f"{name}@example.com", "password": "pw"})
+        tokens.append(r.get_json()["access_token"])
+    r = client.post("/posts", json={"title": "Popular", "content": "Body"},
+                    headers={"Authorization": f"Bearer {tokens[0]}"})
+    post_id = r.get_json()["post"]["id"]
+    for token in tokens[1:]:
+        client.post(f"/posts/{post_id}/like", headers={"Authorization": f"Bearer {token}"})
+    app.extensions["notifications"].flush()
+    r = client.get("/notifications", headers={"Authorization": f"Bearer {tokens[0]}"})
+    return [n["message"] for n in r.get_json()["notifications"]]
+
+
+def test_threaded_notifications_coalesce_bursts(tmp_path):
+    app = _file_app(tmp_path, "thread")
+    app.config.update(NOTIFICATIONS_WORKERS=1, NOTIFICATIONS_LINGER=1.0)
+    messages = _like_storm(app, ["l1", "l2", "l3"])
+    app.extensions["notifications"].stop()
+    assert messages == ["l3 and 2 others liked your post."]
+
+
+def test_outbox_notifications(tmp_path):
+    from blog_api.models import NotificationOutbox
+
+    app = _file_app(tmp_path, "outbox")
+    app.config["NOTIFICATIONS_POLL_INTERVAL"] = 60
+    messages = _like_storm(app, ["o1", "o2"])
+    app.extensions["notifications"].stop()
+    assert messages == ["o2 and 1 other liked your post."]
+    with app.app_context():
+        assert NotificationOutbox.query.count() == 0
+
+
+def test_notifications_pagination_and_bulk_read(client, auth_token):
+    fan = auth_token("fan", "fan@example.com")
+    headers = {"Authorization": f"Bearer {fan}"}
+    for i in range(5):
+        auth_token(f"star{i}", f"star{i}@example.com")
+        client.post(f"/follow/star{i}", headers=headers)
+
+    r = client.get("/notifications/unread_count", headers=headers)
+    assert r.get_json()["unread_count"] == 5
+
+    # Page through newest first
+    r = client.get("/notifications?limit=2", headers=headers)
+    page = r.get_json()
+    assert [n["message"] for n in page["notifications"]] == [
+        "star4 started following you.", "star3 started following you."]
+
+    # true is not an id (it would otherwise mark notification 1)
+    r = client.put("/notifications/read", json={"ids": [True]}, headers=headers)
+    assert r.status_code == 400
+
+    # Mark one explicitly, then everything from the cursor position back
+    first_id = page["notifications"][0]["id"]
+    r = client.put("/notifications/read", json={"ids": [first_id]}, headers=headers)
+    assert r.get_json()["updated"] == 1
+    r = client.put("/notifications/read", json={"before": page["next_cursor"]}, headers=headers)
+    assert r.get_json()["updated"] == 4
+
+    r = client.get("/notifications?unread_only=true", headers=headers)
+    assert r.get_json()["notifications"] == []
+    r = client.get("/notifications/unread_count", headers=headers)
+    assert r.get_json()["unread_count"] == 0
+
+    r = client.put("/notifications/read", json={}, headers=headers)
+    assert r.status_code == 400
+
+
+def test_batch_likes(client, auth_token):
+    from sqlalchemy import event
+    from blog_api.models import db
+
+    author = auth_token("batchauthor", "batchauthor@example.com")
+    liker = auth_token("batchliker", "batchliker@example.com")
+    r = client.post("/posts:batch", json={"posts": [{"title": f"P{i}", "content": "Body"} for i in range(3)]},
+                    headers={"Authorization": f"Bearer {author}"})
+    ids = [res["id"] for res in r.get_json()["results"]]
+    client.post(f"/posts/{ids[0]}/like", headers={"Authorization": f"Bearer {liker}"})
+
+    inserts = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.startswith("INSERT INTO post_likes"):
+            inserts.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        r = client.post("/likes:batch", json={"post_ids": ids + [ids[1], 999]},
+                        headers={"Authorization": f"Bearer {liker}"})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert r.get_json()["created"] == 2
+    assert len(inserts) == 1  # one statement for the whole batch
+    assert [res["status"] for res in r.get_json()["results"]] == [200, 201, 201, 200, 404]
+    counts = [client.get(f"/posts/{pid}").get_json()["post"]["like_count"] for pid in ids]
+    assert counts == [1, 1, 1]
+    r = client.get("/notifications/unread_count", headers={"Authorization": f"Bearer {author}"})
+    assert r.get_json()["unread_count"] == 3
+
+
+def test_batch_items_that_are_not_ids_are_rejected_per_item(client, auth_token):
+    token = auth_token("batcher", "batcher@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=headers).get_json()["post"]["id"]
+
+    r = client.post("/likes:batch", json={"post_ids": [[1], True, "1", post_id]}, headers=headers)
+    assert r.status_code == 200
+    assert [res["status"] for res in r.get_json()["results"]] == [400, 400, 400, 201]
+    r = client.post("/comments:batch", json={"comments": [{"post_id": [1], "content": "x"},
+                                                          {"post_id": post_id, "content": "y"}]}, headers=headers)
+    assert r.status_code == 200
+    assert [res["status"] for res in r.get_json()["results"]] == [400, 201]
+
+
+def test_put_and_delete_like_are_idempotent(client, auth_token):
+    from blog_api.models import db, Post
+
+    author = {"Authorization": f"Bearer {auth_token('author', 'author@example.com')}"}
+    fan = {"Authorization": f"Bearer {auth_token('fan', 'fan@example.com')}"}
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=author).get_json()["post"]["id"]
+
+    assert client.put(f"/posts/{post_id}/like", headers=fan).status_code == 201
+    r = client.put(f"/posts/{post_id}/like", headers=fan)
+    assert r.status_code == 200 and r.get_json()["created"] is False
+    assert db.session.get(Post, post_id).like_count == 1
+    assert client.put("/posts/999/like", headers=fan).status_code == 404
+
+    assert client.delete(f"/posts/{post_id}/like", headers=fan).get_json()["removed"] is True
+    assert client.delete(f"/posts/{post_id}/like", headers=fan).get_json()["removed"] is False
+    db.session.expire_all()
+    assert db.session.get(Post, post_id).like_count == 0
+
+    assert client.put("/follow/author", headers=fan).status_code == 201
+    assert client.put("/follow/author", headers=fan).status_code == 200
+    assert client.delete("/follow/author", headers=fan).get_json()["removed"] is True
+    assert client.delete("/follow/author", headers=fan).get_json()["removed"] is False
+    assert client.put("/follow/fan", headers=fan).status_code == 400
+
+
+def test_like_round_trips(client, auth_token):
+    from sqlalchemy import event
+    from blog_api.models import db
+
+    token = auth_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=headers).get_json()["post"]["id"]
+    client.put(f"/posts/{post_id}/like", headers=headers)
+    client.delete(f"/posts/{post_id}/like", headers=headers)  # the post now has a trending score row
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        client.put(f"/posts/{post_id}/like", headers=headers)
+        first = list(statements)
+        statements.clear()
+        client.put(f"/posts/{post_id}/like", headers=headers)
+        again = list(statements)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    # The upsert, the counter, the trending score and the author lookup for the notification
+    # (none for a self-like)
+    assert first == ["INSERT", "UPDATE", "UPDATE", "SELECT"]
+    # Repeating it is the upsert plus an existence check, and writes nothing
+    assert again == ["INSERT", "SELECT"]
+
+
+def test_concurrent_likes_and_follows_do_not_conflict(tmp_path):
+    import threading
+
+    from blog_api.models import db, Post, User
+
+    app = _file_app(tmp_path, "inline")
+    client = app.test_client()
+    headers = []
+    for name in ("author", "fan"):
+        client.post("/register", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+        r = client.post("/login", json={"email": f"{name}@example.com", "password": "pw"})
+        headers.append({"Authorization": f"Bearer {r.get_json()['access_token']}"})
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=headers[0]).get_json()["post"]["id"]
+
+    statuses = []
+
+    def hammer():
+        c = app.test_client()
+        for _ in range(10):
+            statuses.append(c.put(f"/posts/{post_id}/like", headers=headers[1]).status_code)
+            statuses.append(c.put("/follow/author", headers=headers[1]).status_code)
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(set(statuses)) == [200, 201]
+    assert statuses.count(201) == 2
+    with app.app_context():
+        assert db.session.get(Post, post_id).like_count == 1
+        assert db.session.get(User, 1).follower_count == 1
+
+
+def test_dropped_app_does_not_keep_its_dispatcher_alive():
+    import gc
+    import weakref
+    from blog_api.main import create_app
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "NOTIFICATIONS_MODE": "inline"})
+    dispatcher = weakref.ref(app.extensions["notifications"])
+    del app
+    gc.collect()
+    assert dispatcher() is None
@@ -0,0 +1,23 @@
+# blog_api/tests/test_metrics.py
+import logging
+
+
+def test_metrics_endpoint_reports_per_route_stats(client, auth_token):
+    token = auth_token()
+    client.post("/posts", json={"title": "T", "content": "C"}, headers={"Authorization": f"Bearer {token}"})
+    client.get("/posts")
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{endpoint="get_posts",method="GET",status="200"} 1' in body
+    assert 'http_request_sql_queries_count{endpoint="get_posts",method="GET"} 1' in body
+    assert 'http_request_commit_duration_seconds_count{endpoint="create_post",method="POST"} 1' in body
+    assert 'http_response_size_bytes_bucket{endpoint="get_posts",method="GET",le="+Inf"} 1' in body
+    assert "db_pool_checkout_wait_seconds_count" in body
+
+
+def test_slow_request_log_lists_queries(app, client, caplog):
+    app.config["METRICS_SLOW_REQUEST_MS"] = 0
+    with caplog.at_level(logging.WARNING, logger="blog_api.metrics"):
+        client.get("/posts")
+    assert "Slow request GET /posts" in caplog.text
+    assert "FROM posts" in caplog.text
@@ -0,0 +1,104 @@
+import pytest
+
+# The tables as the original create_all built them, before counters, threads, indexes and cascades
+ORIGINAL_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(120) NOT NULL UNIQUE, "
+    "email VARCHAR(500) NOT NULL UNIQUE, password VARCHAR(1000) NOT NULL, created_at DATETIME)",
+    "CREATE TABLE posts (id INTEGER PRIMARY KEY, title VARCHAR(500) NOT NULL, content TEXT NOT NULL, "
+    "author_id INTEGER NOT NULL REFERENCES users (id), created_at DATETIME, updated_at DATETIME)",
+    "CREATE TABLE comments (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL REFERENCES posts (id), "
+    "content TEXT NOT NULL, author_id INTEGER NOT NULL REFERENCES users (id), created_at DATETIME, "
+    "updated_at DATETIME)",
+    "CREATE TABLE post_likes (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL REFERENCES posts (id), "
+    "user_id INTEGER NOT NULL REFERENCES users (id), is_like BOOLEAN, "
+    "CONSTRAINT unique_post_user UNIQUE (post_id, user_id))",
+    "CREATE TABLE comment_likes (id INTEGER PRIMARY KEY, comment_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+    "is_like BOOLEAN, CONSTRAINT unique_comment_user UNIQUE (comment_id, user_id))",
+    "CREATE TABLE followers (id INTEGER PRIMARY KEY, follower_id INTEGER NOT NULL, followed_id INTEGER NOT NULL, "
+    "CONSTRAINT unique_follow UNIQUE (follower_id, followed_id))",
+    "CREATE TABLE notifications (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, actor_id INTEGER NOT NULL, "
+    "type VARCHAR(50) NOT NULL, post_id INTEGER, comment_id INTEGER, is_read BOOLEAN, created_at DATETIME, "
+    "message VARCHAR(256) NOT NULL)",
+]
+
+
+@pytest.fixture
+def empty_db(app):
+    from blog_api.models import db
+
+    db.drop_all()
+    return db
+
+
+def test_upgrade_creates_an_empty_database_at_the_latest_version(app, empty_db):
+    from sqlalchemy import inspect
+    from blog_api import migrations
+
+    assert migrations.applied_versions() is None
+    assert [m.version for m in migrations.upgrade()] == [m.version for m in migrations.MIGRATIONS]
+    assert set(empty_db.metadata.tables) <= set(inspect(empty_db.engine).get_table_names())
+    assert migrations.pending() == []
+    assert migrations.upgrade() == []
+
+
+def test_upgrade_brings_a_pre_migration_database_up_to_date(app, client, empty_db):
+    from sqlalchemy import inspect, text
+    from blog_api import migrations
+
+    with empty_db.engine.begin() as conn:
+        for statement in ORIGINAL_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users (id, username, email, password) VALUES (1, 'old', 'old@x.com', 'x')"))
+        conn.execute(text("INSERT INTO posts (id, title, content, author_id) VALUES (1, 'T', 'C', 1)"))
+        conn.execute(text("INSERT INTO post_likes (post_id, user_id, is_like) VALUES (1, 1, 1)"))
+
+    assert [m.version for m in migrations.upgrade()] == [1, 2, 3, 4, 5]
+    inspector = inspect(empty_db.engine)
+    assert {"parent_id", "path", "like_count", "reply_count"} <= {c["name"] for c in inspector.get_columns("comments")}
+    assert "idx_comments_root_path" in {i["name"] for i in inspector.get_indexes("comments")}
+    assert "timelines" in inspector.get_table_names()
+    assert {fk["options"].get("ondelete") for fk in inspector.get_foreign_keys("post_likes")} == {"CASCADE"}
+
+    # Existing rows get the new columns' defaults and the API works on the migrated schema
+    assert empty_db.session.execute(text("SELECT follower_count FROM users WHERE id = 1")).scalar() == 0
+    client.post("/register", json={"username": "new", "email": "new@x.com", "password": "secret"})
+    token = client.post("/login", json={"email": "new@x.com", "password": "secret"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=headers).get_json()["post"]["id"]
+    parent = client.post(f"/posts/{post_id}/comments", json={"content": "a"}, headers=headers).get_json()
+    reply = client.post(f"/posts/{post_id}/comments", json={"content": "b", "parent_id": parent["comment"]["id"]},
+                        headers=headers)
+    assert reply.status_code == 201
+
+    # Rows survive the rebuild that added ON DELETE CASCADE, and deleting the old post takes its like along
+    assert empty_db.session.execute(text("SELECT COUNT(*) FROM post_likes")).scalar() == 1
+    empty_db.session.execute(text("DELETE FROM posts WHERE id = 1"))
+    empty_db.session.commit()
+    assert empty_db.session.execute(text("SELECT COUNT(*) FROM post_likes")).scalar() == 0
+
+
+def test_db_cli_reports_and_applies_migrations(app, empty_db):
+    runner = app.test_cli_runner()
+    assert "Schema at version none." in runner.invoke(args=["db", "current"]).output
+    result = runner.invoke(args=["db", "upgrade"])
+    assert result.exit_code == 0, result.output
+    assert "Applied 1: create missing tables" in result.output
+    assert runner.invoke(args=["db", "current"]).output.strip() == "Schema at version 5."
+
+
+def test_creating_the_app_touches_no_database():
+    import blog_api.main
+    from blog_api.main import create_app
+
+    assert not hasattr(blog_api.main, "app")
+    # Opening this database would fail, so startup must not try
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:////nonexistent/dir/blog.db"})
+    assert "get_posts" in app.view_functions
+
+
+def test_api_spec_is_built_once_and_served_with_an_etag(client):
+    first = client.get("/apispec_1.json")
+    assert first.status_code == 200 and "/posts" in first.get_json()["paths"]
+    assert client.get("/apispec_1.json").data == first.data
+    again = client.get("/apispec_1.json", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
@@ -0,0 +1,108 @@
+import json
+
+
+def _headers(auth_token, name):
+    return {"Authorization": f"Bearer {auth_token(name, f'{name}@example.com')}"}
+
+
+def _memory_hub(app):
+    from blog_api.notification_stream import MemoryBackend
+
+    hub = app.extensions["notification_stream"]
+    hub.backend = MemoryBackend(hub)
+    return hub
+
+
+def _events(chunk):
+    return dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+
+
+def test_stream_pushes_new_notifications_and_heartbeats(app, client, auth_token):
+    _memory_hub(app)
+    app.config["NOTIFICATIONS_STREAM_HEARTBEAT"] = 0.05
+    alice, bob = _headers(auth_token, "alice"), _headers(auth_token, "bob")
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=alice).get_json()["post"]["id"]
+    client.put(f"/posts/{post_id}/like", headers=bob)  # before connecting: not replayed
+
+    response = client.get("/notifications/stream", headers=alice, buffered=False)
+    assert response.status_code == 200 and response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+    assert next(chunks) == b"retry: 2000\n\n"
+    assert next(chunks) == b": heartbeat\n\n"
+
+    client.put("/follow/bob", headers=alice)  # follows notify the follower
+    event = _events(next(chunks))
+    assert event["event"] == "notification"
+    assert json.loads(event["data"])["message"] == "bob started following you."
+    response.close()
+    assert not app.extensions["notification_stream"].has_streams()
+
+
+def test_last_event_id_resumes_after_the_given_notification(app, client, auth_token):
+    _memory_hub(app)
+    alice, bob = _headers(auth_token, "alice"), _headers(auth_token, "bob")
+    post_id = client.post("/posts", json={"title": "T", "content": "C"}, headers=alice).get_json()["post"]["id"]
+    client.put(f"/posts/{post_id}/like", headers=bob)
+    client.put("/follow/bob", headers=alice)
+    first, second = [n["id"] for n in reversed(client.get("/notifications", headers=alice).get_json()["notifications"])]
+
+    response = client.get("/notifications/stream", headers=dict(alice, **{"Last-Event-ID": str(first)}),
+                          buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+    assert _events(next(chunks))["id"] == str(second)
+    response.close()
+
+    response = client.get("/notifications/stream?last_event_id=0", headers=alice, buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+    assert [_events(next(chunks))["id"] for _ in range(2)] == [str(first), str(second)]
+    response.close()
+
+    bad = client.get("/notifications/stream", headers=dict(alice, **{"Last-Event-ID": "x"}))
+    assert bad.status_code == 400
+
+
+def test_streams_are_capped_per_user(app, client, auth_token):
+    _memory_hub(app)
+    app.config["NOTIFICATIONS_STREAM_MAX_PER_USER"] = 1
+    alice, bob = _headers(auth_token, "alice"), _headers(auth_token, "bob")
+    first = client.get("/notifications/stream", headers=alice, buffered=False)
+    assert first.status_code == 200
+    assert client.get("/notifications/stream", headers=alice).status_code == 429
+    assert client.get("/notifications/stream", headers=bob, buffered=False).status_code == 200
+    first.close()
+    assert client.get("/notifications/stream", headers=alice, buffered=False).status_code == 200
+    assert client.get("/notifications/stream").status_code == 401
+
+
+def test_polling_backend_wakes_streams_for_rows_written_elsewhere(app, client, auth_token):
+    from sqlalchemy import insert
+    from blog_api.models import db, Notification
+    from blog_api.notification_stream import PollingBackend, GAP_POLLS
+
+    # Users 1 and 2, whom the notifications below belong to
+    auth_token("alice", "alice@example.com")
+    auth_token("bob", "bob@example.com")
+    hub = _memory_hub(app)
+    poller = PollingBackend(hub)
+    alice = hub.subscribe(1)
+    bob = hub.subscribe(2)
+    last, gaps = poller.poll(None, {})
+    assert (last, gaps) == (0, {})
+
+    def write(id, user_id):
+        db.session.execute(insert(Notification), [{"id": id, "user_id": user_id, "actor_id": 1, "type": "follow",
+                                                   "message": "m"}])
+        db.session.commit()
+
+    write(1, 1)
+    write(3, 1)  # id 2 is still in flight in another transaction
+    last, gaps = poller.poll(last, gaps)
+    assert (last, gaps) == (3, {2: GAP_POLLS})
+    assert alice.wait(0) and not bob.wait(0)
+
+    write(2, 2)
+    last, gaps = poller.poll(last, gaps)
+    assert (last, gaps) == (3, {})
+    assert bob.wait(0) and not alice.wait(0)
@@ -40,3 +40,104 @@ def test_update_and_delete_post(client, auth_token):
     r = client.delete(f"/posts/{post_id}", headers={"Authorization": f"Bearer {token}"})
     assert r.status_code == 200
     assert r.get_json()["message"] == "Post deleted successfully"
+
+
+def test_get_posts_cursor_pagination(client, auth_token):
+    token = auth_token("pager", "pager@example.com")
+    created = []
+    for i in range(5):
+        r = client.post("/posts", json={
+            "title": f"Post {i}",
+            "content": "Paged content"
+        }, headers={"Authorization": f"Bearer {token}"})
+        created.append(r.get_json()["post"]["id"])
+
+    # Walk every page, newest first
+    seen, cursor = [], None
+    while True:
+        url = "/posts?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(url)
+        assert r.status_code == 200
+        data = r.get_json()
+        assert len(data["posts"]) <= 2
+        seen.extend(p["id"] for p in data["posts"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert seen == list(reversed(created))
+
+    # A post created mid-walk does not shift later pages
+    r = client.get("/posts?limit=2")
+    cursor = r.get_json()["next_cursor"]
+    client.post("/posts", json={"title": "Late", "content": "New"},
+                headers={"Authorization": f"Bearer {token}"})
+    r = client.get(f"/posts?limit=2&cursor={cursor}")
+    assert [p["id"] for p in r.get_json()["posts"]] == list(reversed(created))[2:4]
+
+    r = client.get("/posts?cursor=not-a-cursor")
+    assert r.status_code == 400
+
+
+def test_get_post_detail_fixed_query_count(app, client, auth_token):
+    from sqlalchemy import event
+    from blog_api.models import db
+
+    app.config["CACHE_ENABLED"] = False
+    tokens = [auth_token(f"reader{i}", f"reader{i}@example.com") for i in range(3)]
+    r = client.post("/posts", json={"title": "Detailed", "content": "Body"},
+                    headers={"Authorization": f"Bearer {tokens[0]}"})
+    post_id = r.get_json()["post"]["id"]
+    for i in range(6):
+        client.post(f"/posts/{post_id}/comments", json={"content": f"Comment {i}"},
+                    headers={"Authorization": f"Bearer {tokens[i % 3]}"})
+    client.post(f"/posts/{post_id}/like", headers={"Authorization": f"Bearer {tokens[1]}"})
+
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    db.session.expunge_all()
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        r = client.get(f"/posts/{post_id}?limit=4")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["post"]["author"]["username"] == "reader0"
+    assert (data["post"]["like_count"], data["post"]["comment_count"]) == (1, 6)
+    assert [c["author"]["username"] for c in data["comments"]] == ["reader0", "reader1", "reader2", "reader0"]
+    assert data["comments_next_cursor"]
+    assert len(statements) == 2
+
+    r = client.get(f"/posts/{post_id}/comments?limit=4&cursor={data['comments_next_cursor']}")
+    assert [c["content"] for c in r.get_json()["comments"]] == ["Comment 4", "Comment 5"]
+    assert client.get("/posts/999").status_code == 404
+
+
+def test_batch_create_posts_and_comments(client, auth_token):
+    token = auth_token("importer", "importer@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/posts:batch", json={"posts": [
+        {"title": "One", "content": "Body"},
+        {"title": "", "content": "No title"},
+        {"title": "Two", "content": "Body"},
+    ]}, headers=headers)
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["created"] == 2
+    assert [res["status"] for res in data["results"]] == [201, 400, 201]
+    post_id = data["results"][0]["id"]
+    assert [p["title"] for p in client.get("/posts").get_json()["posts"]] == ["Two", "One"]
+
+    r = client.post("/comments:batch", json={"comments": [
+        {"post_id": post_id, "content": "First"},
+        {"post_id": 999, "content": "Orphan"},
+        {"post_id": post_id, "content": "Second"},
+    ]}, headers=headers)
+    assert [res["status"] for res in r.get_json()["results"]] == [201, 404, 201]
+    assert client.get(f"/posts/{post_id}").get_json()["post"]["comment_count"] == 2
+
+    r = client.post("/posts:batch", json={"posts": []}, headers=headers)
+    assert r.status_code == 400
@@ -0,0 +1,61 @@
+# blog_api/tests/test_ratelimit.py
+import pytest
+
+from blog_api.main import create_app, db
+from blog_api.ratelimit import MemoryBuckets, SQLiteBuckets
+
+
+@pytest.fixture
+def limited_app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "JWT_SECRET_KEY": "test-secret",
+        "NOTIFICATIONS_MODE": "inline",
+        "BCRYPT_LOG_ROUNDS": 4,
+        "RATELIMITS": {"login": (2, 60)},
+        "ADMISSION_MAX_CONCURRENT": 1,
+        "ADMISSION_QUEUE_TIMEOUT": 0.01,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_token_bucket_refills():
+    buckets = MemoryBuckets()
+    assert [buckets.take("k", 2, 1.0)[0] for _ in range(3)] == [True, True, False]
+    allowed, retry_after = buckets.take("k", 2, 1.0)
+    assert not allowed and 0 < retry_after <= 1
+    assert buckets.take("other", 2, 1.0)[0]
+
+
+def test_sqlite_buckets_are_shared(tmp_path):
+    path = str(tmp_path / "rl.sqlite")
+    a, b = SQLiteBuckets(path), SQLiteBuckets(path)
+    assert a.take("k", 2, 0.001)[0] and b.take("k", 2, 0.001)[0]
+    assert not a.take("k", 2, 0.001)[0]
+
+
+def test_login_is_limited_per_client(limited_app):
+    client = limited_app.test_client()
+    bad = {"email": "nobody@example.com", "password": "x"}
+    assert [client.post("/login", json=bad).status_code for _ in range(3)] == [401, 401, 429]
+    limited = client.post("/login", json=bad)
+    assert limited.status_code == 429 and int(limited.headers["Retry-After"]) >= 1
+    # Another address has its own bucket
+    assert client.post("/login", json=bad, environ_base={"REMOTE_ADDR": "10.0.0.2"}).status_code == 401
+
+
+def test_admission_sheds_load_when_saturated(limited_app):
+    client = limited_app.test_client()
+    slots = limited_app.extensions["admission"]._slots
+    slots.acquire()
+    try:
+        shed = client.get("/posts")
+        assert shed.status_code == 503 and shed.headers["Retry-After"] == "1"
+    finally:
+        slots.release()
+    assert client.get("/posts").status_code == 200
@@ -0,0 +1,44 @@
+# blog_api/tests/test_search.py
+
+def test_search_ranks_and_tracks_edits(client, auth_token):
+    token = auth_token("searcher", "searcher@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    r = client.post("/posts", json={"title": "Sourdough basics", "content": "Flour, water and salt."}, headers=headers)
+    bread = r.get_json()["post"]["id"]
+    r = client.post("/posts", json={"title": "Trail notes", "content": "Packed sourdough for lunch."}, headers=headers)
+    hike = r.get_json()["post"]["id"]
+    r = client.post(f"/posts/{bread}/comments", json={"content": "Which sourdough starter?"}, headers=headers)
+    comment_id = r.get_json()["comment"]["id"]
+
+    r = client.get("/search?q=sourdough")
+    results = r.get_json()["results"]
+    assert results[0] == {**results[0], "type": "post", "id": bread}  # title match ranks first
+    assert {(x["type"], x["id"]) for x in results} == {("post", bread), ("post", hike), ("comment", comment_id)}
+
+    # Cursor pagination walks the same ranking
+    first = client.get("/search?q=sourdough&limit=2").get_json()
+    second = client.get(f"/search?q=sourdough&limit=2&cursor={first['next_cursor']}").get_json()
+    assert [(x["type"], x["id"]) for x in first["results"] + second["results"]] == \
+        [(x["type"], x["id"]) for x in results]
+    assert second["next_cursor"] is None
+
+    # Updates and deletes keep the index current
+    client.put(f"/comments/{comment_id}", json={"content": "Which rye starter?"}, headers=headers)
+    client.delete(f"/posts/{hike}", headers=headers)
+    assert [(x["type"], x["id"]) for x in client.get("/search?q=sourdough").get_json()["results"]] == \
+        [("post", bread)]
+    assert [x["id"] for x in client.get("/search?q=rye").get_json()["results"]] == [comment_id]
+
+    assert client.get('/search?q="*').status_code == 400
+
+
+def test_deleting_a_post_removes_its_comments_from_the_index(app, client, auth_token):
+    from sqlalchemy import text
+    from blog_api.models import db
+
+    headers = {"Authorization": f"Bearer {auth_token('searcher', 'searcher@example.com')}"}
+    r = client.post("/posts", json={"title": "Kimchi", "content": "Cabbage"}, headers=headers)
+    post_id = r.get_json()["post"]["id"]
+    client.post(f"/posts/{post_id}/comments", json={"content": "Kimchi stew"}, headers=headers)
+    client.delete(f"/posts/{post_id}", headers=headers)
+    assert db.session.execute(text("SELECT COUNT(*) FROM search_index")).scalar() == 0
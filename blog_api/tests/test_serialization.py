@@ -0,0 +1,31 @@
+# blog_api/tests/test_serialization.py
+from datetime import datetime, timezone
+
+import pytest
+
+from blog_api.schemas import serialize_post
+from blog_api.serialization import JSONProvider
+
+
+def test_datetimes_are_iso8601_utc(client, auth_token):
+    token = auth_token()
+    client.post("/posts", json={"title": "T", "content": "C"}, headers={"Authorization": f"Bearer {token}"})
+    created_at = client.get("/posts").get_json()["posts"][0]["created_at"]
+    assert created_at.endswith("Z")
+    assert datetime.fromisoformat(created_at.replace("Z", "+00:00")).tzinfo == timezone.utc
+
+
+@pytest.mark.parametrize("value", [
+    datetime(2024, 5, 1, 12, 30, 0, 250),
+    datetime(2024, 5, 1),
+    datetime(2024, 5, 1, tzinfo=timezone.utc),
+])
+def test_fast_and_stdlib_encoders_agree(app, value):
+    post = type("Row", (), {"id": 1, "title": "Tïtle", "content": "Body", "author_id": 2, "created_at": value,
+                            "like_count": 3, "comment_count": 4})
+    payload = {"posts": [serialize_post(post)], "next_cursor": None}
+    provider = JSONProvider(app)
+    fast = provider.loads(provider.encode(payload))
+    provider.fast = False
+    assert provider.loads(provider.encode(payload)) == fast
+    assert fast["posts"][0]["created_at"].endswith("Z")
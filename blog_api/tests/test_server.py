@@ -0,0 +1,106 @@
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_forked_child_gets_its_own_connection_pool(tmp_path):
+    from sqlalchemy import text
+    from blog_api.main import create_app
+    from blog_api.models import db
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'fork.db'}"})
+    with app.app_context():
+        with db.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert db.engine.pool.checkedin() == 1
+
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write, str(db.engine.pool.checkedin()).encode())
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert os.read(read, 16) == b"0"
+        # The parent's pooled connection was left alone, not closed by the child
+        assert db.engine.pool.checkedin() == 1
+        with db.engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_drain_finishes_requests_in_flight():
+    from blog_api.server import PooledWSGIServer
+
+    started = threading.Event()
+
+    def slow_app(environ, start_response):
+        started.set()
+        time.sleep(0.3)
+        start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "4")])
+        return [b"done"]
+
+    sock = socket.create_server(("127.0.0.1", 0))
+    server = PooledWSGIServer(slow_app, sock, threads=2, keepalive=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    responses = []
+
+    def call():
+        conn = http.client.HTTPConnection(*sock.getsockname()[:2], timeout=5)
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        responses.append((response.status, response.read(), response.getheader("Connection")))
+
+    client = threading.Thread(target=call)
+    client.start()
+    assert started.wait(5)
+    server.drain()
+    client.join(5)
+    assert responses == [(200, b"done", "close")]
+    sock.close()
+
+
+def test_serve_command_runs_workers_and_stops_gracefully(tmp_path):
+    env = dict(os.environ, DATABASE_URI=f"sqlite:///{tmp_path / 'serve.db'}", METRICS_ENABLED="false")
+    flask = [sys.executable, "-m", "flask", "--app", "blog_api.main"]
+    subprocess.run(flask + ["db", "upgrade"], cwd=ROOT, env=env, check=True, capture_output=True)
+    master = subprocess.Popen(flask + ["serve", "--port", "0", "--workers", "2", "--threads", "2"], cwd=ROOT,
+                              env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        line = master.stdout.readline()
+        assert "(2 workers x 2 threads)" in line
+        host, port = line.split("http://")[1].split()[0].split(":")
+        for _ in range(50):
+            try:
+                conn = http.client.HTTPConnection(host, int(port), timeout=5)
+                conn.request("GET", "/posts")
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.1)
+        response = conn.getresponse()
+        assert response.status == 200 and response.read()
+        conn.request("GET", "/posts/trending")  # same keep-alive connection
+        assert conn.getresponse().status == 200
+        conn.close()
+    finally:
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=15) == 0
+
+
+def test_per_process_backends_are_reported_for_several_workers():
+    from blog_api.config import Config
+    from blog_api.server import per_process_settings
+
+    cfg = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    cfg.update(AUTH_BLOCKLIST_BACKEND="sqlite", CACHE_BACKEND="memory", RATELIMIT_BACKEND="memory",
+               NOTIFICATIONS_STREAM_BACKEND="poll", DATABASE_REPLICA_URIS=[])
+    assert [name for name, _ in per_process_settings(cfg)] == ["RATELIMIT_BACKEND", "CACHE_BACKEND"]
+
+    cfg.update(DATABASE_REPLICA_URIS=["sqlite://"], DB_REPLICA_STICKY_BACKEND="memory")
+    assert "DB_REPLICA_STICKY_BACKEND" in dict(per_process_settings(cfg))
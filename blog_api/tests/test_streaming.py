@@ -0,0 +1,60 @@
+# blog_api/tests/test_streaming.py
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from blog_api.models import db, User, Post
+
+
+def _seed_posts(n, content_size=300):
+    db.session.execute(insert(User), [{"id": 1, "username": "bulk", "email": "bulk@example.com", "password": "x"}])
+    start = datetime(2024, 1, 1)
+    db.session.execute(insert(Post), [
+        {"title": f"Post {i}", "content": "x" * content_size, "author_id": 1,
+         "created_at": start + timedelta(seconds=i)}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+def test_stream_json_and_ndjson(client):
+    _seed_posts(5)
+    body = client.get("/posts?stream=1").get_json()
+    assert [p["title"] for p in body["posts"]] == [f"Post {i}" for i in range(4, -1, -1)]
+    assert body["next_cursor"] is None
+
+    # A cursor from a normal page resumes the export after that page
+    cursor = client.get("/posts?limit=2").get_json()["next_cursor"]
+    response = client.get(f"/posts?cursor={cursor}", headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [p["title"] for p in lines] == ["Post 2", "Post 1", "Post 0"]
+
+    assert client.get("/posts?stream=1&cursor=garbage").status_code == 400
+
+
+def test_stream_memory_stays_bounded(app, client):
+    app.config["STREAM_CHUNK_SIZE"] = 500
+    rows = 20000
+    _seed_posts(rows)
+
+    def export():
+        response = client.get("/posts?stream=1", buffered=False)
+        size = 0
+        for chunk in response.response:
+            size += len(chunk)
+        response.close()
+        return size
+
+    export()  # warm up statement caches
+    tracemalloc.start()
+    try:
+        size = export()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert size > rows * 300
+    # Building the list (or the JSON string) would need several times the body size
+    assert peak < size / 3
@@ -0,0 +1,127 @@
+import pytest
+
+
+def _users(client, auth_token, *names):
+    return [{"Authorization": f"Bearer {auth_token(n, f'{n}@example.com')}"} for n in names]
+
+
+def _post(client, headers, title):
+    return client.post("/posts", json={"title": title, "content": "Body"}, headers=headers).get_json()["post"]["id"]
+
+
+def test_likes_and_comments_rank_posts(app, client, auth_token):
+    app.config["TRENDING_REFRESH_SECONDS"] = 0
+    alice, bob = _users(client, auth_token, "alice", "bob")
+    quiet, busy, liked = (_post(client, alice, t) for t in ("quiet", "busy", "liked"))
+    client.put(f"/posts/{busy}/like", headers=alice)
+    client.put(f"/posts/{busy}/like", headers=bob)
+    client.post(f"/posts/{busy}/comments", json={"content": "Nice"}, headers=bob)
+    client.post(f"/posts/{liked}/like", headers=bob)
+
+    posts = client.get("/posts/trending").get_json()["posts"]
+    assert [p["id"] for p in posts] == [busy, liked]
+    assert posts[0]["score"] == pytest.approx(4, rel=1e-3)
+    assert posts[0]["like_count"] == 2
+
+    # Taking likes back lowers the score (toggle, DELETE and /unlike all count)
+    client.post(f"/posts/{busy}/like", headers=alice)
+    client.delete(f"/posts/{busy}/unlike", headers=bob)
+    posts = client.get("/posts/trending?limit=1").get_json()["posts"]
+    assert posts[0]["id"] == busy and posts[0]["score"] == pytest.approx(2, rel=1e-3)
+
+
+def test_snapshot_is_served_from_memory_until_refreshed(app, client, auth_token):
+    from sqlalchemy import event
+    from blog_api.models import db
+
+    app.config["TRENDING_REFRESH_SECONDS"] = 3600
+    [alice] = _users(client, auth_token, "alice")
+    first, second, third = (_post(client, alice, t) for t in ("first", "second", "third"))
+    client.put(f"/posts/{first}/like", headers=alice)
+    assert [p["id"] for p in client.get("/posts/trending").get_json()["posts"]] == [first]
+
+    client.post("/likes:batch", json={"post_ids": [second, third]}, headers=alice)
+    client.delete(f"/posts/{third}/like", headers=alice)
+    client.post("/comments:batch", json={"comments": [{"post_id": second, "content": "x"}]}, headers=alice)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        assert [p["id"] for p in client.get("/posts/trending").get_json()["posts"]] == [first]
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert statements == []
+
+    # third's like was taken back, so it is not trending
+    app.extensions["trending"].invalidate()
+    assert [p["id"] for p in client.get("/posts/trending").get_json()["posts"]] == [second, first]
+
+    # A deleted post leaves the snapshot at once
+    client.delete(f"/posts/{first}", headers=alice)
+    assert [p["id"] for p in client.get("/posts/trending").get_json()["posts"]] == [second]
+
+
+def test_decay_rebases_scores_and_drops_faded_posts(app, client, auth_token):
+    from blog_api import trending
+    from blog_api.models import db, PostScore
+
+    half_life = app.config["TRENDING_HALF_LIFE"]
+    [alice] = _users(client, auth_token, "alice")
+    old, new = _post(client, alice, "old"), _post(client, alice, "new")
+    start = trending.load_epoch()
+    trending.record(old, "like", 8, now=start)
+    trending.record(new, "like", 1, now=start + half_life)
+    db.session.commit()
+    # One half-life on, the 8 old likes count for 4 and the new one in full
+    assert [p["score"] for p in trending.top(10, now=start + half_life)] == [4, 1]
+
+    assert trending.decay(now=start + half_life) == (2, 0)
+    assert {r.post_id: r.score for r in PostScore.query} == {old: 4, new: 1}
+    trending.record(new, "comment", now=start + half_life)
+    db.session.commit()
+    assert [p["id"] for p in trending.top(10, now=start + half_life)] == [old, new]
+
+    # Seven half-lives on, the old post has faded below TRENDING_MIN_SCORE and is compacted away
+    trending.record(new, "like", now=start + 8 * half_life)
+    db.session.commit()
+    rescaled, removed = trending.decay(now=start + 8 * half_life)
+    assert (rescaled, removed) == (2, 1)
+    assert [r.post_id for r in PostScore.query] == [new]
+
+
+def test_write_racing_a_decay_is_applied_at_the_new_scale(app, client, auth_token):
+    from blog_api import trending
+    from blog_api.models import db
+
+    half_life = app.config["TRENDING_HALF_LIFE"]
+    [alice] = _users(client, auth_token, "alice")
+    post_id = _post(client, alice, "p")
+    start = trending.load_epoch()
+    trending.record(post_id, "like", 2, now=start)
+    db.session.commit()
+    trending.decay(now=start + half_life)
+    app.extensions["trending"].epoch = start  # as if another process decayed after we read the epoch
+
+    trending.record(post_id, "like", 1, now=start + half_life)
+    db.session.commit()
+    assert trending.top(1, now=start + half_life)[0]["score"] == 2
+
+
+def test_unliked_post_is_not_listed_and_score_stays_at_zero(app, client, auth_token):
+    from blog_api import trending
+    from blog_api.models import db, PostScore
+
+    half_life = app.config["TRENDING_HALF_LIFE"]
+    [alice] = _users(client, auth_token, "alice")
+    post_id = _post(client, alice, "liked")
+    start = trending.load_epoch()
+    trending.record(post_id, "like", 1, now=start)
+    # Taken back a half-life later, at twice the weight the like still has
+    trending.record(post_id, "like", -1, now=start + half_life)
+    db.session.commit()
+
+    assert db.session.query(PostScore.score).filter(PostScore.post_id == post_id).scalar() == 0
+    assert trending.top(10, now=start + half_life) == []
@@ -0,0 +1,142 @@
+"""Threaded comments stored as materialized paths.
+
+A reply's ``path`` is its ancestors' ids followed by its own, each zero-padded to ``ID_WIDTH``
+digits and joined with ``/``; ``root_id`` is the thread's top-level comment and ``depth`` the
+nesting level. Sorting a thread by ``path`` gives depth-first order with siblings oldest first,
+and a comment's subtree is one range on the ``(root_id, path)`` index. Top-level comments
+(depth 0) leave both columns empty, so only replies pay for setting the path once the id is known.
+
+``thread_page`` returns a page of top-level comments with their replies nested in two queries
+however deep or large the threads are: a keyset page of roots, then one query that reads the first
+``replies`` descendants of each root in path order. A thread cut short carries a
+``replies_next_cursor`` to continue from with ``GET /comments/<id>/replies``.
+"""
+from flask import current_app
+from sqlalchemy import and_, delete, select, union_all
+
+from blog_api.models import db, Post, Comment, CommentLike, Notification
+from blog_api.counters import bump
+from blog_api.deletion import stamp
+from blog_api.pagination import encode_cursor, keyset_paginate
+from blog_api.schemas import serialize_comment
+from blog_api import search, trending
+
+ID_WIDTH = 10
+SEP = "/"
+
+
+class TooDeep(ValueError):
+    pass
+
+
+def comment_path(comment):
+    return comment.path or f"{comment.id:0{ID_WIDTH}d}"
+
+
+def thread_root(comment):
+    return comment.root_id or comment.id
+
+
+def subtree_filter(comment):
+    """Criteria matching every reply below ``comment``, at any depth."""
+    if comment.depth == 0:
+        return Comment.root_id == comment.id
+    # "/" sorts right before "0", so the descendants are exactly the paths in (path + "/", path + "0")
+    prefix = comment_path(comment)
+    return and_(Comment.root_id == comment.root_id, Comment.path > prefix + SEP, Comment.path < prefix + "0")
+
+
+def add_comment(post_id, author_id, content, parent=None, max_depth=None):
+    """Create a comment, or a reply to ``parent``, and bump the counters it affects."""
+    comment = Comment(post_id=post_id, content=content, author_id=author_id)
+    if parent is not None:
+        if max_depth is not None and parent.depth + 1 > max_depth:
+            raise TooDeep(parent.id)
+        comment.parent_id = parent.id
+        comment.root_id = thread_root(parent)
+        comment.depth = parent.depth + 1
+    db.session.add(comment)
+    db.session.flush()
+    if parent is not None:
+        comment.path = f"{comment_path(parent)}{SEP}{comment.id:0{ID_WIDTH}d}"
+        bump(Comment.reply_count, parent.id)
+    bump(Post.comment_count, post_id)
+    trending.record(post_id, "comment")
+    return comment
+
+
+def delete_comment(comment):
+    """Delete ``comment`` together with its replies and their likes; returns the number of comments removed.
+
+    With ``SOFT_DELETE`` the comments are only stamped and ``purge_deleted`` removes them later.
+    """
+    post_id, parent_id = comment.post_id, comment.parent_id
+    ids = [comment.id] + [i for (i,) in db.session.query(Comment.id).filter(subtree_filter(comment))]
+    if current_app.config["SOFT_DELETE"]:
+        stamp(Comment, ids)
+    else:
+        for model, column in ((CommentLike, CommentLike.comment_id), (Notification, Notification.comment_id),
+                              (Comment, Comment.id)):
+            db.session.execute(delete(model).where(column.in_(ids)).execution_options(synchronize_session=False))
+    db.session.expunge(comment)
+    search.remove_comments(ids)
+    bump(Post.comment_count, post_id, -len(ids))
+    if parent_id is not None:
+        bump(Comment.reply_count, parent_id, -1)
+    return len(ids)
+
+
+def _node(comment):
+    node = serialize_comment(comment)
+    node["replies"] = []
+    return node
+
+
+def thread_page(post_id, cursor, limit, replies):
+    """One page of top-level comments, oldest first, each with up to ``replies`` nested replies.
+
+    Returns ``(roots, next_cursor)``.
+    """
+    roots, next_cursor = keyset_paginate(
+        Comment.query.filter(Comment.post_id == post_id, Comment.depth == 0),
+        (Comment.created_at, Comment.id), cursor, limit,
+        key=lambda c: (c.created_at, c.id), descending=False
+    )
+    nodes = {}
+    for c in roots:
+        nodes[c.id] = _node(c)
+        nodes[c.id]["replies_next_cursor"] = None
+    if not roots or replies < 1:
+        return list(nodes.values()), next_cursor
+
+    # One index range per thread, stopping after one row more than is shown (which tells whether
+    # the thread was cut short). A ROW_NUMBER() window would rank every reply of every thread first.
+    heads = union_all(*[
+        select(Comment.id).where(Comment.root_id == c.id).order_by(Comment.path).limit(replies + 1)
+        .subquery().select()
+        for c in roots
+    ])
+    rows = Comment.query.filter(Comment.id.in_(heads)).order_by(Comment.root_id, Comment.path)
+
+    kept, last_path = {}, {}
+    for c in rows:
+        kept[c.root_id] = kept.get(c.root_id, 0) + 1
+        if kept[c.root_id] > replies:
+            nodes[c.root_id]["replies_next_cursor"] = encode_cursor(last_path[c.root_id])
+            continue
+        # Path order puts every parent before its children, and a kept prefix keeps all ancestors
+        nodes[c.id] = _node(c)
+        nodes[c.parent_id]["replies"].append(nodes[c.id])
+        last_path[c.root_id] = c.path
+    return [nodes[c.id] for c in roots], next_cursor
+
+
+def replies_page(comment, cursor, limit):
+    """Every reply below ``comment`` in depth-first order, one page at a time.
+
+    Returns ``(replies, next_cursor)``; rows carry ``parent_id`` and ``depth`` so clients can nest them.
+    """
+    return keyset_paginate(
+        Comment.query.filter(subtree_filter(comment)), (Comment.path,), cursor, limit,
+        key=lambda c: (c.path,), descending=False
+    )
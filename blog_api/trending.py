@@ -0,0 +1,184 @@
+"""Trending posts: time-decayed engagement scores, maintained incrementally.
+
+A post's score is the sum of its likes and comments, weighted by ``TRENDING_WEIGHTS``, with each
+event counting half as much every ``TRENDING_HALF_LIFE`` seconds. Scores are stored with forward
+decay: an event at time ``t`` adds ``weight * 2 ** ((t - epoch) / half_life)``, so past events
+never need rewriting and the indexed ``score`` column orders posts by current popularity. A like,
+unlike or comment costs one ``UPDATE`` (plus an insert on a post's first event).
+
+An unlike takes back a like's full weight as of now, which is more than a like given earlier
+still counts for (``post_likes`` does not record when it was given), so scores are clamped at
+zero rather than going negative. ``top()`` leaves out posts below ``TRENDING_MIN_SCORE``.
+
+``decay()`` moves the epoch to the present. It rescales every row in one statement, which keeps
+stored values small and equal to the current score, and deletes rows that have decayed below
+``TRENDING_MIN_SCORE``, so the table only holds recently active posts. Every row records the
+epoch it is scaled to and writes only touch rows at the writer's epoch, so a write that races a
+decay is retried at the new scale instead of being added at the old one. Run it periodically with
+``flask decay-trending``; the snapshot refresh also runs it once it is overdue.
+
+``GET /posts/trending`` is served from an in-process snapshot of the top ``TRENDING_SNAPSHOT_SIZE``
+posts, reloaded at most every ``TRENDING_REFRESH_SECONDS`` by the first request to find it stale
+while concurrent requests keep serving the previous one.
+"""
+import logging
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import case, delete, exists, literal, select, update
+
+from blog_api.models import db, Post, PostScore, TrendingState
+from blog_api.relations import insert_ignore
+from blog_api.schemas import serialize_post
+
+log = logging.getLogger(__name__)
+
+
+def _state():
+    return current_app.extensions["trending"]
+
+
+def load_epoch():
+    """Read the current epoch from the database, creating it on first use."""
+    epoch = db.session.query(TrendingState.epoch).filter(TrendingState.id == 1).scalar()
+    if epoch is None:
+        insert_ignore(TrendingState, ["id", "epoch"], select(literal(1), literal(time.time())))
+        epoch = db.session.query(TrendingState.epoch).filter(TrendingState.id == 1).scalar()
+    _state().epoch = epoch
+    return epoch
+
+
+def record(post_id, kind, count=1, now=None):
+    """Add ``count`` events of ``kind`` ("like", "comment"; negative to take them back) to a post."""
+    record_many({post_id: count}, kind, now)
+
+
+def record_many(counts, kind, now=None):
+    """Add ``counts[post_id]`` events of ``kind`` to each post, in the caller's transaction."""
+    weight = current_app.config["TRENDING_WEIGHTS"].get(kind)
+    counts = {pid: n for pid, n in counts.items() if n}
+    if not weight or not counts:
+        return
+    now = time.time() if now is None else now
+    half_life = current_app.config["TRENDING_HALF_LIFE"]
+    for _ in range(2):
+        epoch = _state().epoch
+        if epoch is None:
+            epoch = load_epoch()
+        scale = weight * 2 ** ((now - epoch) / half_life)
+        by_count = {}
+        for pid, n in counts.items():
+            by_count.setdefault(n, []).append(pid)
+        changed = 0
+        for n, ids in by_count.items():
+            score = PostScore.score + n * scale
+            if n < 0:
+                score = case((score < 0, 0.0), else_=score)
+            changed += db.session.execute(
+                update(PostScore).where(PostScore.post_id.in_(ids), PostScore.epoch == epoch)
+                .values(score=score).execution_options(synchronize_session=False)
+            ).rowcount
+        added = {pid: n for pid, n in counts.items() if n > 0}
+        if changed < len(counts) and added:
+            # First event for some posts. Inserts only apply while the epoch is unchanged
+            increment = case({pid: n * scale for pid, n in added.items()}, value=Post.id)
+            changed += insert_ignore(PostScore, ["post_id", "score", "epoch"], select(
+                Post.id, increment, literal(epoch)
+            ).where(Post.id.in_(list(added)), exists().where(TrendingState.epoch == epoch)))
+        if changed:
+            return
+        # Nothing matched: either no such posts, or the scores were rebased since we read the epoch
+        if load_epoch() == epoch:
+            return
+    log.warning("Dropped trending update for %d posts: epoch kept moving", len(counts))
+
+
+def remove_post(post_id):
+    db.session.execute(delete(PostScore).where(PostScore.post_id == post_id))
+    _state().discard(post_id)
+
+
+def decay(now=None):
+    """Rebase every score to ``now`` and drop the ones below ``TRENDING_MIN_SCORE``.
+
+    Commits. Returns ``(rescaled, removed)``, or ``(0, 0)`` if another process decayed concurrently.
+    """
+    now = time.time() if now is None else now
+    old = load_epoch()
+    claimed = db.session.execute(
+        update(TrendingState).where(TrendingState.id == 1, TrendingState.epoch == old).values(epoch=now)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        return 0, 0
+    factor = 2 ** ((old - now) / current_app.config["TRENDING_HALF_LIFE"])
+    rescaled = db.session.execute(
+        update(PostScore).where(PostScore.epoch == old).values(score=PostScore.score * factor, epoch=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    removed = db.session.execute(
+        delete(PostScore).where(PostScore.score < current_app.config["TRENDING_MIN_SCORE"])
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    _state().epoch = now
+    return rescaled, removed
+
+
+def top(limit, now=None):
+    """The ``limit`` highest-scoring posts right now, best first, down to ``TRENDING_MIN_SCORE``
+    (queries the database)."""
+    now = time.time() if now is None else now
+    epoch = load_epoch()
+    scale = 2 ** ((epoch - now) / current_app.config["TRENDING_HALF_LIFE"])
+    rows = (db.session.query(Post, PostScore.score).join(PostScore, PostScore.post_id == Post.id)
+            .filter(PostScore.epoch == epoch, PostScore.score >= current_app.config["TRENDING_MIN_SCORE"] / scale)
+            .order_by(PostScore.score.desc()).limit(limit).all())
+    return [dict(serialize_post(post), score=round(score * scale, 4)) for post, score in rows]
+
+
+class Trending:
+    """Per-app state: the cached epoch and the top-N snapshot, in ``app.extensions["trending"]``."""
+
+    def __init__(self, app):
+        self.app = app
+        self.epoch = None
+        self._posts = []
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """The cached top posts, reloading them first if they are older than the refresh interval."""
+        cfg = self.app.config
+        stale = self._loaded_at is None or time.monotonic() - self._loaded_at >= cfg["TRENDING_REFRESH_SECONDS"]
+        # Only the first request to notice reloads; the rest keep serving the old list meanwhile
+        if stale and self._lock.acquire(blocking=self._loaded_at is None):
+            try:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at >= cfg["TRENDING_REFRESH_SECONDS"]:
+                    self._reload()
+            finally:
+                self._lock.release()
+        return self._posts
+
+    def _reload(self):
+        cfg = self.app.config
+        epoch = load_epoch()
+        if cfg["TRENDING_DECAY_SECONDS"] and time.time() - epoch >= cfg["TRENDING_DECAY_SECONDS"]:
+            decay()
+        self._posts = top(cfg["TRENDING_SNAPSHOT_SIZE"])
+        self._loaded_at = time.monotonic()
+
+    def discard(self, post_id):
+        self._posts = [p for p in self._posts if p["id"] != post_id]
+
+    def invalidate(self):
+        self._loaded_at = None
+
+
+def snapshot():
+    return _state().snapshot()
+
+
+def init_app(app):
+    app.extensions["trending"] = Trending(app)